@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class BuildsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'builds'
+
+    def ready(self):
+        # Connects the outbox's flush-on-commit receiver
+        from . import outbox  # noqa: F401
@@ -0,0 +1,94 @@
+# builds/async_views.py
+"""
+Async versions of the catalog read endpoints, for the ASGI app (compfy/asgi.py).
+
+Same queries, serializer and response cache as the DRF views in
+builds/views.py, so both return the same JSON. Database and cache calls
+are awaited, and no worker thread is held while a slow client reads its
+response. Served under WSGI they still work, one request per thread.
+"""
+
+from django.db.models import Max, Min
+from django.http import JsonResponse
+from rest_framework.exceptions import ValidationError
+
+from compfy.db import replica_reads
+from utils.querybudget import query_budget
+
+from . import catalog_cache
+from .models import Build
+from .serializers import BuildSerializer
+from .services import catalog_builds, facet_queries, filter_catalog, format_facets, page_bounds, search_catalog
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False)
+
+
+# -------------------- Browse Builds --------------------
+@query_budget(4)
+@replica_reads
+async def build_list(request):
+    params = request.GET.dict()
+    try:
+        builds = filter_catalog(catalog_builds().order_by("-created_at"), params)
+    except ValidationError as error:
+        return _json(error.detail, status=400)
+
+    async def compute():
+        return BuildSerializer([build async for build in builds], many=True).data
+
+    return _json(await catalog_cache.acached("list", params, compute))
+
+
+@query_budget(4)
+@replica_reads
+async def build_detail(request, pk):
+    async def compute():
+        try:
+            return BuildSerializer(await catalog_builds().aget(pk=pk)).data
+        except Build.DoesNotExist:
+            return None  # not cached; the next request looks again
+
+    data = await catalog_cache.acached("detail", {"pk": pk}, compute)
+    if data is None:
+        return _json({"detail": "No Build matches the given query."}, status=404)
+    return _json(data)
+
+
+# -------------------- Search and facets --------------------
+@query_budget(4)
+@replica_reads
+async def build_search(request):
+    params = request.GET.dict()
+    try:
+        limit, offset = page_bounds(params)
+        builds = search_catalog(catalog_builds(), params)
+    except ValueError:
+        return _json({"error": "limit and offset must be integers"}, status=400)
+    except ValidationError as error:
+        return _json(error.detail, status=400)
+
+    async def compute():
+        return {
+            "count": await builds.acount(),
+            "results": BuildSerializer([build async for build in builds[offset:offset + limit]], many=True).data,
+        }
+
+    return _json(await catalog_cache.acached("search", params, compute))
+
+
+@query_budget(5)
+@replica_reads
+async def build_facets(request):
+    params = request.GET.dict()
+    try:
+        builds = filter_catalog(Build.objects.all(), params)
+    except ValidationError as error:
+        return _json(error.detail, status=400)
+
+    async def compute():
+        rows = {name: [row async for row in queryset] for name, queryset in facet_queries(builds).items()}
+        return format_facets(rows, await builds.aaggregate(min=Min("price"), max=Max("price")))
+
+    return _json(await catalog_cache.acached("facets", params, compute))
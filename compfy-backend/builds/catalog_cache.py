@@ -0,0 +1,83 @@
+# builds/catalog_cache.py
+"""
+Response cache shared by the catalog read endpoints, sync (builds/views.py)
+and async (builds/async_views.py) alike.
+
+Keys carry a catalog version that builds.models.record_changes bumps after
+every transaction that writes builds, so a cached response is never served
+once the builds behind it have changed. Vendor details embedded in a build
+can still lag by up to ``settings.CATALOG_CACHE_SECONDS`` (default 60),
+after which every entry expires anyway.
+
+With a read replica (compfy/db.py) a response computed just after a bump
+may have been read before the replica had the write, so it is only kept
+until the replica must have caught up or been dropped.
+"""
+
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from compfy import db, metrics
+
+logger = logging.getLogger("compfy.cache")
+
+CATALOG_CACHE_VERSION_KEY = "catalog:read_version"
+CATALOG_CACHE_BUMPED_KEY = "catalog:bumped_at"
+
+
+def bump_version():
+    """Retire every cached catalog response"""
+    try:
+        cache.incr(CATALOG_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_CACHE_VERSION_KEY, 1, None)
+    except Exception:
+        # Runs after the write has committed; a broken cache must not fail it
+        logger.warning("Could not bump the catalog cache version", exc_info=True)
+        return
+    if db.replica_window():
+        cache.set(CATALOG_CACHE_BUMPED_KEY, time.time(), None)
+
+
+def _key(version, kind, params):
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:32]
+    return f"catalog:{version}:{kind}:{digest}"
+
+
+def _timeout(state):
+    timeout = getattr(settings, "CATALOG_CACHE_SECONDS", 60)
+    bumped_at = state.get(CATALOG_CACHE_BUMPED_KEY)
+    if bumped_at:
+        unsettled = db.replica_window() - (time.time() - bumped_at)
+        if unsettled > 0:
+            return max(min(timeout, unsettled), 1)
+    return timeout
+
+
+def cached(kind, params, compute):
+    """compute()'s result for `kind` and the `params` dict, from the cache while the catalog is unchanged"""
+    state = cache.get_many([CATALOG_CACHE_VERSION_KEY, CATALOG_CACHE_BUMPED_KEY])
+    key = _key(state.get(CATALOG_CACHE_VERSION_KEY, 0), kind, params)
+    data = cache.get(key)
+    metrics.observe_cache("catalog", data is not None)
+    if data is None:
+        data = compute()
+        cache.set(key, data, _timeout(state))
+    return data
+
+
+async def acached(kind, params, compute):
+    """cached() for async views; `compute` is a coroutine function"""
+    state = await cache.aget_many([CATALOG_CACHE_VERSION_KEY, CATALOG_CACHE_BUMPED_KEY])
+    key = _key(state.get(CATALOG_CACHE_VERSION_KEY, 0), kind, params)
+    data = await cache.aget(key)
+    metrics.observe_cache("catalog", data is not None)
+    if data is None:
+        data = await compute()
+        await cache.aset(key, data, _timeout(state))
+    return data
@@ -0,0 +1,81 @@
+# builds/changes.py
+"""
+Reading and publishing the catalog change feed (builds.models.BuildChange).
+
+Every committed Build write gives the build a new, higher sequence number,
+and a delete leaves a tombstone. A client keeps a local copy fresh by
+asking for the changes after the last number it has seen and applying
+them in order; starting from 0 yields the whole catalog.
+
+Numbers are handed out after the write commits, not while it runs: the
+writing transaction only adds UnpublishedChange rows, and publish() moves
+committed ones into the feed while holding the ChangeFeedLock row. One
+publisher numbers and commits at a time, so a number below one a reader
+has already seen can never appear later, however long the write took.
+"""
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .catalog_cache import bump_version
+from .models import BuildChange, ChangeFeedLock, UnpublishedChange
+
+
+def changes_since(since, limit=500, tombstones=None):
+    """
+    Up to `limit` (seq, build_id, op, vendor_id) rows after `since`, oldest first,
+    with the sequence number to resume from and whether more are waiting.
+    A client starting from 0 has nothing to delete, so by default tombstones
+    are only included after a real cursor.
+    """
+    changes = BuildChange.objects.filter(seq__gt=since).order_by("seq")
+    if not (since if tombstones is None else tombstones):
+        changes = changes.filter(op="upsert")
+    rows = list(changes.values_list("seq", "build_id", "op", "vendor_id")[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, rows[-1][0] if rows else since, has_more
+
+
+def latest_seq():
+    """The cursor to read from to see only changes made from now on"""
+    return BuildChange.objects.aggregate(seq=Max("seq"))["seq"] or 0
+
+
+def _lock_feed():
+    # An UPDATE takes the row lock on MySQL, and SQLite's write lock before anything is read
+    if not ChangeFeedLock.objects.filter(id=1).update(published_at=timezone.now()):
+        ChangeFeedLock.objects.get_or_create(id=1, defaults={"published_at": timezone.now()})
+
+
+def publish(batch_size=500):
+    """
+    Give committed UnpublishedChange rows their sequence numbers, oldest
+    first, one batch per transaction. Runs after every transaction that
+    writes builds, and picks up rows a crashed publisher left behind.
+    Returns how many rows were published.
+    """
+    published = 0
+    while True:
+        with transaction.atomic():
+            _lock_feed()
+            rows = list(UnpublishedChange.objects.order_by("id").values_list("id", "build_id", "vendor_id", "op")[:batch_size])
+            if not rows:
+                break
+            latest = {}
+            for _, build_id, vendor_id, op in rows:
+                latest.pop(build_id, None)  # a build's last change decides its place
+                latest[build_id] = (vendor_id, op)
+            # One row per build: drop its previous entry so the new one gets the next sequence number
+            BuildChange.objects.filter(build_id__in=list(latest)).delete()
+            BuildChange.objects.bulk_create(
+                [BuildChange(build_id=build_id, vendor_id=vendor_id, op=op) for build_id, (vendor_id, op) in latest.items()],
+                batch_size=batch_size,
+            )
+            UnpublishedChange.objects.filter(id__in=[row[0] for row in rows]).delete()
+        published += len(rows)
+    if published:
+        # Cached catalog responses go stale once the feed moves
+        transaction.on_commit(bump_version)
+    return published
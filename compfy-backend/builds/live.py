@@ -0,0 +1,251 @@
+# builds/live.py
+"""
+Live catalog updates as server-sent events.
+
+Every process has one Broker, an in-process pub/sub that hands each event
+to the queues of the streams subscribed to its topics: "catalog" for all
+builds, "build:<id>" for one build and "vendor:<id>" for one vendor's.
+
+Across workers the change feed (builds/changes.py) is the bridge. Whichever
+process syncs, the rows it writes are read back by one FeedBridge thread
+per process every ``settings.LIVE_POLL_SECONDS`` (default 1), so the
+database is polled once per worker however many clients are connected,
+and not at all while none are.
+
+Streams are only served under ASGI (compfy/asgi.py, the `live` process in
+the Procfile), where an idle connection is a parked coroutine and a small
+queue rather than a worker thread. Each event's id is its feed sequence
+number, so a reconnecting browser's Last-Event-ID replays what it missed.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, connection
+from django.http import JsonResponse, StreamingHttpResponse
+
+from compfy import metrics
+
+from .changes import changes_since, latest_seq
+from .models import Build
+
+logger = logging.getLogger("compfy.live")
+
+# Queued in place of the events a slow stream had to drop
+RESYNC = object()
+
+
+def events_for(rows):
+    """(topics, event) for change feed rows, with each build's current price"""
+    upserted = [build_id for _, build_id, op, _ in rows if op == "upsert"]
+    current = {}
+    for start in range(0, len(upserted), 500):
+        builds = Build.objects.filter(id__in=upserted[start:start + 500])
+        for build_id, price, vendor_build_id in builds.values_list("id", "price", "vendor_build_id"):
+            current[build_id] = (price, vendor_build_id)
+
+    events = []
+    for seq, build_id, op, vendor_id in rows:
+        price, vendor_build_id = current.get(build_id, (None, None))
+        topics = ["catalog", f"build:{build_id}"] + ([f"vendor:{vendor_id}"] if vendor_id else [])
+        events.append((topics, {
+            "seq": seq,
+            "id": build_id,
+            "op": op,
+            "price": None if price is None else str(price),
+            "available": build_id in current,  # a build deleted since the row was written is gone too
+            "vendorId": vendor_id,
+            "vendorBuildId": vendor_build_id,
+        }))
+    return events
+
+
+# -------------------- In-process pub/sub --------------------
+class Subscription:
+    """One stream's queue of (seq, rendered event), filled on the stream's own event loop"""
+
+    def __init__(self, topics, loop, size):
+        self.topics = frozenset(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=size)
+
+    def deliver(self, message):
+        if self.queue.full():
+            # The client can't keep up: drop the backlog and have it catch up from the change feed
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = RESYNC
+        self.queue.put_nowait(message)
+
+
+class Broker:
+    """Fans events out to subscriptions by topic; publish() is safe from any thread"""
+
+    def __init__(self):
+        self._topics = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics):
+        subscription = Subscription(topics, asyncio.get_running_loop(), getattr(settings, "LIVE_QUEUE_SIZE", 64))
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+            self._count += 1
+            metrics.set_live_streams(self._count)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            found = False
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers and subscription in subscribers:
+                    found = True
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+            if found:
+                self._count -= 1
+                metrics.set_live_streams(self._count)
+
+    def has_subscribers(self):
+        return bool(self._topics)
+
+    def publish(self, events):
+        """Hand each (topics, event) once to every subscription on any of its topics"""
+        deliveries = []
+        with self._lock:
+            for topics, event in events:
+                subscribers = set()
+                for topic in topics:
+                    subscribers |= self._topics.get(topic, set())
+                if subscribers:
+                    message = (event["seq"], _sse(event))  # rendered once for every stream
+                    deliveries += [(subscription, message) for subscription in subscribers]
+        for subscription, message in deliveries:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                self.unsubscribe(subscription)  # its event loop has shut down
+
+
+# -------------------- Cross-worker bridge --------------------
+class FeedBridge:
+    """Polls the change feed on a daemon thread and publishes it while anyone is subscribed"""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.cursor = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="live-feed-bridge", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread:
+            thread.join()
+        self.cursor = None
+
+    def poll_once(self):
+        """Publish everything new in the feed; returns how many changes went out"""
+        if not self.broker.has_subscribers():
+            self.cursor = None  # nobody listening; start from "now" once someone is
+            return 0
+        if self.cursor is None:
+            self.cursor = latest_seq()
+        published = 0
+        while True:
+            rows, self.cursor, has_more = changes_since(self.cursor, limit=500, tombstones=True)
+            if rows:
+                self.broker.publish(events_for(rows))
+                published += len(rows)
+            if not has_more:
+                return published
+
+    def _run(self):
+        interval = getattr(settings, "LIVE_POLL_SECONDS", 1)
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                try:
+                    self.poll_once()
+                except Exception:
+                    logger.exception("Polling the change feed for live updates failed")
+                self._stop.wait(interval)
+        finally:
+            connection.close()
+
+
+broker = Broker()
+bridge = FeedBridge(broker)
+
+
+# -------------------- Streams --------------------
+def _sse(event):
+    if event is RESYNC:
+        return "event: resync\ndata: {}\n\n"
+    return f"id: {event['seq']}\nevent: build\ndata: {json.dumps(event)}\n\n"
+
+
+def _replay(since, topics):
+    """Events after `since` on any of `topics`, and whether that is all of them"""
+    rows, _, has_more = changes_since(since, limit=getattr(settings, "LIVE_REPLAY_LIMIT", 500), tombstones=True)
+    return [event for event_topics, event in events_for(rows) if topics.intersection(event_topics)], not has_more
+
+
+async def stream(topics, last_event_id=None):
+    """Server-sent events for `topics` until the client disconnects"""
+    subscription = broker.subscribe(topics)
+    bridge.ensure_started()
+    keepalive = getattr(settings, "LIVE_KEEPALIVE_SECONDS", 15)
+    try:
+        yield "retry: 3000\n\n"
+        last_seq = 0
+        if last_event_id is not None:
+            # Subscribed first, so nothing published meanwhile is lost; duplicates are skipped below
+            events, complete = await sync_to_async(_replay)(last_event_id, subscription.topics)
+            for event in events:
+                last_seq = event["seq"]
+                yield _sse(event)
+            if not complete:
+                yield _sse(RESYNC)
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"  # keeps proxies from closing an idle stream
+                continue
+            if message is RESYNC:
+                yield _sse(RESYNC)
+            elif message[0] > last_seq:
+                yield message[1]
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def event_stream_response(request, topics):
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Live updates are only served by the ASGI app (compfy.asgi)"}, status=501)
+    try:
+        last_event_id = int(request.headers["Last-Event-ID"])
+    except (KeyError, ValueError):
+        last_event_id = None
+    response = StreamingHttpResponse(stream(topics, last_event_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # stop nginx from buffering the stream
+    return response
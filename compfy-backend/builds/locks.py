@@ -0,0 +1,82 @@
+# builds/locks.py
+"""
+Per-vendor catalog sync locks, kept in the SyncLock and PendingSync tables
+so they work across processes.
+
+A caller first queues the VendorBuild ids it changed, then tries to take
+its vendor's lock. Whoever holds the lock keeps claiming and syncing the
+queue until it is empty, so a sync requested while another one runs for
+the same vendor is folded into the running one instead of racing it.
+Different vendors have different locks and sync in parallel.
+
+The lock is taken with a conditional UPDATE. A holder whose heartbeat is
+older than ``settings.SYNC_STALL_SECONDS`` (default 900) is presumed dead
+and its lock may be taken over.
+
+Production runs on MySQL. SQLite has a single write lock for the whole
+database, so concurrent syncs only work there with
+``"transaction_mode": "IMMEDIATE"`` in the database OPTIONS. In the
+default deferred mode, a transaction that reads before it writes gets
+"database is locked" instead of waiting for the lock. Even with
+IMMEDIATE, syncs for different vendors take turns on SQLite.
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PendingSync, SyncLock
+
+
+def new_owner():
+    return uuid.uuid4().hex
+
+
+def queue(vendor_id, vendor_build_ids=None):
+    """Queue ids for the vendor's next sync; None queues the whole vendor"""
+    ids = [None] if vendor_build_ids is None else set(vendor_build_ids)
+    PendingSync.objects.bulk_create(
+        [PendingSync(vendor_id=vendor_id, vendor_build_id=build_id) for build_id in ids],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def claim(vendor_id):
+    """
+    Take everything queued for the vendor off the queue. Returns the ids,
+    None if the whole vendor was queued, or an empty set if nothing was.
+    Only the rows read are deleted, so ids queued meanwhile stay queued.
+    """
+    rows = list(PendingSync.objects.filter(vendor_id=vendor_id).values_list("id", "vendor_build_id"))
+    for start in range(0, len(rows), 500):
+        PendingSync.objects.filter(id__in=[row_id for row_id, _ in rows[start:start + 500]]).delete()
+    ids = {build_id for _, build_id in rows}
+    return None if None in ids else ids
+
+
+def has_pending(vendor_id):
+    return PendingSync.objects.filter(vendor_id=vendor_id).exists()
+
+
+def acquire(vendor_id, owner):
+    """Take the vendor's lock for `owner`; False while another live sync holds it"""
+    SyncLock.objects.get_or_create(vendor_id=vendor_id)
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, "SYNC_STALL_SECONDS", 900))
+    return SyncLock.objects.filter(
+        Q(owner="") | Q(heartbeat__lt=stale), vendor_id=vendor_id,
+    ).update(owner=owner, heartbeat=now) == 1
+
+
+def heartbeat(vendor_id, owner):
+    SyncLock.objects.filter(vendor_id=vendor_id, owner=owner).update(heartbeat=timezone.now())
+
+
+def release(vendor_id, owner, drained=False):
+    """Give the lock back; `drained` records that the queue was emptied"""
+    fields = {"owner": "", "synced_at": timezone.now()} if drained else {"owner": ""}
+    SyncLock.objects.filter(vendor_id=vendor_id, owner=owner).update(**fields)
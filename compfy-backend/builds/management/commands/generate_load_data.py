@@ -0,0 +1,243 @@
+#builds/management/commands/generate_load_data.py
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from builds.management.commands.populate_prebuilts import PC_BUILDS
+from builds.models import Build, Component, Purchase, SavedBuild
+from builds.services import configuration_fingerprint
+from builds.utils import categorize_specs, delete_catalog_builds
+from inventory.models import InventoryItem
+from users.models import Profile
+from vendors.models import Vendor, VendorBuild, VendorBuildChange, content_hash
+
+PREFIX = "loadgen-"
+PART_TYPES = ("cpu", "gpu", "ram", "storage", "psu", "case")
+CITIES = ["Lahore", "Karachi", "Islamabad", "Rawalpindi", "Faisalabad", "Multan", "Peshawar", "Quetta"]
+VENDOR_CATEGORY = {"office": "office", "gaming": "gaming", "editing": "workstation"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large synthetic catalog (vendors, vendor builds, inventory, catalog builds, "
+        "users, saved builds, purchases) from PC_BUILDS using bulk inserts. Output is deterministic for a given --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--vendors", type=int, default=100)
+        parser.add_argument("--builds-per-vendor", type=int, default=1000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--saved-per-user", type=int, default=5)
+        parser.add_argument("--purchases-per-user", type=int, default=2)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--no-catalog", action="store_true",
+            help="Only create vendor builds and inventory; leave the catalog for sync_vendor_builds to fill",
+        )
+        parser.add_argument("--clear", action="store_true", help=f"Delete data from an earlier run (users named {PREFIX}*) first")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        # One hash for every generated account; hashing per user would dominate the run
+        self.password = make_password("loadgen")
+        started = time.perf_counter()
+
+        if options["clear"]:
+            self._timed("Cleared previous run", self.clear)
+        elif User.objects.filter(username__startswith=PREFIX).exists():
+            raise CommandError("Generated data already exists; pass --clear to replace it")
+
+        self.templates = {}
+        for template in PC_BUILDS:
+            self.templates.setdefault(template["category"], []).append(template)
+
+        self.component_ids = self._timed("Components", self.create_components)
+        vendor_ids = self._timed("Vendors", self.create_vendors, options["vendors"])
+
+        build_ids = []
+        for index, vendor_id in enumerate(vendor_ids, start=1):
+            with transaction.atomic():
+                build_ids += self.create_vendor_catalog(
+                    vendor_id, options["builds_per_vendor"], catalog=not options["no_catalog"],
+                )
+            if index % 10 == 0 or index == len(vendor_ids):
+                self.stdout.write(f"  … {index}/{len(vendor_ids)} vendors, {len(build_ids)} builds")
+
+        user_ids = self._timed("Customers", self.create_users, options["users"])
+        self._timed(
+            "Saved builds and purchases", self.create_activity,
+            user_ids, build_ids, options["saved_per_user"], options["purchases_per_user"],
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Load data generated in {time.perf_counter() - started:.1f}s"))
+
+    def _timed(self, label, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        count = f" ({len(result)})" if isinstance(result, (list, dict)) else ""
+        self.stdout.write(self.style.SUCCESS(f"✔ {label}{count} in {time.perf_counter() - start:.1f}s"))
+        return result
+
+    # -------------------- Steps --------------------
+    def clear(self):
+        users = User.objects.filter(username__startswith=PREFIX)
+        build_ids = list(Build.objects.filter(vendor__user__in=users).values_list("id", flat=True))
+        delete_catalog_builds(build_ids)
+        for vendor_id in Vendor.objects.filter(user__in=users).values_list("id", flat=True):
+            InventoryItem.objects.filter(vendor_id=vendor_id).delete()
+            VendorBuild.objects.filter(vendor_id=vendor_id).delete()
+            # The catalog is already gone; nothing left for the outbox to apply
+            VendorBuildChange.objects.filter(vendor_id=vendor_id).delete()
+        users.delete()
+
+    def create_components(self):
+        """Every part name in PC_BUILDS, stored the way sync_vendor_builds stores it (specs = name)"""
+        names = {(comp_type, t[comp_type]) for t in PC_BUILDS for comp_type in PART_TYPES if t.get(comp_type)}
+        Component.objects.bulk_create(
+            [Component(type=comp_type, name=name, specs=name) for comp_type, name in sorted(names)],
+            batch_size=self.batch_size, ignore_conflicts=True,
+        )
+        return {
+            (comp_type, name): comp_id
+            for comp_id, comp_type, name in Component.objects.filter(specs__isnull=False).values_list("id", "type", "name")
+            if (comp_type, name) in names
+        }
+
+    def _create_users(self, usernames, role):
+        User.objects.bulk_create(
+            [User(username=name, email=f"{name}@example.com", password=self.password) for name in usernames],
+            batch_size=self.batch_size,
+        )
+        # Re-read ids; MySQL doesn't return them from bulk_create
+        ids = dict(User.objects.filter(username__in=usernames).values_list("username", "id"))
+        user_ids = [ids[name] for name in usernames]
+        Profile.objects.bulk_create(
+            [Profile(user_id=user_id, role=role, city=self.rng.choice(CITIES)) for user_id in user_ids],
+            batch_size=self.batch_size,
+        )
+        return user_ids
+
+    def create_vendors(self, count):
+        usernames = [f"{PREFIX}vendor-{n:05d}" for n in range(count)]
+        user_ids = self._create_users(usernames, "vendor")
+        Vendor.objects.bulk_create(
+            [
+                Vendor(
+                    user_id=user_id,
+                    shop_name=f"Load Shop {n:05d}",
+                    city=self.rng.choice(CITIES),
+                    contact=f"03{self.rng.randint(0, 999999999):09d}",
+                )
+                for n, user_id in enumerate(user_ids)
+            ],
+            batch_size=self.batch_size,
+        )
+        ids = dict(Vendor.objects.filter(user_id__in=user_ids).values_list("user_id", "id"))
+        return [ids[user_id] for user_id in user_ids]
+
+    def create_users(self, count):
+        return self._create_users([f"{PREFIX}user-{n:06d}" for n in range(count)], "customer")
+
+    def random_parts(self):
+        """
+        A PC_BUILDS template with some parts swapped for ones from another
+        build in the same category, and a price within ±15% of the template.
+        """
+        category = self.rng.choice(list(self.templates))
+        template = self.rng.choice(self.templates[category])
+        parts = {comp_type: template.get(comp_type) or "" for comp_type in PART_TYPES}
+        for comp_type, chance in (("ram", 0.3), ("storage", 0.3), ("psu", 0.2), ("case", 0.2)):
+            if self.rng.random() < chance:
+                parts[comp_type] = self.rng.choice(self.templates[category]).get(comp_type) or ""
+        price = Decimal(round(template["totalCost_PKR"] * self.rng.uniform(0.85, 1.15), -2))
+        return template, category, parts, price
+
+    def create_vendor_catalog(self, vendor_id, count, catalog=True):
+        """
+        One vendor's VendorBuilds and InventoryItems, plus (with `catalog`)
+        the catalog Builds and component links sync_vendor_builds would
+        create for them, so a sync right afterwards has nothing to change.
+        Returns the Build ids.
+        """
+        rows = []
+        for n in range(count):
+            template, category, parts, price = self.random_parts()
+            values = {"title": f"{template['name']} #{n + 1}", "price": price, **parts}
+            rows.append((values, VENDOR_CATEGORY[category]))
+
+        VendorBuild.objects.bulk_create(
+            [
+                VendorBuild(
+                    vendor_id=vendor_id, category=category, intensity="casual",
+                    content_hash=content_hash(values), **values,
+                )
+                for values, category in rows
+            ],
+            batch_size=self.batch_size,
+        )
+        vendor_build_ids = dict(VendorBuild.objects.filter(vendor_id=vendor_id).values_list("title", "id"))
+        InventoryItem.objects.bulk_create(
+            [InventoryItem(vendor_id=vendor_id, build_id=vb_id) for vb_id in vendor_build_ids.values()],
+            batch_size=self.batch_size,
+        )
+        if not catalog:
+            return []  # the outbox rows from the insert let sync build the catalog
+
+        builds, links = [], {}
+        for values, _ in rows:
+            vb_id = vendor_build_ids[values["title"]]
+            component_ids = {
+                comp_type: self.component_ids[(comp_type, values[comp_type])]
+                for comp_type in PART_TYPES if values[comp_type]
+            }
+            category, intensity = categorize_specs(
+                [values["cpu"].lower()] if values["cpu"] else [],
+                [values["gpu"].lower()] if values["gpu"] else [],
+                values["price"],
+            )
+            builds.append(Build(
+                title=values["title"], source="vendor", vendor_id=vendor_id, vendor_build_id=vb_id,
+                price=values["price"], category=category, intensity=intensity,
+                config_fingerprint=configuration_fingerprint(component_ids),
+            ))
+            links[vb_id] = component_ids.values()
+
+        Build.objects.bulk_create(builds, batch_size=self.batch_size)
+        build_ids = dict(
+            Build.objects.filter(source="vendor", vendor_id=vendor_id).values_list("vendor_build_id", "id")
+        )
+        Through = Build.components.through
+        Through.objects.bulk_create(
+            [
+                Through(build_id=build_ids[vb_id], component_id=comp_id)
+                for vb_id, comp_ids in links.items() for comp_id in comp_ids
+            ],
+            batch_size=self.batch_size,
+        )
+        # The catalog was written directly, so the inserts need no sync
+        VendorBuildChange.objects.filter(vendor_id=vendor_id).delete()
+        return list(build_ids.values())
+
+    def create_activity(self, user_ids, build_ids, saved_per_user, purchases_per_user):
+        if not build_ids:
+            return []
+        saved, purchases = [], []
+        saved_per_user = min(saved_per_user, len(build_ids))
+        for user_id in user_ids:
+            for build_id in self.rng.sample(build_ids, saved_per_user):
+                saved.append(SavedBuild(user_id=user_id, build_id=build_id))
+            for _ in range(purchases_per_user):
+                purchases.append(Purchase(
+                    user_id=user_id, build_id=self.rng.choice(build_ids),
+                    status=self.rng.choices(["completed", "pending", "cancelled"], [70, 25, 5])[0],
+                ))
+        SavedBuild.objects.bulk_create(saved, batch_size=self.batch_size)
+        Purchase.objects.bulk_create(purchases, batch_size=self.batch_size)
+        return saved + purchases
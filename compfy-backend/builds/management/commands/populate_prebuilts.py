@@ -1,6 +1,7 @@
 #builds/management/commands/populate_prebuilts.py
 from django.core.management.base import BaseCommand
 from builds.models import Component, Build
+from builds.services import configuration_fingerprint
 
 PC_BUILDS = [
     # ---------------- OFFICE / STUDY — Casual (20) ----------------
@@ -3985,12 +3986,15 @@ class Command(BaseCommand):
                 },
             )
 
+            component_ids = {}
             for comp_type in ["cpu", "gpu", "ram", "psu", "motherboard", "storage", "case"]:
                 comp_name = build_data.get(comp_type)
                 if comp_name and comp_name != "skip":
                     component, _ = Component.objects.get_or_create(type=comp_type, name=comp_name)
                     build.components.add(component)
+                    component_ids[comp_type] = component.id
 
+            build.config_fingerprint = configuration_fingerprint(component_ids)
             build.save()
             self.stdout.write(self.style.SUCCESS(f"✔ {title} [{build.category}/{build.intensity}]"))
 
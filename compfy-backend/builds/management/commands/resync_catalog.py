@@ -0,0 +1,91 @@
+#builds/management/commands/resync_catalog.py
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+
+from builds.models import Build
+from builds.resync import init_worker, resync_vendor
+from builds.utils import delete_vendorless_builds
+from vendors.models import VendorBuild
+
+
+def _ids(value):
+    return [int(vendor_id) for vendor_id in value.split(",") if vendor_id]
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the whole vendor catalog, e.g. after changing categorization rules. Vendors are "
+        "partitioned across a pool of worker processes, largest first; each syncs its vendors in bulk "
+        "under the vendor's sync lock, on its own database connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+        parser.add_argument("--vendors", type=_ids, help="Comma-separated vendor ids to resync instead of all")
+
+    def handle(self, *args, **options):
+        sizes = VendorBuild.objects.values("vendor_id").annotate(n=Count("id"))
+        if options["vendors"]:
+            sizes = sizes.filter(vendor_id__in=options["vendors"])
+        sizes = {row["vendor_id"]: row["n"] for row in sizes}
+        # Vendors with no vendor builds left still need their catalog builds removed
+        leftover = Build.objects.filter(source="vendor", vendor__isnull=False).exclude(vendor_id__in=list(sizes))
+        if options["vendors"]:
+            leftover = leftover.filter(vendor_id__in=options["vendors"])
+        for vendor_id in leftover.values_list("vendor_id", flat=True).distinct():
+            sizes[vendor_id] = 0
+
+        # Largest first, so one big vendor doesn't start last and hold up the run
+        vendor_ids = sorted(sizes, key=lambda vendor_id: -sizes[vendor_id])
+        workers = max(1, min(options["workers"], len(vendor_ids)))
+        self.stdout.write(f"🔄 Resyncing {len(vendor_ids)} vendors ({sum(sizes.values())} vendor builds) with {workers} workers")
+
+        started = time.perf_counter()
+        totals = {"synced": 0, "changed": 0, "deleted": 0, "coalesced": 0}
+        failed = []
+        if workers == 1:
+            self._collect(map(resync_vendor, vendor_ids), len(vendor_ids), totals, failed, options["verbosity"])
+        else:
+            # Forked workers must not share the parent's open connections
+            connections.close_all()
+            with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+                results = pool.imap_unordered(resync_vendor, vendor_ids)
+                self._collect(results, len(vendor_ids), totals, failed, options["verbosity"])
+
+        if not options["vendors"]:
+            totals["deleted"] += delete_vendorless_builds(None)
+
+        elapsed = time.perf_counter() - started
+        if failed:
+            raise CommandError(
+                f"{len(failed)} vendors failed: " + ", ".join(str(vendor_id) for vendor_id, _ in failed)
+                + "\n" + failed[0][1]
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Resynced {totals['synced']} vendor builds in {elapsed:.1f}s "
+            f"({totals['synced'] / elapsed if elapsed else 0:.0f}/s): {totals['changed']} changed, "
+            f"{totals['deleted']} deleted, {totals['coalesced']} vendors handed to a sync already running"
+        ))
+
+    def _collect(self, results, total, totals, failed, verbosity):
+        """Fold worker results into `totals` as they arrive, reporting progress"""
+        step = max(1, total // 10)
+        for done, (vendor_id, counts, seconds, error) in enumerate(results, start=1):
+            if error:
+                failed.append((vendor_id, error))
+                self.stderr.write(f"❌ Vendor {vendor_id} failed after {seconds:.1f}s")
+            else:
+                for key in totals:
+                    totals[key] += counts[key]
+            if verbosity >= 2 and not error:
+                self.stdout.write(
+                    f"   [{done}/{total}] vendor {vendor_id}: {counts['synced']} synced, "
+                    f"{counts['changed']} changed, {counts['deleted']} deleted in {seconds:.1f}s"
+                )
+            elif done % step == 0 or done == total:
+                self.stdout.write(f"   [{done}/{total}] vendors done")
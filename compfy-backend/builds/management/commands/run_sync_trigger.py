@@ -0,0 +1,41 @@
+#builds/management/commands/run_sync_trigger.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from builds import trigger
+
+logger = logging.getLogger("compfy.sync")
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply the VendorBuild change outbox to the catalog: each vendor is synced once after "
+        "SYNC_QUIET_SECONDS without new changes, or SYNC_MAX_DELAY_SECONDS after the oldest one. "
+        "Needed when SYNC_QUIET_SECONDS is set; with the default of 0 changes are applied as they commit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0.5, help="Seconds between checks for due vendors")
+        parser.add_argument("--once", action="store_true", help="Sync whatever is due now and exit")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            try:
+                synced = trigger.run_due()
+            except Exception:
+                # e.g. the database is briefly unreachable; this is the only process applying the outbox
+                logger.exception("Checking for due vendors failed; retrying")
+                synced = {}
+            for vendor_id, counts in synced.items():
+                if options["verbosity"] >= 1:
+                    self.stdout.write(
+                        f"🔄 Vendor {vendor_id}: {counts['synced']} synced, {counts['changed']} changed, "
+                        f"{counts['deleted']} deleted"
+                    )
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:18
+
+import hashlib
+
+from django.db import migrations, models
+
+FINGERPRINT_TYPES = ("cpu", "gpu", "ram", "storage", "psu")
+
+
+def backfill_fingerprints(apps, schema_editor):
+    # Same hashing as builds.services.configuration_fingerprint
+    Build = apps.get_model("builds", "Build")
+    for build in Build.objects.prefetch_related("components").iterator(chunk_size=1000):
+        ids = {c.type: c.id for c in build.components.all()}
+        if not any(ids.get(t) for t in FINGERPRINT_TYPES):
+            continue
+        parts = [f"{t}:{ids.get(t) or ''}" for t in FINGERPRINT_TYPES]
+        build.config_fingerprint = hashlib.sha256("|".join(parts).encode()).hexdigest()
+        build.save(update_fields=["config_fingerprint"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builds', '0001_initial'),
+        ('vendors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='build',
+            name='config_fingerprint',
+            field=models.CharField(blank=True, default='', help_text='Hash of the canonical CPU/GPU/RAM/storage/PSU component ids', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='build',
+            index=models.Index(fields=['config_fingerprint', 'price'], name='build_config_price_idx'),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_vendor_builds(apps, schema_editor):
+    """
+    Concurrent syncs could create more than one Build for a vendor build.
+    Keep the oldest, move purchases and saves onto it, drop the rest.
+    """
+    Build = apps.get_model("builds", "Build")
+    SavedBuild = apps.get_model("builds", "SavedBuild")
+    Purchase = apps.get_model("builds", "Purchase")
+    duplicates = (
+        Build.objects.filter(vendor_build_id__isnull=False)
+        .values("source", "vendor_build_id").annotate(n=Count("id"), keep=Min("id")).filter(n__gt=1)
+    )
+    for group in duplicates.iterator():
+        extra = list(
+            Build.objects.filter(source=group["source"], vendor_build_id=group["vendor_build_id"])
+            .exclude(id=group["keep"]).values_list("id", flat=True)
+        )
+        Purchase.objects.filter(build_id__in=extra).update(build_id=group["keep"])
+        saved_by = set(SavedBuild.objects.filter(build_id=group["keep"]).values_list("user_id", flat=True))
+        for saved in SavedBuild.objects.filter(build_id__in=extra).order_by("id"):
+            if saved.user_id in saved_by:
+                saved.delete()
+            else:
+                saved.build_id = group["keep"]
+                saved.save(update_fields=["build"])
+                saved_by.add(saved.user_id)
+        Build.components.through.objects.filter(build_id__in=extra).delete()
+        Build.objects.filter(id__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builds', '0002_build_config_fingerprint'),
+        ('vendors', '0003_vendorbuild_vendor_title_uniq'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_vendor_builds, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='build',
+            name='vendor_build_id',
+            field=models.IntegerField(blank=True, help_text='Links to VendorBuild.id for sync tracking', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='build',
+            index=models.Index(fields=['category', 'intensity', 'price'], name='build_browse_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='build',
+            constraint=models.UniqueConstraint(fields=('source', 'vendor_build_id'), name='build_source_vendor_build_uniq'),
+        ),
+    ]
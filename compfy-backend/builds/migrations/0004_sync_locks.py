@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builds', '0003_build_lookup_indexes'),
+        ('vendors', '0003_vendorbuild_vendor_title_uniq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncLock',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sync_lock', serialize=False, to='vendors.vendor')),
+                ('owner', models.CharField(blank=True, default='', max_length=32)),
+                ('heartbeat', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PendingSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vendor_build_id', models.IntegerField(blank=True, null=True)),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_syncs', to='vendors.vendor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('vendor', 'vendor_build_id'), name='pendingsync_vendor_build_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builds', '0004_sync_locks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='synclock',
+            name='synced_at',
+            field=models.DateTimeField(blank=True, help_text='When the last sync drained the queue', null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:59
+
+from django.db import migrations, models
+
+
+def seed_change_feed(apps, schema_editor):
+    """Start the feed with every existing build, so reading it from 0 yields the whole catalog"""
+    Build = apps.get_model("builds", "Build")
+    BuildChange = apps.get_model("builds", "BuildChange")
+    build_ids = list(Build.objects.order_by("id").values_list("id", flat=True))
+    BuildChange.objects.bulk_create([BuildChange(build_id=build_id, op="upsert") for build_id in build_ids], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builds', '0005_sync_trigger_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuildChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('build_id', models.IntegerField(unique=True)),
+                ('op', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(seed_change_feed, migrations.RunPython.noop),
+    ]
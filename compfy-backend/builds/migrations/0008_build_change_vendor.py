@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:01
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_vendor_ids(apps, schema_editor):
+    Build = apps.get_model("builds", "Build")
+    BuildChange = apps.get_model("builds", "BuildChange")
+    BuildChange.objects.filter(op="upsert").update(
+        vendor_id=Subquery(Build.objects.filter(id=OuterRef("build_id")).values("vendor_id")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builds', '0007_build_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buildchange',
+            name='vendor_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_vendor_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:55
+
+from django.db import migrations, models
+
+
+def create_feed_lock(apps, schema_editor):
+    apps.get_model("builds", "ChangeFeedLock").objects.get_or_create(id=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builds', '0008_build_change_vendor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeedLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UnpublishedChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('build_id', models.IntegerField()),
+                ('vendor_id', models.IntegerField(blank=True, null=True)),
+                ('op', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+            ],
+        ),
+        migrations.RunPython(create_feed_lock, migrations.RunPython.noop),
+    ]
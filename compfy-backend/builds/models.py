@@ -1,5 +1,9 @@
 # builds/models.py
-from django.db import models
+import contextlib
+import contextvars
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from vendors.models import Vendor
 from django.conf import settings
@@ -49,6 +53,85 @@ class Component(models.Model):
         return f"{self.type.upper()} - {self.name}"
 
 
+# -------------------- Change feed --------------------
+# Build ids touched while a queryset delete cascades, recorded in one go at the end
+_pending_changes = contextvars.ContextVar("build_pending_changes", default=None)
+
+
+def record_changes(pairs, op):
+    """
+    Queue (vendor_id, build_id) pairs for the head of the change feed; call
+    inside the write's transaction. They get their sequence numbers once it
+    commits (builds/changes.py publish()).
+    """
+    from .changes import publish
+
+    vendor_for = {build_id: vendor_id for vendor_id, build_id in pairs if build_id is not None}
+    if not vendor_for:
+        return
+    pending = _pending_changes.get()
+    if pending is not None:
+        pending.update({build_id: (vendor_id, op) for build_id, vendor_id in vendor_for.items()})
+        return
+    UnpublishedChange.objects.bulk_create(
+        [UnpublishedChange(build_id=build_id, vendor_id=vendor_id, op=op) for build_id, vendor_id in vendor_for.items()],
+        batch_size=500,
+    )
+    # A failed publish leaves the rows for the next one instead of failing the committed write
+    transaction.on_commit(publish, robust=True)
+
+
+@contextlib.contextmanager
+def _collect_changes():
+    if _pending_changes.get() is not None:
+        yield
+        return
+    changes = {}
+    token = _pending_changes.set(changes)
+    try:
+        yield
+    finally:
+        _pending_changes.reset(token)
+    for op in ("upsert", "delete"):
+        record_changes([(vendor_id, build_id) for build_id, (vendor_id, change) in changes.items() if change == op], op)
+
+
+class BuildQuerySet(models.QuerySet):
+    """Bulk writes that bypass save() still move the builds they touch to the head of the change feed"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            pairs = [(obj.vendor_id, obj.pk) for obj in objs if obj.pk is not None]
+            # Backends without RETURNING (MySQL) leave pk unset; vendor builds can be found again
+            missing = [obj.vendor_build_id for obj in objs if obj.pk is None and obj.vendor_build_id is not None]
+            for start in range(0, len(missing), 500):
+                pairs += self.model._base_manager.using(self.db).filter(
+                    source="vendor", vendor_build_id__in=missing[start:start + 500],
+                ).values_list("vendor_id", "id")
+            record_changes(pairs, "upsert")
+        return objs
+
+    def update(self, **kwargs):
+        # bulk_update() goes through here too
+        with transaction.atomic(using=self.db):
+            pairs = list(self.values_list("vendor_id", "id"))
+            rows = super().update(**kwargs)
+            if "vendor" in kwargs or "vendor_id" in kwargs:
+                # Route the change to the builds' new vendor
+                pairs = list(self.model._base_manager.using(self.db).filter(
+                    id__in=[build_id for _, build_id in pairs],
+                ).values_list("vendor_id", "id"))
+            record_changes(pairs, "upsert")
+        return rows
+
+    def delete(self):
+        # The post_delete receiver records each row; collect them into one write
+        with transaction.atomic(using=self.db), _collect_changes():
+            return super().delete()
+
+
 class Build(models.Model):
     SOURCE_CHOICES = (
         ("system", "System Generated"),
@@ -75,17 +158,83 @@ class Build(models.Model):
         Vendor, on_delete=models.SET_NULL, null=True, blank=True, related_name="provided_builds"
     )
     vendor_build_id = models.IntegerField(
-        null=True, blank=True, db_index=True, help_text="Links to VendorBuild.id for sync tracking"
+        null=True, blank=True, help_text="Links to VendorBuild.id for sync tracking"
     )
     components = models.ManyToManyField(Component, blank=True)
+    config_fingerprint = models.CharField(
+        max_length=64, blank=True, default="", help_text="Hash of the canonical CPU/GPU/RAM/storage/PSU component ids"
+    )
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     is_deleted = models.BooleanField(default=False)
 
+    objects = BuildQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Covers the GROUP BY fingerprint with MIN/MAX(price)
+            models.Index(fields=["config_fingerprint", "price"], name="build_config_price_idx"),
+            # Catalog browsing by category, intensity and price range
+            models.Index(fields=["category", "intensity", "price"], name="build_browse_idx"),
+        ]
+        constraints = [
+            # One catalog build per vendor build; also the index sync looks builds up by
+            models.UniqueConstraint(fields=["source", "vendor_build_id"], name="build_source_vendor_build_uniq"),
+        ]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            record_changes([(self.vendor_id, self.pk)], "upsert")
+
     def __str__(self):
         return f"{self.title} ({self.category} - {self.intensity})"
 
 
+class BuildChange(models.Model):
+    """
+    The latest change to one catalog build, numbered by `seq`. Every
+    committed write gives the build a new, higher number, so reading rows
+    after a sequence number yields exactly the builds changed since (see
+    builds/changes.py). A deleted build keeps its row as a tombstone. Plain
+    ids rather than foreign keys, so the row outlives the build and its vendor.
+    """
+    OP_CHOICES = (
+        ("upsert", "Created or updated"),
+        ("delete", "Deleted"),
+    )
+
+    seq = models.BigAutoField(primary_key=True)
+    build_id = models.IntegerField(unique=True)
+    vendor_id = models.IntegerField(null=True, blank=True)
+    op = models.CharField(max_length=10, choices=OP_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.seq}: {self.op} build {self.build_id}"
+
+
+class UnpublishedChange(models.Model):
+    """A build change written with its transaction, waiting for a sequence number in BuildChange"""
+    build_id = models.IntegerField()
+    vendor_id = models.IntegerField(null=True, blank=True)
+    op = models.CharField(max_length=10, choices=BuildChange.OP_CHOICES)
+
+    def __str__(self):
+        return f"Unpublished {self.op} of build {self.build_id}"
+
+
+class ChangeFeedLock(models.Model):
+    """The single row change feed publishers lock in turn, so sequence numbers follow commit order"""
+    published_at = models.DateTimeField(null=True, blank=True)
+
+
+@receiver(post_delete, sender=Build)
+def record_build_delete(sender, instance, **kwargs):
+    # Runs inside the deleting transaction, for instance, queryset and cascade deletes alike
+    record_changes([(instance.vendor_id, instance.pk)], "delete")
+
+
 class Purchase(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="purchases")
     build = models.ForeignKey(Build, on_delete=models.CASCADE, related_name="purchases")
@@ -94,3 +243,33 @@ class Purchase(models.Model):
 
     def __str__(self):
         return f"{self.user.username} purchased {self.build.title}"
+
+
+class SyncLock(models.Model):
+    """
+    A vendor's catalog sync lock (see builds/locks.py). `owner` is empty
+    while no sync runs; `heartbeat` lets a crashed holder's lock expire.
+    `synced_at` feeds the dashboard's sync status (builds/trigger.py).
+    """
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE, primary_key=True, related_name="sync_lock")
+    owner = models.CharField(max_length=32, blank=True, default="")
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    synced_at = models.DateTimeField(null=True, blank=True, help_text="When the last sync drained the queue")
+
+    def __str__(self):
+        return f"Sync lock for vendor {self.vendor_id} ({self.owner or 'free'})"
+
+
+class PendingSync(models.Model):
+    """A VendorBuild id waiting for its vendor's sync; a null id means the whole vendor"""
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name="pending_syncs")
+    vendor_build_id = models.IntegerField(null=True, blank=True)
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["vendor", "vendor_build_id"], name="pendingsync_vendor_build_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Pending sync of {self.vendor_build_id or 'all builds'} for vendor {self.vendor_id}"
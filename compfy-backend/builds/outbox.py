@@ -0,0 +1,85 @@
+# builds/outbox.py
+"""
+Consumer for the VendorBuild change outbox (vendors.models.VendorBuildChange).
+
+Every VendorBuild write records its ids in the outbox inside the writing
+transaction, so no write path can leave the catalog behind. consume()
+reads the outbox in id order, batch by batch, and hands each vendor's
+ids to sync_vendor_builds (which runs under the vendor's sync lock)
+before deleting the rows it applied. Rows left by a deleted vendor
+remove its catalog builds, which the delete left without a vendor.
+
+Write paths that want the catalog updated before they respond call
+flush(vendor_id). Everything else is flushed on commit, or, with a
+debounce window, waits for `run_sync_trigger`, which consumes vendors
+once they are due (see builds/trigger.py).
+"""
+
+from django.conf import settings
+from django.db import transaction
+
+from vendors.models import Vendor, VendorBuildChange, vendor_builds_changed
+
+
+def _apply(rows):
+    """Sync the builds named by outbox rows, vendor by vendor in first-change order, then drop the rows"""
+    from .utils import sync_vendor_builds
+
+    by_vendor = {}
+    for row_id, vendor_id, build_id in rows:
+        by_vendor.setdefault(vendor_id, set()).add(build_id)
+    existing = set(Vendor.objects.filter(id__in=list(by_vendor)).values_list("id", flat=True))
+
+    counts = {}
+    for vendor_id, build_ids in by_vendor.items():
+        if vendor_id in existing:
+            counts[vendor_id] = sync_vendor_builds(vendor_build_ids=sorted(build_ids), vendor=vendor_id)
+        else:
+            # A deleted vendor has no lock to sync under; its catalog builds are vendorless now
+            counts[vendor_id] = sync_vendor_builds(vendor_build_ids=sorted(build_ids))
+    row_ids = [row_id for row_id, _, _ in rows]
+    for start in range(0, len(row_ids), 500):
+        VendorBuildChange.objects.filter(id__in=row_ids[start:start + 500]).delete()
+    return counts
+
+
+def consume(vendor_ids=None, batch_size=500, max_batches=None):
+    """
+    Apply outbox rows oldest first in batches of `batch_size`, optionally
+    only for `vendor_ids`. Returns {vendor id: summed sync counts}.
+    """
+    changes = VendorBuildChange.objects.order_by("id")
+    if vendor_ids is not None:
+        changes = changes.filter(vendor_id__in=list(vendor_ids))
+
+    totals, batches = {}, 0
+    while max_batches is None or batches < max_batches:
+        rows = list(changes.values_list("id", "vendor_id", "vendor_build_id")[:batch_size])
+        if not rows:
+            break
+        for vendor_id, counts in _apply(rows).items():
+            total = totals.setdefault(vendor_id, dict.fromkeys(counts, 0))
+            for key, value in counts.items():
+                total[key] += value
+        batches += 1
+    return totals
+
+
+def flush(vendor_id):
+    """Apply everything in the outbox for one vendor now"""
+    return consume(vendor_ids=[vendor_id]).get(vendor_id)
+
+
+def pending_count(vendor_id):
+    return VendorBuildChange.objects.filter(vendor_id=vendor_id).count()
+
+
+def _flush_on_commit(sender, vendor_ids, **kwargs):
+    # Without a debounce window (the default) apply the change as soon as it commits
+    if getattr(settings, "SYNC_QUIET_SECONDS", 0):
+        return
+    for vendor_id in vendor_ids:
+        transaction.on_commit(lambda vendor_id=vendor_id: flush(vendor_id))
+
+
+vendor_builds_changed.connect(_flush_on_commit, dispatch_uid="builds.outbox.flush_on_commit")
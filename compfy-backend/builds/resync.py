@@ -0,0 +1,35 @@
+# builds/resync.py
+"""
+Process-pool workers for `manage.py resync_catalog`.
+
+Nothing here imports models at module level: with the spawn/forkserver
+start methods a worker imports this module before Django is set up, and
+init_worker sets it up. Each worker process opens its own database
+connection on first use.
+"""
+
+import contextlib
+import io
+import time
+import traceback
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def resync_vendor(vendor_id):
+    """
+    Sync one vendor's whole catalog under its lock. Returns
+    (vendor_id, counts, seconds, error); error is a traceback string or None.
+    """
+    from builds.utils import sync_vendor_builds
+
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            counts = sync_vendor_builds(vendor=vendor_id)
+        return vendor_id, counts, time.perf_counter() - started, None
+    except Exception:
+        return vendor_id, None, time.perf_counter() - started, traceback.format_exc()
@@ -1,7 +1,87 @@
 #builds/services.py
-from django.db.models import Q
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Exists, OuterRef, Q
+from rest_framework.exceptions import ValidationError
 from .models import Build, Component
 from decimal import Decimal
+import hashlib
+
+FINGERPRINT_TYPES = ("cpu", "gpu", "ram", "storage", "psu")
+
+def configuration_fingerprint(component_ids_by_type):
+    """
+    Hash of the canonical component ids that define a configuration.
+    Builds sharing CPU/GPU/RAM/storage/PSU get the same fingerprint whatever their title.
+    """
+    parts = [f"{t}:{component_ids_by_type.get(t) or ''}" for t in FINGERPRINT_TYPES]
+    if not any(component_ids_by_type.get(t) for t in FINGERPRINT_TYPES):
+        return ""
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+CATALOG_FILTERS = {
+    "category": "category",
+    "intensity": "intensity",
+    "source": "source",
+    "vendor": "vendor_id",
+    "min_price": "price__gte",
+    "max_price": "price__lte",
+}
+
+def filter_catalog(queryset, params):
+    """Apply the public catalog filters (category, intensity, source, vendor, min/max price) from query params"""
+    lookups = {lookup: params[key] for key, lookup in CATALOG_FILTERS.items() if params.get(key)}
+    try:
+        return queryset.filter(**lookups)
+    except (ValueError, DjangoValidationError):
+        raise ValidationError({"error": "Invalid filter value"})
+
+def catalog_builds():
+    """The public catalog with what the read endpoints serialize"""
+    return Build.objects.select_related("vendor").prefetch_related("components")
+
+
+def page_bounds(params, default_limit=20, max_limit=100):
+    """(limit, offset) from query params; raises ValueError for non-integers"""
+    limit = min(max(int(params.get("limit", default_limit)), 1), max_limit)
+    offset = max(int(params.get("offset", 0)), 0)
+    return limit, offset
+
+
+def search_catalog(queryset, params):
+    """
+    Catalog builds whose title or a component name contains every word of
+    ?q= (case-insensitive), narrowed by the catalog filters
+    """
+    builds = filter_catalog(queryset, params)
+    parts = Build.components.through.objects.filter(build_id=OuterRef("id"))
+    for word in params.get("q", "").split()[:8]:
+        builds = builds.filter(Q(title__icontains=word) | Exists(parts.filter(component__name__icontains=word)))
+    return builds.order_by("price", "id")
+
+
+def facet_queries(builds):
+    """The grouped counts behind catalog facets; evaluate them and pass the rows to format_facets"""
+    return {
+        "category": builds.values_list("category").annotate(n=Count("id")).order_by("category"),
+        "intensity": builds.values_list("intensity").annotate(n=Count("id")).order_by("intensity"),
+        "vendor": (
+            builds.filter(vendor__isnull=False).values_list("vendor_id", "vendor__shop_name")
+            .annotate(n=Count("id")).order_by("-n", "vendor_id")
+        ),
+    }
+
+
+def format_facets(rows, prices):
+    """Facet response from facet_queries' rows and a {"min", "max"} price aggregate"""
+    labels = {"category": dict(Build.CATEGORY_CHOICES), "intensity": dict(Build.INTENSITY_CHOICES)}
+    facets = {
+        name: [{"id": value, "name": labels[name].get(value, value), "count": n} for value, n in rows[name]]
+        for name in ("category", "intensity")
+    }
+    facets["vendor"] = [{"id": vendor_id, "shopName": shop_name, "count": n} for vendor_id, shop_name, n in rows["vendor"]]
+    facets["price"] = {key: None if value is None else str(value) for key, value in prices.items()}
+    return facets
+
 
 def detect_build_category(components):
     """Detect category from components"""
@@ -0,0 +1,359 @@
+# builds/similarity.py
+import logging
+import math
+import re
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from compfy import metrics
+
+from .changes import latest_seq
+from .models import Build, BuildChange
+
+logger = logging.getLogger("compfy.cache")
+
+# A longer change feed backlog than this is caught up on by reloading everything
+MAX_CATCH_UP = 5000
+
+# Width of a partition's price band, in units of the price feature (about 15% in price)
+PRICE_BAND = 0.01
+
+CATEGORIES = [choice for choice, _ in Build.CATEGORY_CHOICES]
+
+# price, cpu tier, gpu tier, ram, storage, one slot per category
+N_FEATURES = 5 + len(CATEGORIES)
+
+# Fixed scales so a vector never depends on the rest of the catalog.
+# That is what lets sync update single rows without renormalizing.
+MAX_LOG_PRICE = math.log1p(2_000_000)
+MAX_TIER = 10.0
+MAX_LOG_RAM = math.log2(1 + 256)
+MAX_LOG_STORAGE = math.log2(1 + 16_384)
+CATEGORY_WEIGHT = 0.5
+
+
+# -------------------- Feature extraction --------------------
+CPU_FAMILIES = [
+    (re.compile(r"threadripper"), 9.0),
+    (re.compile(r"xeon"), 7.0),
+    (re.compile(r"\bi9\b|ryzen\s*9"), 8.0),
+    (re.compile(r"\bi7\b|ryzen\s*7"), 6.5),
+    (re.compile(r"\bi5\b|ryzen\s*5"), 5.0),
+    (re.compile(r"\bi3\b|ryzen\s*3"), 3.5),
+    (re.compile(r"pentium|athlon"), 2.0),
+    (re.compile(r"celeron"), 1.0),
+]
+INTEL_MODEL = re.compile(r"\bi[3579][\s-]*(\d{4,5})")
+RYZEN_MODEL = re.compile(r"ryzen\s*[3579]\s*(\d)\d{3}")
+
+GPU_MODEL = re.compile(r"\b(rtx|gtx|gt|rx|hd)\s*(\d{3,4})")
+CAPACITY = re.compile(r"(?:(\d+)\s*x\s*)?(\d+(?:\.\d+)?)\s*(tb|gb)")
+
+
+def cpu_tier(name):
+    """Rough 0-10 performance tier for a CPU name"""
+    name = (name or "").lower()
+    tier = 4.0
+    for pattern, value in CPU_FAMILIES:
+        if pattern.search(name):
+            tier = value
+            break
+
+    # Newer generations within a family get up to one extra point
+    intel = INTEL_MODEL.search(name)
+    ryzen = RYZEN_MODEL.search(name)
+    if intel:
+        model = intel.group(1)
+        generation = int(model[:2]) if len(model) == 5 else int(model[0])
+        tier += min(generation, 14) / 14
+    elif ryzen:
+        tier += min(int(ryzen.group(1)), 9) / 9
+    return min(tier, MAX_TIER)
+
+
+def gpu_tier(name):
+    """Rough 0-10 performance tier for a GPU name, 0 for integrated graphics"""
+    name = (name or "").lower()
+    if not name or "integrated" in name:
+        return 0.0
+    if "quadro" in name or "rtx a" in name or "firepro" in name:
+        return 7.0
+
+    match = GPU_MODEL.search(name)
+    if not match:
+        return 3.0
+    family, model = match.group(1), match.group(2)
+    # Last two digits of the model number are the class (50, 60, 70 ...)
+    level = int(model[-2:]) / 100
+    if family == "rtx":
+        tier = 5.0 + level * 5
+    elif family == "rx":
+        tier = 3.0 + level * 6
+    elif family == "gtx":
+        tier = 2.0 + level * 4
+    else:
+        tier = 1.0 + level * 2
+    return min(tier, MAX_TIER)
+
+
+def capacity_gb(text):
+    """Total capacity in GB from strings like '16GB DDR4', '2x8GB' or '1TB HDD + 256GB SSD'"""
+    total = 0.0
+    for count, size, unit in CAPACITY.findall((text or "").lower()):
+        value = float(size) * (1024 if unit == "tb" else 1)
+        total += value * (int(count) if count else 1)
+    return total
+
+
+def build_features(build):
+    """Normalized feature vector for a build with its components prefetched"""
+    parts = {c.type: c.name for c in build.components.all()}
+
+    vector = np.zeros(N_FEATURES, dtype=np.float32)
+    vector[0] = math.log1p(float(build.price)) / MAX_LOG_PRICE
+    vector[1] = cpu_tier(parts.get("cpu")) / MAX_TIER
+    vector[2] = gpu_tier(parts.get("gpu")) / MAX_TIER
+    vector[3] = math.log2(1 + capacity_gb(parts.get("ram"))) / MAX_LOG_RAM
+    vector[4] = math.log2(1 + capacity_gb(parts.get("storage"))) / MAX_LOG_STORAGE
+    if build.category in CATEGORIES:
+        vector[5 + CATEGORIES.index(build.category)] = CATEGORY_WEIGHT
+    return vector
+
+
+# -------------------- Index --------------------
+def _partition_key(vector):
+    hot = np.flatnonzero(vector[5:])
+    return (int(hot[0]) if len(hot) else -1, int(vector[0] / PRICE_BAND))
+
+
+def _lower_bound(query, query_key, key):
+    """Smallest squared distance from `query` to anything that can be in partition `key`"""
+    bound = 0.0
+    if key[0] != query_key[0]:
+        # Different one-hot slots differ by CATEGORY_WEIGHT in one or both of them
+        bound += CATEGORY_WEIGHT ** 2 * ((key[0] != -1) + (query_key[0] != -1))
+    low = key[1] * PRICE_BAND
+    gap = max(low - query[0], query[0] - (low + PRICE_BAND), 0.0)
+    return bound + gap * gap
+
+
+class _Partition:
+    """
+    The vectors of one partition in a contiguous float32 array, with parallel
+    arrays of build ids and vendor ids; `rows` maps a build id to its row.
+    Removing a row moves the last row into its slot so the live rows stay
+    contiguous.
+    """
+
+    def __init__(self):
+        self.vectors = np.zeros((0, N_FEATURES), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.vendor_ids = np.zeros(0, dtype=np.int64)
+        self.rows = {}
+        self.size = 0
+
+    def _reserve(self, size):
+        if size <= len(self.ids):
+            return
+        capacity = max(size, len(self.ids) * 2, 64)
+        vectors = np.zeros((capacity, N_FEATURES), dtype=np.float32)
+        ids = np.zeros(capacity, dtype=np.int64)
+        vendor_ids = np.zeros(capacity, dtype=np.int64)
+        vectors[:self.size] = self.vectors[:self.size]
+        ids[:self.size] = self.ids[:self.size]
+        vendor_ids[:self.size] = self.vendor_ids[:self.size]
+        self.vectors, self.ids, self.vendor_ids = vectors, ids, vendor_ids
+
+    def put(self, build_id, vendor_id, vector):
+        row = self.rows.get(build_id)
+        if row is None:
+            self._reserve(self.size + 1)
+            row = self.size
+            self.size += 1
+            self.rows[build_id] = row
+        self.vectors[row] = vector
+        self.ids[row] = build_id
+        self.vendor_ids[row] = vendor_id or -1
+
+    def remove(self, build_id):
+        row = self.rows.pop(build_id)
+        last = self.size - 1
+        if row != last:
+            moved_id = int(self.ids[last])
+            self.vectors[row] = self.vectors[last]
+            self.ids[row] = moved_id
+            self.vendor_ids[row] = self.vendor_ids[last]
+            self.rows[moved_id] = row
+        self.size = last
+
+    def nearest(self, query, build_id, vendor_id, k):
+        """Squared distances and ids of up to k candidate rows closest to `query`"""
+        distances = np.square(self.vectors[:self.size] - query).sum(axis=1)
+        ids = self.ids[:self.size]
+        vendor_ids = self.vendor_ids[:self.size]
+        excluded = (vendor_ids == -1) | (ids == build_id)
+        if vendor_id != -1:
+            excluded |= vendor_ids == vendor_id
+        distances, ids = distances[~excluded], ids[~excluded]
+        if len(ids) > k:
+            nearest = np.argpartition(distances, k - 1)[:k]
+            distances, ids = distances[nearest], ids[nearest]
+        return distances, ids
+
+
+class SimilarityIndex:
+    """
+    In-process exact nearest-neighbour index over build feature vectors.
+
+    Builds are partitioned by category and by a PRICE_BAND-wide band of the
+    price feature. A query scans its own partition first, then the others in
+    order of the smallest distance anything in them could have, and stops
+    once that bound is past the k-th best match so far. Results are the same
+    as a scan of the whole catalog. With generate_load_data's 100k builds a
+    query takes about 0.3 ms against 7 ms for a full scan; the pruning only
+    works while builds cluster, and on evenly spread vectors it is closer to
+    2 ms. A build whose neighbours are all its own vendor's keeps widening
+    the search until it finds k others.
+
+    Loading the catalog takes seconds, so it happens on a background thread,
+    started when a gunicorn worker boots (gunicorn.conf.py) or by the first
+    query; until it is done similar() returns None. After that the index
+    follows the catalog change feed (builds/changes.py), checking
+    latest_seq() at most every SIMILARITY_CHECK_SECONDS, so syncs in any
+    process reach it without a reload.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loader = None
+        self._partitions = {}
+        self._where = {}
+        self._cursor = None
+        self._checked = 0.0
+
+    def _queryset(self):
+        return Build.objects.only("id", "price", "category", "vendor_id").prefetch_related("components")
+
+    def _put(self, build):
+        self._remove(build.id)
+        vector = build_features(build)
+        key = _partition_key(vector)
+        self._partitions.setdefault(key, _Partition()).put(build.id, build.vendor_id, vector)
+        self._where[build.id] = key
+
+    def _remove(self, build_id):
+        key = self._where.pop(build_id, None)
+        if key is None:
+            return
+        partition = self._partitions[key]
+        partition.remove(build_id)
+        if not partition.size:
+            del self._partitions[key]
+
+    @property
+    def loaded(self):
+        return self._cursor is not None
+
+    def rebuild(self):
+        """Load every build from the database, then swap the result in"""
+        # Read before the builds, so anything written meanwhile is applied again by the next catch-up
+        cursor = latest_seq()
+        fresh = SimilarityIndex()
+        for build in fresh._queryset().iterator(chunk_size=2000):
+            fresh._put(build)
+        with self._lock:
+            self._partitions, self._where = fresh._partitions, fresh._where
+            self._cursor, self._checked = cursor, time.monotonic()
+
+    def ensure_loading(self):
+        """Start a background rebuild unless one is already running"""
+        with self._load_lock:
+            if self._loader is None or not self._loader.is_alive():
+                self._loader = threading.Thread(target=self._load, name="similarity-index", daemon=True)
+                self._loader.start()
+
+    def _load(self):
+        try:
+            close_old_connections()
+            started = time.monotonic()
+            self.rebuild()
+            logger.info("Loaded the similarity index: %d builds in %.1fs", len(self._where), time.monotonic() - started)
+        except Exception:
+            logger.exception("Loading the similarity index failed")
+        finally:
+            connection.close()
+
+    def catch_up(self):
+        """Apply the change feed since the last load or catch-up"""
+        cursor = latest_seq()
+        changes = BuildChange.objects.filter(seq__gt=self._cursor, seq__lte=cursor).values_list("build_id", "op")
+        changes = list(changes[:MAX_CATCH_UP + 1])
+        if len(changes) > MAX_CATCH_UP:
+            # Keep answering from the current state while a reload runs
+            self.ensure_loading()
+            return
+
+        upserted = {build_id for build_id, op in changes if op == "upsert"}
+        loaded = list(self._queryset().filter(id__in=upserted)) if upserted else []
+        with self._lock:
+            for build_id, op in changes:
+                if op == "delete":
+                    self._remove(build_id)
+            for build in loaded:
+                self._put(build)
+            for build_id in upserted - {build.id for build in loaded}:
+                self._remove(build_id)  # deleted again since its upsert
+            self._cursor = max(self._cursor, cursor)
+
+    def _ensure_current(self):
+        """False while the index is still loading; otherwise catches up if the check is due"""
+        if not self.loaded:
+            self.ensure_loading()
+            return False
+        now = time.monotonic()
+        if now - self._checked < getattr(settings, "SIMILARITY_CHECK_SECONDS", 1):
+            metrics.observe_cache("similarity_index", True)
+            return True
+        self._checked = now
+        current = latest_seq() == self._cursor
+        metrics.observe_cache("similarity_index", current)
+        if not current and not (self._loader and self._loader.is_alive()):
+            self.catch_up()
+        return True
+
+    def similar(self, build_id, k=5):
+        """
+        Ids of the k builds closest to `build_id`, nearest first, or None
+        while the index is loading. Builds from the same vendor and builds
+        without a vendor are skipped.
+        """
+        if not self._ensure_current():
+            return None
+        with self._lock:
+            key = self._where.get(build_id)
+            if key is None:
+                return []
+            partition = self._partitions[key]
+            row = partition.rows[build_id]
+            query, vendor_id = partition.vectors[row].copy(), int(partition.vendor_ids[row])
+
+            bounds = sorted((_lower_bound(query, key, other), other) for other in self._partitions)
+            distances = np.zeros(0, dtype=np.float32)
+            ids = np.zeros(0, dtype=np.int64)
+            for bound, other in bounds:
+                if len(ids) >= k and bound > distances[k - 1]:
+                    break
+                found, found_ids = self._partitions[other].nearest(query, build_id, vendor_id, k)
+                distances = np.concatenate([distances, found])
+                ids = np.concatenate([ids, found_ids])
+                order = np.argsort(distances, kind="stable")[:k]
+                distances, ids = distances[order], ids[order]
+            return [int(i) for i in ids]
+
+
+similarity_index = SimilarityIndex()
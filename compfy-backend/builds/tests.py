@@ -1,3 +1,850 @@
-from django.test import TestCase
+import asyncio
+import csv
+import functools
+import io
+import random
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from builds import catalog_cache, changes, live, outbox, trigger
+from builds.models import Build, BuildChange, Component, PendingSync, Purchase, SavedBuild, SyncLock, UnpublishedChange
+from builds.similarity import SimilarityIndex, build_features, similarity_index
+from builds.utils import sync_vendor_builds
+from builds.views import BuildExportView
+from compfy import db
+from inventory.models import InventoryItem
+from utils.explain import assert_no_full_scan, assert_uses_index, used_indexes
+from utils.querybudget import QueryBudget
+from utils.services.export import EXPORT_FORMATS, iterate_in_chunks
+from utils.testing import generate_catalog
+from vendors.models import Vendor, VendorBuild, VendorBuildChange
+
+
+def catalog_snapshot():
+    """Everything sync writes for vendor builds, comparable across runs"""
+    return sorted(
+        (b.vendor_build_id, b.title, b.description, b.price, b.category, b.intensity, b.config_fingerprint,
+         b.vendor_id, tuple(sorted(b.components.values_list("id", "type", "name", "specs"))))
+        for b in Build.objects.filter(source="vendor")
+    )
+
+
+def clear_catalog():
+    Build.components.through.objects.all().delete()
+    Build.objects.all().delete()
+
+
+# -------------------- Query budgets --------------------
+class CatalogQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog()
+        cls.build = Build.objects.first()
+
+    def setUp(self):
+        cache.clear()  # budgets are about the queries behind a cache miss
+
+    def test_build_list_queries_do_not_grow_with_the_catalog(self):
+        with QueryBudget(2, label="build list") as budget:
+            response = self.client.get("/api/builds/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 60)
+        self.assertEqual(budget.repeated, [])
+
+    def test_build_detail_within_budget(self):
+        with QueryBudget(2, label="build detail"):
+            response = self.client.get(f"/api/builds/{self.build.id}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_configuration_groups_within_budget(self):
+        with QueryBudget(4, label="configurations"):
+            response = self.client.get("/api/builds/configurations/")
+        self.assertEqual(response.status_code, 200)
+
+
+# -------------------- Query plans --------------------
+class CatalogQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog()
+        cls.build = Build.objects.exclude(vendor=None).first()
+
+    def test_sync_lookup_by_vendor_build_id_uses_index(self):
+        # Served by the (source, vendor_build_id) unique constraint, which SQLite names sqlite_autoindex_*
+        lookup = Build.objects.filter(source="vendor", vendor_build_id=self.build.vendor_build_id)
+        self.assertTrue(used_indexes(lookup))
+        assert_no_full_scan(lookup)
+
+    def test_browse_filter_uses_browse_index(self):
+        browse = Build.objects.filter(category="gaming", intensity="heavy", price__gte=50000, price__lte=150000)
+        assert_uses_index(browse, "build_browse_idx")
+
+    def test_sync_orphan_scan_uses_vendor_index(self):
+        orphans = Build.objects.filter(source="vendor", vendor=self.build.vendor_id).exclude(vendor_build_id__in=[0])
+        assert_uses_index(orphans, "vendor_id")
+
+    def test_configuration_offer_lookup_uses_fingerprint_index(self):
+        assert_uses_index(
+            Build.objects.filter(config_fingerprint=self.build.config_fingerprint, price=self.build.price),
+            "build_config_price_idx",
+        )
+
+
+# -------------------- Configuration groups --------------------
+class ConfigurationGroupsTests(TestCase):
+    """The same parts listed by several vendors under different titles form one group"""
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=3, builds_per_vendor=3, no_catalog=True)
+        firsts, seconds = zip(*(
+            VendorBuild.objects.filter(vendor=vendor).order_by("id")[:2] for vendor in Vendor.objects.order_by("id")
+        ))
+        cls.shared = cls.share_parts(firsts, "Test A", [Decimal("91000"), Decimal("85000"), Decimal("99000")])
+        # A tie for the cheapest price goes to the first listed build
+        cls.tied = cls.share_parts(seconds[:2], "Test B", [Decimal("40000"), Decimal("40000")])
+        sync_vendor_builds()
+
+    @staticmethod
+    def share_parts(vendor_builds, tag, prices):
+        parts = {part: f"{tag} {part}" for part in ("cpu", "gpu", "ram", "storage", "psu", "case")}
+        for vb, price in zip(vendor_builds, prices):
+            VendorBuild.objects.filter(id=vb.id).update(price=price, **parts)
+        return [vb.id for vb in vendor_builds]
+
+    def groups(self, **params):
+        response = self.client.get("/api/builds/configurations/", {"min_offers": 2, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def catalog_build(self, vendor_build_id):
+        return Build.objects.get(source="vendor", vendor_build_id=vendor_build_id)
+
+    def test_group_reports_offers_prices_and_cheapest_offer(self):
+        fingerprint = self.catalog_build(self.shared[0]).config_fingerprint
+        self.assertEqual({self.catalog_build(vb_id).config_fingerprint for vb_id in self.shared}, {fingerprint})
+
+        group = next(g for g in self.groups()["results"] if g["fingerprint"] == fingerprint)
+        self.assertEqual(group["offerCount"], 3)
+        self.assertEqual((Decimal(str(group["minPrice"])), Decimal(str(group["maxPrice"]))), (85000, 99000))
+        self.assertEqual(Decimal(str(group["priceSpread"])), 14000)
+        self.assertEqual(group["cheapestOffer"]["id"], self.catalog_build(self.shared[1]).id)
+
+    def test_groups_are_ordered_by_cheapest_price(self):
+        result = self.groups()
+        prices = [Decimal(str(group["minPrice"])) for group in result["results"]]
+        self.assertEqual(prices, sorted(prices))
+        self.assertEqual(result["count"], len(result["results"]))
+        self.assertTrue(all(group["offerCount"] >= 2 for group in result["results"]))
+
+        fingerprints = [group["fingerprint"] for group in result["results"]]
+        tied, shared = (self.catalog_build(ids[0]).config_fingerprint for ids in (self.tied, self.shared))
+        self.assertLess(fingerprints.index(tied), fingerprints.index(shared))
+
+        group = result["results"][fingerprints.index(tied)]
+        self.assertEqual(group["priceSpread"], 0)
+        self.assertEqual(group["cheapestOffer"]["id"], min(self.catalog_build(vb_id).id for vb_id in self.tied))
+
+    def test_single_offers_are_left_out_by_min_offers(self):
+        everything = self.groups(min_offers=1)
+        fingerprints = Build.objects.exclude(config_fingerprint="").values("config_fingerprint")
+        self.assertEqual(everything["count"], fingerprints.distinct().count())
+        self.assertLess(self.groups()["count"], everything["count"])
+        self.assertEqual(self.client.get("/api/builds/configurations/", {"limit": "x"}).status_code, 400)
+
+
+# -------------------- Concurrent sync --------------------
+def concurrent_writes_unsupported():
+    """Why worker threads can't write to the test database concurrently, or None if they can"""
+    if connection.vendor != "sqlite":
+        return None
+    if connection.is_in_memory_db():
+        return "needs a file-backed test database (DATABASES['default']['TEST']['NAME'])"
+    if connection.settings_dict["OPTIONS"].get("transaction_mode") != "IMMEDIATE":
+        return "needs OPTIONS {'transaction_mode': 'IMMEDIATE'} on SQLite (see builds/locks.py)"
+    return None
+
+
+@override_settings(SYNC_QUIET_SECONDS=2)  # syncs are started explicitly here, not on commit
+class ConcurrentSyncTests(TransactionTestCase):
+    """
+    Overlapping syncs from many threads must converge on exactly one
+    up-to-date build per vendor build. Runs on MySQL, or on SQLite with a
+    file-backed test database in IMMEDIATE transaction mode; skipped with
+    the reason otherwise.
+    """
+
+    threads = 8
+    rounds = 6
+
+    def setUp(self):
+        reason = concurrent_writes_unsupported()
+        if reason:
+            self.skipTest(reason)
+        generate_catalog(vendors=3, builds_per_vendor=20, no_catalog=True)
+        self.vendor_builds = {}
+        for vendor_id, build_id in VendorBuild.objects.values_list("vendor_id", "id"):
+            self.vendor_builds.setdefault(vendor_id, []).append(build_id)
+
+    def edit_and_sync(self, seed, errors):
+        rng = random.Random(seed)
+        try:
+            for _ in range(self.rounds):
+                vendor_id = rng.choice(list(self.vendor_builds))
+                ids = rng.sample(self.vendor_builds[vendor_id], 8)
+                VendorBuild.objects.filter(id__in=ids[1:]).update(price=F("price") + 100)
+                if rng.random() < 0.3:
+                    VendorBuild.objects.filter(id=ids[0]).delete()
+                sync_vendor_builds(vendor_build_ids=ids)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    def test_concurrent_syncs_coalesce_without_losing_updates(self):
+        errors = []
+        workers = [threading.Thread(target=self.edit_and_sync, args=(seed, errors)) for seed in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+
+        # Ids never touched by a worker are synced here too
+        sync_vendor_builds()
+        stored = {vb.id: vb for vb in VendorBuild.objects.all()}
+        catalog = Build.objects.filter(source="vendor")
+        self.assertEqual(catalog.count(), len(stored))
+        for build in catalog:
+            vb = stored[build.vendor_build_id]
+            self.assertEqual((build.title, build.price, build.vendor_id), (vb.title, vb.price, vb.vendor_id))
+        self.assertFalse(PendingSync.objects.exists())
+        self.assertFalse(SyncLock.objects.exclude(owner="").exists())
+
+    def test_sync_for_a_locked_vendor_is_queued_for_the_holder(self):
+        vendor_id, ids = next(iter(self.vendor_builds.items()))
+        SyncLock.objects.create(vendor_id=vendor_id, owner="someone-else", heartbeat=timezone.now())
+
+        counts = sync_vendor_builds(vendor_build_ids=ids[:3])
+        self.assertEqual(counts["coalesced"], 1)
+        self.assertFalse(Build.objects.filter(vendor_build_id__in=ids[:3]).exists())
+        self.assertEqual(set(PendingSync.objects.values_list("vendor_build_id", flat=True)), set(ids[:3]))
+
+        # Once the holder is gone the next sync drains the queue
+        SyncLock.objects.filter(vendor_id=vendor_id).update(owner="")
+        sync_vendor_builds(vendor_build_ids=ids[3:4])
+        self.assertEqual(Build.objects.filter(vendor_build_id__in=ids[:4]).count(), 4)
+        self.assertFalse(PendingSync.objects.exists())
+
+
+# -------------------- Bulk and parallel resync --------------------
+class BulkSyncTests(TestCase):
+    def test_whole_vendor_bulk_sync_matches_row_by_row_sync(self):
+        generate_catalog(vendors=1, builds_per_vendor=40, no_catalog=True)
+        # A prebuilt part by the same name but other specs must not be linked in place of sync's own
+        Component.objects.create(type="gpu", name="GeForce RTX 4090", specs=None)
+        vendor_builds = VendorBuild.objects.order_by("id")
+        vendor_id = vendor_builds[0].vendor_id
+        sync_vendor_builds(vendor=vendor_id)
+
+        # Price, part and title edits plus a delete, applied by the bulk path to an existing catalog
+        first = list(vendor_builds[:8])
+        VendorBuild.objects.filter(id__in=[vb.id for vb in first[:3]]).update(price=F("price") + 60000)
+        VendorBuild.objects.filter(id__in=[vb.id for vb in first[3:5]]).update(gpu="GeForce RTX 4090")
+        VendorBuild.objects.filter(id=first[5].id).update(title=first[5].title + " (refurbished)")
+        VendorBuild.objects.filter(id=first[7].id).update(description="Now with a warranty")
+        VendorBuild.objects.filter(id=first[6].id).delete()
+        counts = sync_vendor_builds(vendor=vendor_id)
+        self.assertEqual((counts["changed"], counts["deleted"]), (7, 1))
+        bulk = catalog_snapshot()
+
+        clear_catalog()
+        sync_vendor_builds(vendor_build_ids=list(vendor_builds.values_list("id", flat=True)))
+        self.assertEqual(catalog_snapshot(), bulk)
+
+
+class ResyncCatalogTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("worker processes need a database they can open")
+        generate_catalog(vendors=4, builds_per_vendor=25, no_catalog=True)
+
+    def test_parallel_resync_matches_a_single_process_run(self):
+        call_command("resync_catalog", workers=1, stdout=io.StringIO())
+        expected = catalog_snapshot()
+        self.assertEqual(len(expected), 100)
+
+        clear_catalog()
+        call_command("resync_catalog", workers=3, stdout=io.StringIO())
+        self.assertEqual(catalog_snapshot(), expected)
+        self.assertFalse(SyncLock.objects.exclude(owner="").exists())
+
+
+# -------------------- Load data generator --------------------
+class GenerateLoadDataTests(TestCase):
+    def generate(self, **options):
+        options = {"vendors": 2, "builds_per_vendor": 5, "users": 3, "saved_per_user": 2, "purchases_per_user": 1,
+                   **options}
+        call_command("generate_load_data", stdout=io.StringIO(), **options)
+
+    def vendor_builds(self):
+        return list(
+            VendorBuild.objects.order_by("vendor__user__username", "title")
+            .values_list("vendor__user__username", "title", "price", "cpu", "gpu", "ram", "storage", "psu", "case")
+        )
+
+    def test_creates_the_requested_rows(self):
+        self.generate()
+        self.assertEqual(Vendor.objects.count(), 2)
+        self.assertEqual(VendorBuild.objects.count(), 10)
+        self.assertEqual(InventoryItem.objects.count(), 10)
+        self.assertEqual(Build.objects.filter(source="vendor").count(), 10)
+        self.assertEqual(User.objects.filter(username__startswith="loadgen-user-").count(), 3)
+        self.assertEqual((SavedBuild.objects.count(), Purchase.objects.count()), (6, 3))
+        self.assertFalse(VendorBuildChange.objects.exists())
+
+    def test_catalog_is_what_sync_would_write(self):
+        self.generate()
+        generated = catalog_snapshot()
+        counts = sync_vendor_builds()
+        self.assertEqual((counts["changed"], counts["deleted"]), (0, 0))
+        self.assertEqual(catalog_snapshot(), generated)
+
+    def test_same_seed_gives_the_same_data(self):
+        self.generate(seed=7)
+        first = self.vendor_builds()
+        self.generate(seed=7, clear=True)
+        self.assertEqual(self.vendor_builds(), first)
+        self.assertEqual(Vendor.objects.count(), 2)
+
+        self.generate(seed=8, clear=True)
+        self.assertNotEqual(self.vendor_builds(), first)
+
+    def test_existing_data_needs_clear(self):
+        self.generate(users=0)
+        with self.assertRaises(CommandError):
+            self.generate(users=0)
+
+    def test_no_catalog_leaves_the_catalog_to_sync(self):
+        self.generate(users=0, no_catalog=True)
+        self.assertFalse(Build.objects.exists())
+        self.assertEqual(VendorBuildChange.objects.count(), 10)
+
+
+# -------------------- Change outbox --------------------
+class OutboxConsumerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=2, builds_per_vendor=10)
+
+    def setUp(self):
+        VendorBuildChange.objects.all().delete()
+
+    def test_consume_applies_changes_in_batches_and_empties_the_outbox(self):
+        first, second = (VendorBuild.objects.filter(vendor=vendor).order_by("id") for vendor in Vendor.objects.all()[:2])
+        first.filter(id__in=list(first.values_list("id", flat=True)[:4])).update(price=F("price") + 500)
+        gone = second[0]
+        gone.delete()
+        changed = list(first[:4])
+
+        totals = outbox.consume(batch_size=2)
+        self.assertEqual(set(totals), {gone.vendor_id, changed[0].vendor_id})
+        self.assertFalse(VendorBuildChange.objects.exists())
+        self.assertFalse(Build.objects.filter(vendor_build_id=gone.id).exists())
+        for vb in changed:
+            self.assertEqual(Build.objects.get(source="vendor", vendor_build_id=vb.id).price, vb.price)
+
+    def test_failing_vendor_does_not_hold_up_the_others(self):
+        first, second = Vendor.objects.all()[:2]
+        VendorBuild.objects.filter(vendor__in=[first, second]).update(price=F("price") + 500)
+        sync = outbox._apply
+
+        def fail_first(rows):
+            if rows[0][1] == first.id:
+                raise OperationalError("deadlock")
+            return sync(rows)
+
+        with mock.patch("builds.outbox._apply", side_effect=fail_first), self.assertLogs("compfy.sync", "ERROR"):
+            synced = trigger.run_due(timezone.now() + timedelta(seconds=60))
+        self.assertEqual(set(synced), {second.id})
+        self.assertEqual(set(VendorBuildChange.objects.values_list("vendor_id", flat=True)), {first.id})
+
+    def test_flush_only_applies_one_vendor(self):
+        first, second = Vendor.objects.all()[:2]
+        VendorBuild.objects.filter(vendor__in=[first, second]).update(price=F("price") + 500)
+        outbox.flush(first.id)
+        self.assertEqual(set(VendorBuildChange.objects.values_list("vendor_id", flat=True)), {second.id})
+
+
+class VendorDeletionTests(TransactionTestCase):
+    """Deleting a vendor commits, so its outbox rows are flushed on commit for a vendor that is gone"""
+
+    def setUp(self):
+        generate_catalog(vendors=2, builds_per_vendor=5)
+        self.vendor, self.other = Vendor.objects.order_by("id")
+        self.vendor_id = self.vendor.id
+        self.vendor_build_ids = list(VendorBuild.objects.filter(vendor=self.vendor).values_list("id", flat=True))
+
+    def assert_vendor_gone(self):
+        self.assertFalse(Build.objects.filter(vendor_build_id__in=self.vendor_build_ids).exists())
+        self.assertFalse(VendorBuildChange.objects.exists())
+        self.assertFalse(PendingSync.objects.exists())
+        self.assertEqual(Build.objects.filter(source="vendor", vendor=self.other).count(), 5)
+
+    def test_deleting_a_vendor_removes_its_catalog_builds(self):
+        self.vendor.delete()
+        self.assert_vendor_gone()
+
+    def test_deleting_the_vendors_user_removes_its_catalog_builds(self):
+        self.vendor.user.delete()
+        self.assert_vendor_gone()
+
+    @override_settings(SYNC_QUIET_SECONDS=2)
+    def test_debounced_changes_of_a_deleted_vendor_are_consumed(self):
+        self.vendor.delete()
+        self.assertEqual(trigger.run_due(timezone.now() + timedelta(seconds=60)).keys(), {self.vendor_id})
+        self.assert_vendor_gone()
+
+
+# -------------------- Change feed --------------------
+class ChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=1, builds_per_vendor=6)
+        changes.publish()  # on commit, which test data never reaches
+
+    def feed(self, since=0, **params):
+        response = self.client.get("/api/builds/changes/", {"since": since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_reading_from_zero_yields_the_whole_catalog(self):
+        page = self.feed()
+        self.assertEqual(sorted(change["id"] for change in page["changes"]), sorted(Build.objects.values_list("id", flat=True)))
+        self.assertEqual(page["next"], BuildChange.objects.latest("seq").seq)
+        self.assertFalse(page["hasMore"])
+
+    def test_only_builds_changed_after_the_cursor_are_returned(self):
+        cursor = self.feed()["next"]
+        repriced, deleted = Build.objects.order_by("id")[:2]
+        deleted_id = deleted.id
+        Build.objects.filter(id=repriced.id).update(price=F("price") + 100)
+        deleted.delete()
+        changes.publish()
+
+        page = self.feed(cursor)
+        self.assertEqual([(c["op"], c["id"]) for c in page["changes"]], [("upsert", repriced.id), ("delete", deleted_id)])
+        self.assertEqual(page["changes"][0]["build"]["totalCost"], str(repriced.price + 100))
+        self.assertEqual(self.feed(page["next"])["changes"], [])
+        # A fresh copy never sees the tombstone
+        self.assertNotIn(deleted_id, [c["id"] for c in self.feed()["changes"]])
+
+    def test_each_build_keeps_one_row_at_its_latest_change(self):
+        build = Build.objects.first()
+        for _ in range(3):
+            build.save()
+        changes.publish()
+        self.assertEqual(BuildChange.objects.filter(build_id=build.id).count(), 1)
+        self.assertEqual(BuildChange.objects.get(build_id=build.id).seq, BuildChange.objects.latest("seq").seq)
+
+    def test_sync_deletes_leave_tombstones(self):
+        vendor_build = VendorBuild.objects.first()
+        build_id = Build.objects.get(source="vendor", vendor_build_id=vendor_build.id).id
+        vendor_build.delete()
+        outbox.consume()
+        changes.publish()
+        self.assertEqual(BuildChange.objects.get(build_id=build_id).op, "delete")
+
+    def test_pages_resume_from_next(self):
+        seen, since = [], 0
+        while True:
+            page = self.feed(since, limit=4)
+            seen += [c["id"] for c in page["changes"]]
+            since = page["next"]
+            if not page["hasMore"]:
+                break
+        self.assertEqual(sorted(seen), sorted(Build.objects.values_list("id", flat=True)))
+
+    def test_changes_are_numbered_when_published(self):
+        cursor = self.feed()["next"]
+        first, second = Build.objects.order_by("id")[:2]
+        first.save()
+        self.assertEqual(self.feed(cursor)["changes"], [])  # still uncommitted, as far as readers know
+
+        self.assertEqual(changes.publish(), 1)
+        second.save()
+        changes.publish()
+        page = self.feed(cursor)
+        self.assertEqual([c["id"] for c in page["changes"]], [first.id, second.id])
+        self.assertGreater(page["changes"][0]["seq"], cursor)
+        self.assertFalse(UnpublishedChange.objects.exists())
+        self.assertEqual(changes.publish(), 0)
+
+    def test_rejects_bad_cursor(self):
+        self.assertEqual(self.client.get("/api/builds/changes/?since=abc").status_code, 400)
+
+
+# -------------------- Live updates --------------------
+class LiveUpdatesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=2, builds_per_vendor=3)
+        changes.publish()
+        cls.build = Build.objects.filter(source="vendor").order_by("id").first()
+        cls.other = Build.objects.filter(source="vendor").exclude(vendor=cls.build.vendor).first()
+
+    def setUp(self):
+        self.addCleanup(live.bridge.stop)
+
+    def reprice(self, build, amount=100):
+        Build.objects.filter(id=build.id).update(price=F("price") + amount)
+        changes.publish()
+        return Build.objects.get(id=build.id).price
+
+    async def next_event(self, subscription):
+        _, event = await asyncio.wait_for(subscription.queue.get(), 1)
+        return event
+
+    async def test_bridge_publishes_feed_changes_to_matching_topics(self):
+        by_build = live.broker.subscribe([f"build:{self.build.id}"])
+        by_vendor = live.broker.subscribe([f"vendor:{self.other.vendor_id}"])
+        try:
+            bridge = live.FeedBridge(live.broker)
+            await sync_to_async(bridge.poll_once)()
+            price = await sync_to_async(self.reprice)(self.build)
+            other_id = self.other.id
+            await sync_to_async(self.other.delete)()
+            await sync_to_async(changes.publish)()
+            self.assertEqual(await sync_to_async(bridge.poll_once)(), 2)
+
+            event = await self.next_event(by_build)
+            self.assertIn(f'"id": {self.build.id}, "op": "upsert", "price": "{price}", "available": true', event)
+            self.assertTrue(by_build.queue.empty())
+            event = await self.next_event(by_vendor)
+            self.assertIn(f'"id": {other_id}, "op": "delete", "price": null, "available": false', event)
+        finally:
+            live.broker.unsubscribe(by_build)
+            live.broker.unsubscribe(by_vendor)
+        self.assertFalse(live.broker.has_subscribers())
+
+    async def test_slow_stream_is_told_to_resync(self):
+        subscription = live.Subscription(["catalog"], asyncio.get_running_loop(), size=2)
+        for seq in range(1, 4):
+            subscription.deliver((seq, f"id: {seq}\n\n"))
+        self.assertIs(await subscription.queue.get(), live.RESYNC)
+
+    async def test_stream_replays_after_last_event_id_then_goes_live(self):
+        cursor = await sync_to_async(lambda: BuildChange.objects.latest("seq").seq)()
+        price = await sync_to_async(self.reprice)(self.build)
+        await sync_to_async(self.reprice)(self.other)
+
+        response = await self.async_client.get(
+            "/api/builds/live/", {"ids": str(self.build.id)}, headers={"Last-Event-ID": str(cursor)},
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = response.streaming_content
+        self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+        replayed = (await anext(chunks)).decode()
+        self.assertIn(f'"id": {self.build.id}', replayed)
+        self.assertIn(f'"price": "{price}"', replayed)
+
+        live.broker.publish([([f"build:{self.build.id}"], {"seq": 10**9, "id": self.build.id})])
+        self.assertTrue((await asyncio.wait_for(anext(chunks), 1)).startswith(b"id: 1000000000\n"))
+
+        # A disconnect cancels the pending read, which must drop the subscription
+        waiting = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertFalse(live.broker.has_subscribers())
+
+    def test_streams_need_asgi(self):
+        self.assertEqual(self.client.get("/api/builds/live/").status_code, 501)
+        self.assertEqual(self.client.get("/api/builds/live/?ids=x").status_code, 400)
+
+
+# -------------------- Catalog export --------------------
+class CatalogExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=2, builds_per_vendor=5)
+        cls.vendor = Vendor.objects.order_by("id").first()
+
+    def export(self, file_format, status=200, **params):
+        response = self.client.get(f"/api/builds/export/{file_format}/", params)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def rows(self, response):
+        return list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+
+    def test_csv_has_a_row_per_catalog_build(self):
+        response = self.export("csv")
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="compfy-catalog.csv"')
+
+        rows = self.rows(response)
+        self.assertEqual(rows[0], BuildExportView.HEADER)
+        self.assertEqual(sorted(int(row[0]) for row in rows[1:]), sorted(Build.objects.values_list("id", flat=True)))
+        build = Build.objects.get(id=rows[1][0])
+        self.assertEqual(rows[1][5], build.components.get(type="cpu").name)
+
+    def test_xlsx_has_a_row_per_catalog_build(self):
+        response = self.export("xlsx")
+        self.assertEqual(response["Content-Type"], EXPORT_FORMATS["xlsx"])
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as workbook:
+            self.assertEqual(workbook.read("xl/worksheets/sheet1.xml").count(b"<row>"), Build.objects.count() + 1)
+
+    def test_catalog_filters_pass_through(self):
+        rows = self.rows(self.export("csv", vendor=self.vendor.id, max_price=150000))
+        expected = Build.objects.filter(vendor=self.vendor, price__lte=150000).values_list("id", flat=True)
+        self.assertEqual(sorted(int(row[0]) for row in rows[1:]), sorted(expected))
+        self.export("csv", status=400, min_price="cheap")
+
+    def test_builds_are_read_in_chunks_as_the_response_is_consumed(self):
+        with mock.patch("builds.views.iterate_in_chunks", functools.partial(iterate_in_chunks, chunk_size=4)):
+            with CaptureQueriesContext(connection) as queries:
+                content = iter(self.export("csv").streaming_content)
+                next(content)  # the header goes out before the catalog is read
+                self.assertEqual(len(queries), 0)
+                rows = list(content)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(len(queries), 2 * 3 + 1)  # each chunk of 4 and its components, then the empty chunk
+
+
+# -------------------- Async catalog reads --------------------
+class AsyncCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=2, builds_per_vendor=10)
+        cls.build = Build.objects.filter(source="vendor").order_by("id").first()
+        cls.word = cls.build.components.get(type="cpu").name.split()[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, path, params=None, status=200):
+        response = self.client.get(path, params or {})
+        self.assertEqual(response.status_code, status, response.content[:300])
+        return response.json()
+
+    def test_async_endpoints_return_what_the_sync_ones_do(self):
+        for path, params in [
+            ("", {"category": self.build.category}),
+            (f"{self.build.id}/", {}),
+            ("search/", {"q": self.word, "limit": 5}),
+            ("facets/", {"max_price": 200000}),
+        ]:
+            with self.subTest(path=path):
+                expected = self.get(f"/api/builds/{path}", params)
+                cache.clear()
+                self.assertEqual(self.get(f"/api/builds/async/{path}", params), expected)
+
+    def test_search_matches_titles_and_components(self):
+        found = self.get("/api/builds/async/search/", {"q": self.word.upper(), "limit": 100})
+        self.assertIn(self.build.id, [build["id"] for build in found["results"]])
+        self.assertEqual(found["count"], len(found["results"]))
+        self.assertEqual(self.get("/api/builds/async/search/", {"q": "no-such-part"})["count"], 0)
+
+    def test_facet_counts_add_up(self):
+        facets = self.get("/api/builds/async/facets/")
+        total = Build.objects.count()
+        for name in ("category", "intensity"):
+            self.assertEqual(sum(value["count"] for value in facets[name]), total)
+        self.assertEqual(len(facets["vendor"]), 2)
+
+    def test_cache_is_shared_and_invalidated_by_writes(self):
+        self.get("/api/builds/")
+        with self.assertNumQueries(0):
+            self.get("/api/builds/async/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Build.objects.filter(id=self.build.id).update(price=F("price") + 1)
+        listed = {build["id"]: build["totalCost"] for build in self.get("/api/builds/async/")}
+        self.assertEqual(listed[self.build.id], str(self.build.price + 1))
+
+    def test_errors_match_the_sync_views(self):
+        self.assertEqual(self.get("/api/builds/async/", {"max_price": "cheap"}, status=400), {"error": "Invalid filter value"})
+        self.get("/api/builds/async/0/", status=404)
+        self.get("/api/builds/async/search/", {"limit": "many"}, status=400)
+
+    async def test_served_by_the_asgi_handler(self):
+        response = await self.async_client.get("/api/builds/async/search/", {"q": self.word})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.json()["count"], 0)
+
+
+@override_settings(
+    DATABASE_ROUTERS=["compfy.db.CatalogReplicaRouter"], REPLICA_MAX_LAG_SECONDS=5, REPLICA_CHECK_SECONDS=60,
+)
+class ReplicaRouterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=1, builds_per_vendor=5)
+
+    def setUp(self):
+        cache.clear()
+        db.replica_status.clear()
+        self.addCleanup(db.replica_status.clear)
+        token = db._primary_until.set(0.0)  # writes made while setting up pin this thread to the primary
+        self.addCleanup(db._primary_until.reset, token)
+        self.router = db.CatalogReplicaRouter()
+        self.lag = self.patch("compfy.db.replica_lag", return_value=0.5)
+
+    def patch(self, target, **kwargs):
+        patcher = mock.patch(target, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_settings_helpers(self):
+        primary = {"ENGINE": "django.db.backends.mysql", "NAME": "compfy", "HOST": "db-1"}
+        replica = db.persistent(db.replica_of(primary, HOST="db-2"), max_age=60)
+        self.assertEqual(replica["HOST"], "db-2")
+        self.assertEqual(replica["TEST"], {"MIRROR": "default"})
+        self.assertEqual((replica["CONN_MAX_AGE"], replica["CONN_HEALTH_CHECKS"]), (60, True))
+        # Tests run with the replica mirroring the primary, so there is nothing separate to read from
+        self.assertIsNone(db.replica_alias())
+
+    def test_catalog_reads_use_the_replica_only_where_allowed(self):
+        self.patch("compfy.db.replica_alias", return_value="replica")
+        self.assertIsNone(self.router.db_for_read(Build))
+        with db.replica_allowed():
+            self.assertEqual(self.router.db_for_read(Build), "replica")
+            self.assertEqual(self.router.db_for_read(Vendor), "replica")
+            self.assertIsNone(self.router.db_for_read(SavedBuild))
+            self.assertIsNone(self.router.db_for_read(BuildChange))
+        self.assertFalse(self.router.allow_migrate("replica", "builds"))
+        self.assertEqual(self.lag.call_count, 1)  # measured once per REPLICA_CHECK_SECONDS
+
+    def test_writes_pin_reads_to_the_primary(self):
+        self.patch("compfy.db.replica_alias", return_value="replica")
+        with db.replica_allowed():
+            self.assertEqual(self.router.db_for_write(Build), "default")
+            self.assertIsNone(self.router.db_for_read(Build))
+            with override_settings(REPLICA_MAX_LAG_SECONDS=0):
+                self.lag.return_value = 0.0
+                self.router.db_for_write(Build)
+                self.assertEqual(self.router.db_for_read(Build), "replica")
+
+    def test_lagging_or_unreachable_replica_falls_back_to_the_primary(self):
+        self.patch("compfy.db.replica_alias", return_value="replica")
+        for outcome in (None, OperationalError("connection refused")):
+            with self.subTest(outcome=outcome):
+                db.replica_status.clear()
+                self.lag.return_value, self.lag.side_effect = 30.0, outcome
+                with db.replica_allowed():
+                    self.assertIsNone(self.router.db_for_read(Build))
+        self.assertEqual(db.replica_status.describe("replica")["error"], "connection refused")
+
+    def test_marked_views_allow_replica_reads_on_get(self):
+        # The replica is read under the primary's alias here, so the queries work while routing is exercised
+        self.patch("compfy.db.replica_alias", return_value="default")
+        self.client.get("/api/builds/changes/")
+        self.lag.assert_not_called()
+        for path in ("/api/builds/search/", "/api/builds/async/search/"):
+            with self.subTest(path=path):
+                db.replica_status.clear()
+                self.assertEqual(self.client.get(path, {"q": "a"}).status_code, 200)
+                self.lag.assert_called_with("default")
+
+    @override_settings(REPLICA_CHECK_SECONDS=5, CATALOG_CACHE_SECONDS=60)
+    def test_responses_cached_right_after_a_write_expire_with_the_replica_window(self):
+        self.patch("compfy.db.replica_alias", return_value="replica")
+        catalog_cache.bump_version()
+        state = cache.get_many([catalog_cache.CATALOG_CACHE_VERSION_KEY, catalog_cache.CATALOG_CACHE_BUMPED_KEY])
+        self.assertLessEqual(catalog_cache._timeout(state), 10)
+        state[catalog_cache.CATALOG_CACHE_BUMPED_KEY] = time.time() - 10
+        self.assertEqual(catalog_cache._timeout(state), 60)
+
+
+class SimilarBuildsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=3, builds_per_vendor=10)
+        cls.build = Build.objects.order_by("id").first()
+
+    def setUp(self):
+        cache.clear()
+        similarity_index.rebuild()  # drop state left by other tests' rolled-back catalogs
+
+    def distance(self, build_id, target_id=None):
+        builds = Build.objects.prefetch_related("components")
+        target = builds.get(id=target_id or self.build.id)
+        return float(((build_features(builds.get(id=build_id)) - build_features(target)) ** 2).sum())
+
+    def test_nearest_builds_from_other_vendors_first(self):
+        response = self.client.get(f"/api/builds/{self.build.id}/similar/", {"k": 5})
+        self.assertEqual(response.status_code, 200)
+        ids = [build["id"] for build in response.json()]
+        self.assertEqual(len(ids), 5)
+        self.assertFalse(Build.objects.filter(id__in=ids, vendor_id=self.build.vendor_id).exists())
+
+        distances = [self.distance(build_id) for build_id in ids]
+        self.assertEqual(distances, sorted(distances))
+        others = Build.objects.exclude(vendor_id=self.build.vendor_id).values_list("id", flat=True)
+        self.assertLessEqual(distances[-1], sorted(self.distance(build_id) for build_id in others)[4] + 1e-6)
+
+    def test_unknown_build_is_404(self):
+        self.assertEqual(self.client.get("/api/builds/0/similar/").status_code, 404)
+
+    def test_matches_a_scan_of_the_whole_catalog(self):
+        index = SimilarityIndex()
+        with mock.patch("builds.similarity.PRICE_BAND", 0.002):
+            index.rebuild()
+            self.assertGreater(len(index._partitions), 3)
+            for build in Build.objects.all():
+                others = Build.objects.exclude(vendor_id=build.vendor_id).prefetch_related("components")
+                target = build_features(Build.objects.prefetch_related("components").get(id=build.id))
+                expected = sorted(float(((build_features(other) - target) ** 2).sum()) for other in others)[:5]
+                found = [self.distance(build_id, build.id) for build_id in index.similar(build.id, k=5)]
+                self.assertEqual(len(found), 5)
+                for distance, best in zip(found, expected):
+                    self.assertAlmostEqual(distance, best, places=5)
+
+    def test_loading_index_is_503_and_loads_in_the_background(self):
+        with mock.patch.object(similarity_index, "_cursor", None), \
+                mock.patch.object(similarity_index, "ensure_loading") as ensure_loading:
+            response = self.client.get(f"/api/builds/{self.build.id}/similar/")
+        self.assertEqual(response.status_code, 503)
+        ensure_loading.assert_called_once()
+
+    def test_index_follows_writes_from_other_processes_without_reloading(self):
+        index = SimilarityIndex()
+        index.rebuild()
+        nearest = index.similar(self.build.id, k=3)
+        gone, moved = nearest[0], nearest[1]
+
+        # Another process's sync: rows change and the change feed follows on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            Build.objects.filter(id=moved).update(price=F("price") * 20)
+            Build.objects.filter(id=gone).delete()
+
+        # Between checks the index answers without touching the database
+        with override_settings(SIMILARITY_CHECK_SECONDS=60), self.assertNumQueries(0):
+            self.assertIn(gone, index.similar(self.build.id, k=3))
+
+        with override_settings(SIMILARITY_CHECK_SECONDS=0), mock.patch.object(index, "ensure_loading") as ensure_loading:
+            nearest = index.similar(self.build.id, k=3)
+        ensure_loading.assert_not_called()
+
+        self.assertNotIn(gone, nearest)
+        updated = Build.objects.prefetch_related("components").get(id=moved)
+        partition = index._partitions[index._where[moved]]
+        self.assertTrue((partition.vectors[partition.rows[moved]] == build_features(updated)).all())
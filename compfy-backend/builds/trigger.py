@@ -0,0 +1,99 @@
+# builds/trigger.py
+"""
+Debounced catalog sync for rapid dashboard edits.
+
+Every VendorBuild write lands in the change outbox (builds/outbox.py).
+By default (``settings.SYNC_QUIET_SECONDS`` = 0) each change is applied
+as soon as it commits. With a quiet window, `run_sync_trigger` (the
+`sync` process in the Procfile, which must then be running) consumes a
+vendor's outbox rows once that many seconds pass with no new changes,
+or ``settings.SYNC_MAX_DELAY_SECONDS`` (default 10) after the oldest
+one, whichever comes first.
+
+sync_status() tells the dashboard whether the public catalog has caught up.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from vendors.models import VendorBuildChange
+
+from . import outbox
+from .models import PendingSync, SyncLock
+
+logger = logging.getLogger("compfy.sync")
+
+
+def quiet_window():
+    return timedelta(seconds=getattr(settings, "SYNC_QUIET_SECONDS", 0))
+
+
+def max_delay():
+    return timedelta(seconds=getattr(settings, "SYNC_MAX_DELAY_SECONDS", 10))
+
+
+def _due_at(first, last):
+    return min(first + max_delay(), last + quiet_window())
+
+
+def due_vendors(now=None):
+    """Ids of vendors whose outbox has been quiet, or waiting, long enough; oldest first"""
+    now = now or timezone.now()
+    windows = (
+        VendorBuildChange.objects.values("vendor_id")
+        .annotate(first=Min("created_at"), last=Max("created_at"))
+        .values_list("vendor_id", "first", "last")
+    )
+    return [
+        vendor_id for vendor_id, first, last in sorted(windows, key=lambda row: row[1])
+        if _due_at(first, last) <= now
+    ]
+
+
+def run_due(now=None, batch_size=500):
+    """
+    Apply the outbox of every due vendor; returns {vendor id: sync counts}.
+    A vendor whose sync fails is logged and left in the outbox for the next
+    run, without holding up the others.
+    """
+    results = {}
+    for vendor_id in due_vendors(now):
+        try:
+            counts = outbox.consume(vendor_ids=[vendor_id], batch_size=batch_size).get(vendor_id)
+        except Exception:
+            logger.exception("Catalog sync of vendor %s failed; its changes stay in the outbox", vendor_id)
+            continue
+        if counts:
+            results[vendor_id] = counts
+    return results
+
+
+def sync_status(vendor_id, now=None):
+    """
+    Where the vendor's public catalog stands: "pending" while changes wait
+    in the outbox, "syncing" while a sync holds the lock, else "up_to_date".
+    """
+    now = now or timezone.now()
+    changes = VendorBuildChange.objects.filter(vendor_id=vendor_id).aggregate(
+        count=Count("vendor_build_id", distinct=True), first=Min("created_at"), last=Max("created_at"),
+    )
+    handed_off = PendingSync.objects.filter(vendor_id=vendor_id).count()
+    lock = SyncLock.objects.filter(vendor_id=vendor_id).first()
+    stale = now - timedelta(seconds=getattr(settings, "SYNC_STALL_SECONDS", 900))
+
+    if lock and lock.owner and lock.heartbeat and lock.heartbeat >= stale:
+        state = "syncing"
+    elif changes["count"] or handed_off:
+        state = "pending"
+    else:
+        state = "up_to_date"
+    return {
+        "status": state,
+        "pendingBuilds": changes["count"] + handed_off,
+        "dueAt": _due_at(changes["first"], changes["last"]).isoformat() if changes["count"] else None,
+        "lastSyncedAt": lock.synced_at.isoformat() if lock and lock.synced_at else None,
+    }
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BuildListView, BuildDetailView, SavedBuildView, SavedBuildsListView, PurchaseBuildView, refresh_build_categories
+from . import async_views
+from .views import BuildChangesView, BuildFacetsView, BuildSearchView, BuildListView, BuildDetailView, SimilarBuildsView, ConfigurationGroupsView, BuildExportView, SavedBuildView, SavedBuildsListView, PurchaseBuildView, build_events, refresh_build_categories
 
 router = DefaultRouter()
 router.register(r"saved-builds", SavedBuildView, basename="saved-builds")
@@ -9,6 +10,19 @@ urlpatterns = [
     # Build browsing
     path("", BuildListView.as_view(), name="build-list"),
     path("<int:pk>/", BuildDetailView.as_view(), name="build-detail"),
+    path("<int:pk>/similar/", SimilarBuildsView.as_view(), name="build-similar"),
+    path("changes/", BuildChangesView.as_view(), name="build-changes"),
+    path("live/", build_events, name="build-events"),
+    path("search/", BuildSearchView.as_view(), name="build-search"),
+    path("facets/", BuildFacetsView.as_view(), name="build-facets"),
+    path("configurations/", ConfigurationGroupsView.as_view(), name="build-configurations"),
+    path("export/<str:file_format>/", BuildExportView.as_view(), name="build-export"),
+
+    # Async variants of the catalog reads, for the ASGI app
+    path("async/", async_views.build_list, name="build-list-async"),
+    path("async/<int:pk>/", async_views.build_detail, name="build-detail-async"),
+    path("async/search/", async_views.build_search, name="build-search-async"),
+    path("async/facets/", async_views.build_facets, name="build-facets-async"),
 
     # Saved builds list (custom, only list for user)
     path("saved/", SavedBuildsListView.as_view(), name="saved-builds-list"),
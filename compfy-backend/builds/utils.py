@@ -1,18 +1,138 @@
 # builds/utils.py
 from builds.models import Build, Component
 from inventory.models import VendorBuild
+import logging
+import time
 from decimal import Decimal
+from django.db import transaction
+from django.db.models import F
+from compfy import metrics
+from . import locks
+from .services import configuration_fingerprint
 
-def sync_vendor_builds():
+logger = logging.getLogger("compfy.sync")
+
+def sync_vendor_builds(vendor_build_ids=None, vendor=None):
     """
     Sync VendorBuilds to Build table using vendor_build_id as source of truth.
     Prevents duplicates and handles updates/deletes properly.
+
+    Pass `vendor_build_ids` to sync only those rows, or `vendor` to sync one
+    vendor's builds; orphans are then only deleted within that scope.
+
+    Each vendor syncs under its own lock (builds/locks.py). If a sync for
+    the vendor is already running, the ids are queued for it and this call
+    returns without waiting, counting the vendor as "coalesced". Call it
+    outside transaction.atomic() so the running sync can see the queue.
+    """
+    started = time.perf_counter()
+    counts = {"synced": 0, "changed": 0, "deleted": 0, "coalesced": 0}
+    for vendor_id, ids in _vendor_scopes(vendor_build_ids, vendor).items():
+        if vendor_id is None:
+            counts["deleted"] += delete_vendorless_builds(ids)
+        else:
+            _sync_vendor_locked(vendor_id, ids, counts)
+
+    scope = "ids" if vendor_build_ids is not None else "vendor" if vendor is not None else "full"
+    metrics.observe_sync(scope, time.perf_counter() - started, counts)
+    return counts
+
+
+def _vendor_scopes(vendor_build_ids, vendor):
     """
+    {vendor id: ids to sync, or None for all of them}. Catalog builds whose
+    vendor was deleted are listed under None.
+    """
+    if vendor is not None:
+        vendor_id = getattr(vendor, "id", vendor)
+        return {vendor_id: None if vendor_build_ids is None else list(vendor_build_ids)}
+
+    if vendor_build_ids is None:
+        vendor_ids = set(VendorBuild.objects.values_list("vendor_id", flat=True).distinct())
+        vendor_ids |= set(
+            Build.objects.filter(source="vendor", vendor__isnull=False).values_list("vendor_id", flat=True).distinct()
+        )
+        scopes = {vendor_id: None for vendor_id in sorted(vendor_ids)}
+        scopes[None] = None
+        return scopes
+
+    # Deleted VendorBuilds are only known through their catalog build
+    scopes = {}
+    vendor_build_ids = list(vendor_build_ids)
+    for start in range(0, len(vendor_build_ids), 500):
+        chunk = vendor_build_ids[start:start + 500]
+        pairs = set(VendorBuild.objects.filter(id__in=chunk).values_list("vendor_id", "id"))
+        pairs |= set(Build.objects.filter(source="vendor", vendor_build_id__in=chunk).values_list("vendor_id", "vendor_build_id"))
+        for vendor_id, build_id in pairs:
+            scopes.setdefault(vendor_id, set()).add(build_id)
+    return {vendor_id: sorted(ids) for vendor_id, ids in scopes.items()}
+
+
+def delete_vendorless_builds(vendor_build_ids):
+    """Remove catalog builds left behind by deleted vendors"""
+    builds = Build.objects.filter(source="vendor", vendor__isnull=True)
+    if vendor_build_ids is not None:
+        builds = builds.filter(vendor_build_id__in=vendor_build_ids)
+    build_ids = list(builds.values_list("id", flat=True))
+    if build_ids:
+        delete_catalog_builds(build_ids)
+    return len(build_ids)
+
+
+def _sync_vendor_locked(vendor_id, vendor_build_ids, counts):
+    """
+    Queue the ids, then sync them under the vendor's lock, draining whatever
+    else is queued meanwhile. Returns at once if another sync holds the lock.
+    """
+    owner = locks.new_owner()
+    locks.queue(vendor_id, vendor_build_ids)
+    if not locks.acquire(vendor_id, owner):
+        counts["coalesced"] += 1
+        return
+
+    while True:
+        drained = False
+        try:
+            while True:
+                claimed = locks.claim(vendor_id)
+                if claimed == set():
+                    drained = True
+                    break
+                try:
+                    if claimed is None:
+                        result = bulk_sync_vendor(vendor_id)
+                    else:
+                        result = _sync_vendor_builds(sorted(claimed), vendor_id)
+                except Exception:
+                    locks.queue(vendor_id, claimed)  # leave them for the next sync
+                    raise
+                for key in ("synced", "changed", "deleted"):
+                    counts[key] += result[key]
+                locks.heartbeat(vendor_id, owner)
+        finally:
+            locks.release(vendor_id, owner, drained)
+        # Ids queued between the last claim and the release would otherwise wait for the next sync
+        if not locks.has_pending(vendor_id) or not locks.acquire(vendor_id, owner):
+            return
+
+
+def _sync_vendor_builds(vendor_build_ids, vendor):
     from decimal import Decimal
-    
+
     synced_vendor_build_ids = []
+    changed_build_ids = []
+
+    vendor_builds = VendorBuild.objects.select_related("vendor")
+    orphaned_builds = Build.objects.filter(source="vendor")
+    if vendor_build_ids is not None:
+        vendor_build_ids = list(vendor_build_ids)
+        vendor_builds = vendor_builds.filter(id__in=vendor_build_ids)
+        orphaned_builds = orphaned_builds.filter(vendor_build_id__in=vendor_build_ids)
+    if vendor is not None:
+        vendor_builds = vendor_builds.filter(vendor=vendor)
+        orphaned_builds = orphaned_builds.filter(vendor=vendor)
     
-    for vb in VendorBuild.objects.all():
+    for vb in vendor_builds:
         synced_vendor_build_ids.append(vb.id)
         
         # ✅ Find or create Build using vendor_build_id (not title!)
@@ -28,9 +148,8 @@ def sync_vendor_builds():
         )
         
         # Update existing build if needed
+        updated = False
         if not created:
-            updated = False
-            
             if build.title != vb.title:
                 build.title = vb.title
                 updated = True
@@ -40,7 +159,7 @@ def sync_vendor_builds():
                 build.price = new_price
                 updated = True
             
-            if build.vendor != vb.vendor:
+            if build.vendor_id != vb.vendor_id:
                 build.vendor = vb.vendor
                 updated = True
             
@@ -50,14 +169,11 @@ def sync_vendor_builds():
                 updated = True
             
             if updated:
-                build.save()
                 print(f"📝 Updated: {build.title}")
         else:
             print(f"✨ Created: {build.title}")
         
-        # Sync components
-        build.components.clear()
-        
+        # Sync components (only rewrite the set when it actually changed)
         component_map = {
             "cpu": vb.cpu,
             "gpu": vb.gpu,
@@ -67,6 +183,7 @@ def sync_vendor_builds():
             "case":  vb.case,
         }
         
+        component_ids = {}
         for comp_type, comp_name in component_map.items():
             if comp_name:
                 component, _ = Component.objects.get_or_create(
@@ -74,32 +191,194 @@ def sync_vendor_builds():
                     name=comp_name,
                     specs=comp_name
                 )
-                build.components.add(component)
+                component_ids[comp_type] = component.id
+
+        if created or set(build.components.values_list("id", flat=True)) != set(component_ids.values()):
+            build.components.set(component_ids.values())
+            updated = True
+
+        fingerprint = configuration_fingerprint(component_ids)
+        if build.config_fingerprint != fingerprint:
+            build.config_fingerprint = fingerprint
+            updated = True
         
         # Auto-categorize
+        previous_category = (build.category, build.intensity)
         categorize_build(build)
-        build.save()
+        if created or updated or (build.category, build.intensity) != previous_category:
+            build.save()
+            changed_build_ids.append(build.id)
     
     # 🗑️ DELETE orphaned builds (VendorBuilds that were deleted)
-    orphaned_builds = Build.objects.filter(
-        source="vendor"
-    ).exclude(
+    orphaned_builds = orphaned_builds.exclude(
         vendor_build_id__in=synced_vendor_build_ids
     )
     
-    deleted_count = orphaned_builds.count()
-    if deleted_count > 0:
-        print(f"🗑️ Deleting {deleted_count} orphaned builds")
-        orphaned_builds.delete()
+    orphaned_build_ids = list(orphaned_builds.values_list("id", flat=True))
+    if orphaned_build_ids:
+        print(f"🗑️ Deleting {len(orphaned_build_ids)} orphaned builds")
+        delete_catalog_builds(orphaned_build_ids)
     
     print(f"✅ Sync complete: {len(synced_vendor_build_ids)} vendor builds")
+    return {
+        "synced": len(synced_vendor_build_ids),
+        "changed": len(changed_build_ids),
+        "deleted": len(orphaned_build_ids),
+    }
+
+
+# -------------------- Whole-vendor bulk sync --------------------
+SYNC_PART_TYPES = ("cpu", "gpu", "ram", "storage", "psu", "case")
+
+
+def _component_lookup(parts, chunk_size=500):
+    """
+    {(type, name): (id, lowercased specs)} for every part. Like sync's
+    get_or_create(type=..., name=..., specs=name), only components whose
+    specs equal their name match (not prebuilt ones with other specs), and
+    missing ones are created that way.
+    """
+    def load(names):
+        found = {}
+        for start in range(0, len(names), chunk_size):
+            rows = Component.objects.filter(name__in=names[start:start + chunk_size], specs=F("name"))
+            for comp_id, comp_type, name, specs in rows.values_list("id", "type", "name", "specs"):
+                found[(comp_type, name)] = (comp_id, specs.lower())
+        return found
+
+    names = sorted({name for _, name in parts})
+    found = load(names)
+    missing = [key for key in parts if key not in found]
+    if missing:
+        Component.objects.bulk_create(
+            [Component(type=comp_type, name=name, specs=name) for comp_type, name in missing],
+            batch_size=chunk_size,
+            ignore_conflicts=True,
+        )
+        found.update(load(sorted({name for _, name in missing})))
+    return found
+
+
+def bulk_sync_vendor(vendor_id, chunk_size=500):
+    """
+    Sync all of one vendor's builds with set-based queries: the same
+    result as the row-by-row sync, but a fixed number of statements per
+    chunk instead of a dozen per build. Used when a whole vendor is synced.
+    """
+    vendor_builds = list(
+        VendorBuild.objects.filter(vendor_id=vendor_id)
+        .values_list("id", "title", "price", "description", *SYNC_PART_TYPES)
+    )
+    components = _component_lookup({
+        (comp_type, name) for row in vendor_builds
+        for comp_type, name in zip(SYNC_PART_TYPES, row[4:]) if name
+    })
+
+    existing = {
+        build.vendor_build_id: build
+        for build in Build.objects.filter(source="vendor", vendor_id=vendor_id).only(
+            "id", "title", "description", "price", "category", "intensity", "config_fingerprint", "vendor_build_id",
+        )
+    }
+    Through = Build.components.through
+    linked = {}
+    build_ids = [build.id for build in existing.values()]
+    for start in range(0, len(build_ids), chunk_size):
+        for build_id, comp_id in Through.objects.filter(
+            build_id__in=build_ids[start:start + chunk_size]
+        ).values_list("build_id", "component_id"):
+            linked.setdefault(build_id, set()).add(comp_id)
+
+    to_create, to_update, links, relinked = [], [], {}, []
+    for vb_id, title, price, description, *names in vendor_builds:
+        parts = {comp_type: components[(comp_type, name)] for comp_type, name in zip(SYNC_PART_TYPES, names) if name}
+        component_ids = {comp_type: comp_id for comp_type, (comp_id, _) in parts.items()}
+        price = Decimal(str(price))
+        category, intensity = categorize_specs(
+            [parts["cpu"][1]] if parts.get("cpu", (0, ""))[1] else [],
+            [parts["gpu"][1]] if parts.get("gpu", (0, ""))[1] else [],
+            price,
+        )
+        values = {
+            "title": title, "description": description, "price": price, "category": category,
+            "intensity": intensity, "config_fingerprint": configuration_fingerprint(component_ids),
+        }
+
+        build = existing.pop(vb_id, None)
+        if build is None:
+            to_create.append(Build(
+                source="vendor", vendor_id=vendor_id, vendor_build_id=vb_id, **values,
+            ))
+            links[vb_id] = set(component_ids.values())
+            continue
+
+        changed = any(getattr(build, field) != value for field, value in values.items())
+        for field, value in values.items():
+            setattr(build, field, value)
+        if linked.get(build.id, set()) != set(component_ids.values()):
+            links[vb_id] = set(component_ids.values())
+            relinked.append(build.id)
+            changed = True
+        if changed:
+            to_update.append(build)
+
+    orphaned_build_ids = [build.id for build in existing.values()]  # no VendorBuild left for these
+
+    with transaction.atomic():
+        Build.objects.bulk_create(to_create, batch_size=chunk_size)
+        created_ids = dict(
+            Build.objects.filter(source="vendor", vendor_build_id__in=[b.vendor_build_id for b in to_create])
+            .values_list("vendor_build_id", "id")
+        ) if to_create else {}
+        Build.objects.bulk_update(
+            to_update, ["title", "description", "price", "category", "intensity", "config_fingerprint"],
+            batch_size=chunk_size,
+        )
+        for start in range(0, len(relinked), chunk_size):
+            Through.objects.filter(build_id__in=relinked[start:start + chunk_size]).delete()
+        build_id_for = {build.vendor_build_id: build.id for build in to_update} | created_ids
+        Through.objects.bulk_create(
+            [
+                Through(build_id=build_id_for[vb_id], component_id=comp_id)
+                for vb_id, comp_ids in links.items() for comp_id in comp_ids
+            ],
+            batch_size=chunk_size,
+        )
+        if orphaned_build_ids:
+            delete_catalog_builds(orphaned_build_ids)
+
+    changed_build_ids = list(created_ids.values()) + [build.id for build in to_update]
+
+    # Row and duration metrics are recorded by sync_vendor_builds
+    logger.info(
+        "Bulk sync of vendor %s: %d vendor builds, %d changed, %d deleted",
+        vendor_id, len(vendor_builds), len(changed_build_ids), len(orphaned_build_ids),
+    )
+    return {"synced": len(vendor_builds), "changed": len(changed_build_ids), "deleted": len(orphaned_build_ids)}
+
+
+def delete_catalog_builds(build_ids, chunk_size=500):
+    """
+    Delete builds in chunks with set-based statements: component links
+    first, then the builds themselves (saved/purchased rows cascade).
+    """
+    build_ids = list(build_ids)
+    with transaction.atomic():
+        for start in range(0, len(build_ids), chunk_size):
+            chunk = build_ids[start:start + chunk_size]
+            Build.components.through.objects.filter(build_id__in=chunk).delete()
+            Build.objects.filter(id__in=chunk).delete()
 
 
 def categorize_build(build):
     """Auto-categorize build based on components"""
     cpu_specs = [c.specs.lower() for c in build.components.filter(type='cpu') if c.specs]
     gpu_specs = [c.specs.lower() for c in build.components.filter(type='gpu') if c.specs]
-    
+    build.category, build.intensity = categorize_specs(cpu_specs, gpu_specs, build.price)
+
+
+def categorize_specs(cpu_specs, gpu_specs, price):
+    """(category, intensity) from lowercased CPU/GPU specs and the price"""
     # Detect category
     if any('xeon' in s or 'threadripper' in s for s in cpu_specs) or \
        any('quadro' in s or 'firepro' in s for s in gpu_specs):
@@ -113,9 +392,8 @@ def categorize_build(build):
     
     # Detect intensity
     intensity = "heavy" if (
-        (category == "office" and build.price >= 50000) or
-        (category in ["editing", "gaming"] and build.price >= 100000)
+        (category == "office" and price >= 50000) or
+        (category in ["editing", "gaming"] and price >= 100000)
     ) else "casual"
     
-    build.category = category
-    build.intensity = intensity
\ No newline at end of file
+    return category, intensity
@@ -1,24 +1,258 @@
 # Builds/views.py
 from rest_framework import generics, permissions, viewsets
+from rest_framework.exceptions import APIException
+from rest_framework.views import APIView
+from django.db.models import Count, Max, Min, Q
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from . import catalog_cache, live
+from .changes import changes_since
 from .models import Build, SavedBuild, Purchase
 from .serializers import BuildSerializer, SavedBuildSerializer, PurchaseSerializer
-from .services import get_recommended_builds, update_builds_categorization
+from .services import (
+    catalog_builds, facet_queries, filter_catalog, format_facets, get_recommended_builds, page_bounds, search_catalog,
+    update_builds_categorization,
+)
+from .similarity import similarity_index
+from compfy.db import replica_reads
+from compfy.instrumentation import SerializerTimingMixin
+from utils.querybudget import query_budget
+from utils.services.export import EXPORT_FORMATS, iterate_in_chunks, streaming_export
 
 
 # -------------------- Browse Builds --------------------
-class BuildListView(generics.ListAPIView):
-    queryset = Build.objects.all().order_by("-created_at")
+@query_budget(4)
+@replica_reads
+class BuildListView(SerializerTimingMixin, generics.ListAPIView):
+    queryset = Build.objects.select_related("vendor").prefetch_related("components").order_by("-created_at")
     serializer_class = BuildSerializer
     permission_classes = [permissions.AllowAny]
 
+    def get_queryset(self):
+        return filter_catalog(super().get_queryset(), self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        return Response(catalog_cache.cached(
+            "list", request.query_params.dict(), lambda: super(BuildListView, self).list(request, *args, **kwargs).data,
+        ))
+
+
+class BuildExportView(APIView):
+    """Stream the filtered public catalog as CSV or XLSX"""
+    permission_classes = [permissions.AllowAny]
+
+    HEADER = ["id", "title", "category", "intensity", "vendor", "cpu", "gpu", "ram", "storage", "psu", "case", "price"]
+
+    def get(self, request, file_format):
+        if file_format not in EXPORT_FORMATS:
+            return Response({"error": "Format must be csv or xlsx"}, status=400)
 
-class BuildDetailView(generics.RetrieveAPIView):
-    queryset = Build.objects.all()
+        builds = filter_catalog(Build.objects.all(), request.query_params)
+        builds = builds.select_related("vendor").prefetch_related("components")
+
+        def rows():
+            for build in iterate_in_chunks(builds):
+                parts = {c.type: c.name for c in build.components.all()}
+                yield [
+                    build.id, build.title, build.category, build.intensity,
+                    build.vendor.shop_name if build.vendor else "",
+                    *(parts.get(t, "") for t in ["cpu", "gpu", "ram", "storage", "psu", "case"]),
+                    build.price,
+                ]
+
+        return streaming_export("compfy-catalog", file_format, self.HEADER, rows(), sheet_name="Catalog")
+
+
+@query_budget(4)
+@replica_reads
+class BuildDetailView(SerializerTimingMixin, generics.RetrieveAPIView):
+    queryset = Build.objects.select_related("vendor").prefetch_related("components")
     serializer_class = BuildSerializer
     permission_classes = [permissions.AllowAny]
 
+    def retrieve(self, request, *args, **kwargs):
+        return Response(catalog_cache.cached(
+            "detail", {"pk": self.kwargs["pk"]}, lambda: super(BuildDetailView, self).retrieve(request, *args, **kwargs).data,
+        ))
+
+
+@query_budget(4)
+@replica_reads
+class BuildSearchView(APIView):
+    """
+    Catalog builds matching every word of ?q= in the title or a component
+    name, cheapest first. Takes the catalog filters, limit (default 20) and offset.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            limit, offset = page_bounds(params)
+        except ValueError:
+            return Response({"error": "limit and offset must be integers"}, status=400)
+
+        def search():
+            builds = search_catalog(catalog_builds(), params)
+            return {
+                "count": builds.count(),
+                "results": BuildSerializer(builds[offset:offset + limit], many=True).data,
+            }
+
+        return Response(catalog_cache.cached("search", params.dict(), search))
+
+
+@query_budget(5)
+@replica_reads
+class BuildFacetsView(APIView):
+    """Build counts by category, intensity and vendor, and the price range, under the catalog filters"""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        def facets():
+            builds = filter_catalog(Build.objects.all(), request.query_params)
+            rows = {name: list(queryset) for name, queryset in facet_queries(builds).items()}
+            return format_facets(rows, builds.aggregate(min=Min("price"), max=Max("price")))
+
+        return Response(catalog_cache.cached("facets", request.query_params.dict(), facets))
+
+
+class IndexLoading(APIException):
+    status_code = 503
+    default_detail = "The similar builds index is still loading, try again shortly."
+    default_code = "index_loading"
+
+
+@replica_reads
+class SimilarBuildsView(generics.ListAPIView):
+    """Closest builds from other vendors, nearest first (?k=5, max 50)"""
+    serializer_class = BuildSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+
+    def get_queryset(self):
+        build = get_object_or_404(Build, pk=self.kwargs["pk"])
+        try:
+            k = min(max(int(self.request.query_params.get("k", 5)), 1), 50)
+        except ValueError:
+            k = 5
+
+        ids = similarity_index.similar(build.id, k=k)
+        if ids is None:
+            raise IndexLoading()
+        builds = Build.objects.filter(id__in=ids).select_related("vendor").prefetch_related("components")
+        by_id = {b.id: b for b in builds}
+        return [by_id[i] for i in ids if i in by_id]
+
+
+# -------------------- Change feed --------------------
+@query_budget(4)
+class BuildChangesView(APIView):
+    """
+    Catalog changes after ?since=<seq>, oldest first, for clients keeping a
+    local copy: upserts carry the serialized build, deletes are tombstones.
+    Pass `next` back as `since`; `hasMore` means another page is ready now.
+    Query params: since (default 0, the whole catalog), limit (default 500).
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            since = max(int(params.get("since", 0)), 0)
+            limit = min(max(int(params.get("limit", 500)), 1), 1000)
+        except ValueError:
+            return Response({"error": "since and limit must be integers"}, status=400)
+
+        rows, next_seq, has_more = changes_since(since, limit)
+        upserted = [build_id for _, build_id, op, _ in rows if op == "upsert"]
+        builds = {
+            build.id: build
+            for build in Build.objects.filter(id__in=upserted).select_related("vendor").prefetch_related("components")
+        } if upserted else {}
+
+        changes = []
+        for seq, build_id, op, _ in rows:
+            if op == "delete":
+                changes.append({"seq": seq, "op": "delete", "id": build_id, "build": None})
+            elif build_id in builds:
+                # A build deleted since the row was read shows up as a tombstone on the next call
+                changes.append({"seq": seq, "op": "upsert", "id": build_id, "build": BuildSerializer(builds[build_id]).data})
+        return Response({"since": since, "next": next_seq, "hasMore": has_more, "changes": changes})
+
+
+# -------------------- Live updates --------------------
+async def build_events(request):
+    """
+    Server-sent events for build price and availability changes:
+    ?ids=1,2,3 (up to 100) for those builds, otherwise the whole catalog.
+    """
+    try:
+        ids = [int(build_id) for build_id in request.GET.get("ids", "").split(",") if build_id]
+    except ValueError:
+        return JsonResponse({"error": "ids must be comma-separated integers"}, status=400)
+    if len(ids) > 100:
+        return JsonResponse({"error": "At most 100 ids per stream"}, status=400)
+    return live.event_stream_response(request, [f"build:{build_id}" for build_id in ids] or ["catalog"])
+
+
+# -------------------- Identical configurations --------------------
+@query_budget(6)
+@replica_reads
+class ConfigurationGroupsView(APIView):
+    """
+    Distinct configurations across vendors with their cheapest offer.
+    Query params: min_offers (default 1), category, limit (default 50), offset.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            min_offers = max(int(params.get("min_offers", 1)), 1)
+            limit = min(max(int(params.get("limit", 50)), 1), 200)
+            offset = max(int(params.get("offset", 0)), 0)
+        except ValueError:
+            return Response({"error": "min_offers, limit and offset must be integers"}, status=400)
+
+        builds = Build.objects.exclude(config_fingerprint="")
+        if params.get("category"):
+            builds = builds.filter(category=params["category"])
+
+        # One GROUP BY over the (config_fingerprint, price) index
+        groups = (
+            builds.values("config_fingerprint")
+            .annotate(offers=Count("id"), min_price=Min("price"), max_price=Max("price"))
+            .filter(offers__gte=min_offers)
+            .order_by("min_price", "config_fingerprint")
+        )
+        page = list(groups[offset:offset + limit])
+
+        cheapest = {}
+        if page:
+            match = Q()
+            for group in page:
+                match |= Q(config_fingerprint=group["config_fingerprint"], price=group["min_price"])
+            offers = builds.filter(match).select_related("vendor").prefetch_related("components").order_by("id")
+            for build in offers:
+                cheapest.setdefault(build.config_fingerprint, build)
+
+        results = []
+        for group in page:
+            build = cheapest.get(group["config_fingerprint"])
+            results.append({
+                "fingerprint": group["config_fingerprint"],
+                "offerCount": group["offers"],
+                "minPrice": group["min_price"],
+                "maxPrice": group["max_price"],
+                "priceSpread": group["max_price"] - group["min_price"],
+                "cheapestOffer": BuildSerializer(build).data if build else None,
+            })
+
+        return Response({"count": groups.count(), "results": results})
+
 
 # -------------------- Save Builds --------------------
 class SavedBuildView(viewsets.ModelViewSet):
@@ -0,0 +1,217 @@
+"""
+Database connections and the catalog read replica.
+
+Configure DATABASES in settings with the helpers below:
+
+    DATABASES = {"default": db.persistent({...})}
+    DATABASES["replica"] = db.persistent(db.replica_of(DATABASES["default"], HOST=...))
+    DATABASE_ROUTERS = ["compfy.db.CatalogReplicaRouter"]
+
+persistent() keeps each worker's connection open for ``DB_CONN_MAX_AGE``
+seconds (environment, default 300) instead of connecting per request, and
+checks it is still alive before reusing it. The ASGI `live` process sets it
+to 0: each ASGI request runs on a thread of its own, which would strand
+its connection.
+
+CatalogReplicaRouter sends catalog reads (REPLICA_MODELS) to the replica,
+but only inside views marked ``@replica_reads`` and only on GET and HEAD.
+Writes, management commands and background threads always use the
+primary, as do reads shortly after a write in the same context. The
+replica is dropped in favour of the primary while it is unreachable or
+more than ``settings.REPLICA_MAX_LAG_SECONDS`` (default 5) behind, which
+is measured on the catalog change feed every
+``settings.REPLICA_CHECK_SECONDS`` (default 5).
+
+To try it locally, point the replica at a copy of the SQLite file: it
+never catches up, so reads move to the primary after the first write.
+"""
+
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Max
+from django.utils import timezone
+
+from compfy import metrics
+
+logger = logging.getLogger("compfy.db")
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+REPLICA_MODELS = {"builds.build", "builds.build_components", "builds.component", "vendors.vendor"}
+
+SAFE_METHODS = ("GET", "HEAD")
+
+
+# -------------------- Settings helpers --------------------
+def persistent(config, max_age=None):
+    """`config` (a DATABASES entry) with its connection kept across requests and checked before reuse"""
+    if max_age is None:
+        max_age = int(os.environ.get("DB_CONN_MAX_AGE", 300))
+    return {**config, "CONN_MAX_AGE": max_age, "CONN_HEALTH_CHECKS": True}
+
+
+def replica_of(primary, **overrides):
+    """A DATABASES entry for a replica of `primary`; tests read it through the primary's test database"""
+    return {**primary, **overrides, "TEST": {"MIRROR": PRIMARY}}
+
+
+def replica_alias():
+    """The replica's alias, or None when there is no separate database to read from"""
+    alias = getattr(settings, "DATABASE_REPLICA_ALIAS", "replica")
+    if alias == PRIMARY or alias not in settings.DATABASES:
+        return None
+    replica, primary = connections[alias].settings_dict, connections[PRIMARY].settings_dict
+    if all(replica.get(key) == primary.get(key) for key in ("ENGINE", "NAME", "HOST", "PORT")):
+        return None  # a test mirror, or a local setup pointing both at one file
+    return alias
+
+
+def max_lag():
+    return getattr(settings, "REPLICA_MAX_LAG_SECONDS", 5)
+
+
+def replica_window():
+    """How long after a write the catalog may still be read without it; 0 without a replica"""
+    if replica_alias() is None:
+        return 0
+    return max_lag() + getattr(settings, "REPLICA_CHECK_SECONDS", 5)
+
+
+# -------------------- Replica lag --------------------
+def replica_lag(alias):
+    """Seconds since the oldest catalog change the replica has yet to apply; 0 when it has them all"""
+    from builds.models import BuildChange
+
+    applied = BuildChange.objects.using(alias).aggregate(seq=Max("seq"))["seq"] or 0
+    missing = (
+        BuildChange.objects.using(PRIMARY).filter(seq__gt=applied)
+        .order_by("seq").values_list("changed_at", flat=True).first()
+    )
+    return 0.0 if missing is None else max((timezone.now() - missing).total_seconds(), 0.0)
+
+
+class _ReplicaStatus:
+    """Whether the replica may serve reads, re-measured by one thread at a time while the others keep the last answer"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.usable = False
+        self.lag = None
+        self.error = None
+        self._expires = 0.0
+
+    def check(self, alias):
+        if time.monotonic() >= self._expires and self._lock.acquire(blocking=False):
+            try:
+                self._measure(alias)
+            finally:
+                self._lock.release()
+        return self.usable
+
+    def _measure(self, alias):
+        try:
+            self.lag, self.error = replica_lag(alias), None
+        except DatabaseError as exc:
+            if self.usable:
+                logger.warning("Replica %r is unreachable; reading from the primary", alias, exc_info=True)
+            self.lag, self.error = None, str(exc) or exc.__class__.__name__
+        usable = self.lag is not None and self.lag <= max_lag()
+        if self.usable and self.lag is not None and not usable:
+            logger.warning("Replica %r is %.1fs behind; reading from the primary", alias, self.lag)
+        self.usable = usable
+        metrics.set_replica_lag(alias, self.lag)
+        self._expires = time.monotonic() + getattr(settings, "REPLICA_CHECK_SECONDS", 5)
+
+    def clear(self):
+        with self._lock:
+            self.usable, self.lag, self.error, self._expires = False, None, None, 0.0
+
+    def describe(self, alias):
+        self.check(alias)
+        return {"alias": alias, "serving": self.usable, "lagSeconds": self.lag, "error": self.error}
+
+
+replica_status = _ReplicaStatus()
+
+
+# -------------------- Routing --------------------
+_replica_allowed = contextvars.ContextVar("replica_reads_allowed", default=False)
+_primary_until = contextvars.ContextVar("primary_reads_until", default=0.0)
+
+
+@contextlib.contextmanager
+def replica_allowed():
+    """Let catalog reads inside the block go to the replica"""
+    token = _replica_allowed.set(True)
+    try:
+        yield
+    finally:
+        _replica_allowed.reset(token)
+
+
+def replica_reads(view):
+    """Mark a view function, async ones included, or a view class whose GET and HEAD reads may use the replica"""
+    if isinstance(view, type):
+        view.dispatch = _on_safe_methods(view.dispatch, method=True)
+        return view
+    return _on_safe_methods(view)
+
+
+def _on_safe_methods(func, method=False):
+    def is_safe(args):
+        return args[1 if method else 0].method in SAFE_METHODS
+
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not is_safe(args):
+                return await func(*args, **kwargs)
+            with replica_allowed():
+                return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_safe(args):
+                return func(*args, **kwargs)
+            with replica_allowed():
+                return func(*args, **kwargs)
+    return wrapper
+
+
+class CatalogReplicaRouter:
+    """Catalog reads to the replica where allowed and fresh enough; everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if not _replica_allowed.get() or model._meta.label_lower not in REPLICA_MODELS:
+            return None
+        if time.monotonic() < _primary_until.get():
+            return None  # this context wrote recently; the replica may not have it yet
+        alias = replica_alias()
+        if alias is None or not replica_status.check(alias):
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Also for objects read from the replica, which would otherwise be saved back to it
+        _primary_until.set(time.monotonic() + max_lag())
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, getattr(settings, "DATABASE_REPLICA_ALIAS", "replica")}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == getattr(settings, "DATABASE_REPLICA_ALIAS", "replica") and db != PRIMARY:
+            return False  # the replica gets its schema from the primary
+        return None
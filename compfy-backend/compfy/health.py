@@ -0,0 +1,158 @@
+"""
+Liveness and readiness probes.
+
+Liveness only says the process is serving requests. Readiness runs every
+check in CHECKS and answers 503 if any fails; the result is kept in
+process memory for ``settings.HEALTH_CHECK_TTL`` seconds (default 5) so
+frequent load-balancer probes don't reach the database each time. It is
+deliberately not kept in the Django cache, which is one of the things
+being checked.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+from django.utils import timezone
+
+from builds.models import PendingSync, SyncLock
+from builds.trigger import max_delay
+from compfy import db
+from vendors.models import VendorBuildChange
+
+CHECKS = {}
+
+
+def register(name):
+    """Decorator adding a readiness check; it returns a detail dict or raises"""
+    def decorator(func):
+        CHECKS[name] = func
+        return func
+    return decorator
+
+
+# -------------------- Checks --------------------
+@register("database")
+def check_database():
+    # Reads fall back to the primary when the replica is down, so only the "replica" check reports it.
+    # A replica that mirrors the primary (as in tests) is the same database and isn't pinged twice.
+    replica = getattr(settings, "DATABASE_REPLICA_ALIAS", "replica")
+    aliases = [alias for alias in settings.DATABASES if alias == db.PRIMARY or alias != replica]
+    for alias in aliases:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1")
+    return {"aliases": aliases}
+
+
+@register("replica")
+def check_replica():
+    """Replica lag and whether it is serving catalog reads; never fails readiness"""
+    alias = db.replica_alias()
+    return db.replica_status.describe(alias) if alias else {"alias": None}
+
+
+@register("migrations")
+def check_migrations():
+    connection = connections["default"]
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        pending = [f"{migration.app_label}.{migration.name}" for migration, _ in plan]
+        raise RuntimeError(f"{len(pending)} unapplied: {', '.join(pending[:5])}")
+    return {}
+
+
+@register("cache")
+def check_cache():
+    key = "compfy:health:probe"
+    value = time.time()
+    cache.set(key, value, 30)
+    if cache.get(key) != value:
+        raise RuntimeError("Value written to the cache could not be read back")
+    return {}
+
+
+@register("sync")
+def check_sync():
+    """
+    Catalog sync lag, read from the database so every process sees the
+    same state. Fails when an outbox change has waited longer than its
+    due time plus ``settings.SYNC_STALL_SECONDS`` (default 900), a handed
+    off PendingSync row is older than that, or a sync lock is held by a
+    worker whose heartbeat stopped that long ago.
+    """
+    now = timezone.now()
+    stall = timedelta(seconds=getattr(settings, "SYNC_STALL_SECONDS", 900))
+    oldest_change = VendorBuildChange.objects.order_by("id").values_list("created_at", flat=True).first()
+    oldest_pending = PendingSync.objects.order_by("id").values_list("queued_at", flat=True).first()
+    stalled_locks = SyncLock.objects.exclude(owner="").filter(heartbeat__lt=now - stall).count()
+
+    def age(moment):
+        return round((now - moment).total_seconds(), 1) if moment else None
+
+    detail = {
+        "oldestChangeAge": age(oldest_change),
+        "oldestPendingAge": age(oldest_pending),
+        "stalledLocks": stalled_locks,
+    }
+    problems = []
+    if oldest_change and now - oldest_change > max_delay() + stall:
+        problems.append(f"outbox change waiting for {detail['oldestChangeAge']:.0f}s")
+    if oldest_pending and now - oldest_pending > stall:
+        problems.append(f"pending sync waiting for {detail['oldestPendingAge']:.0f}s")
+    if stalled_locks:
+        problems.append(f"{stalled_locks} sync lock(s) with a stale heartbeat")
+    if problems:
+        raise RuntimeError("Sync stalled: " + "; ".join(problems))
+    return detail
+
+
+# -------------------- Readiness --------------------
+class _ReadinessCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._result = None
+        self._expires = 0.0
+
+    def get(self):
+        ttl = getattr(settings, "HEALTH_CHECK_TTL", 5)
+        with self._lock:
+            # One thread runs the checks; the others wait and reuse its result
+            if self._result is None or time.monotonic() >= self._expires:
+                self._result = run_checks()
+                self._expires = time.monotonic() + ttl
+            return self._result
+
+    def clear(self):
+        with self._lock:
+            self._result = None
+
+
+def run_checks():
+    results = {}
+    for name, check in CHECKS.items():
+        start = time.perf_counter()
+        try:
+            results[name] = {"ok": True, **check()}
+        except Exception as exc:
+            results[name] = {"ok": False, "error": str(exc) or exc.__class__.__name__}
+        results[name]["ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return {"status": "ok" if all(r["ok"] for r in results.values()) else "unavailable", "checks": results}
+
+
+readiness = _ReadinessCache()
+
+
+# -------------------- Views --------------------
+def liveness(request):
+    return JsonResponse({"status": "ok"})
+
+
+def readiness_view(request):
+    result = readiness.get()
+    return JsonResponse(result, status=200 if result["status"] == "ok" else 503)
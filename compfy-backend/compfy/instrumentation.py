@@ -0,0 +1,262 @@
+"""
+Per-request performance instrumentation.
+
+Enable by adding ``"compfy.instrumentation.PerformanceMiddleware"`` to
+MIDDLEWARE (after AuthenticationMiddleware). Every request is timed and
+counted in the per-route histograms (also exported to Prometheus through
+compfy.metrics); a sampled fraction (``settings.PERF_SAMPLE_RATE``,
+default 0.1) also records DB query count and time, emits a full ``Server-Timing`` header and logs one JSON line to
+the ``compfy.perf`` logger.
+"""
+
+import bisect
+import contextlib
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from compfy import metrics
+
+logger = logging.getLogger("compfy.perf")
+
+# Upper bounds in milliseconds; the last bucket is open-ended
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+_current = contextvars.ContextVar("compfy_perf_timings", default=None)
+
+
+# -------------------- Spans --------------------
+@contextlib.contextmanager
+def span(name):
+    """Add the time spent in the block to the current sampled request under `name`"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+class _TimedSerializer:
+    """Proxy that times `.data`, where DRF serializers do their work"""
+    def __init__(self, serializer):
+        self._serializer = serializer
+
+    @property
+    def data(self):
+        with span("serializer"):
+            return self._serializer.data
+
+    def __getattr__(self, name):
+        return getattr(self._serializer, name)
+
+
+class SerializerTimingMixin:
+    """For DRF generic views: report serializer time as its own Server-Timing entry"""
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        return _TimedSerializer(serializer) if _current.get() is not None else serializer
+
+
+# -------------------- Query timing --------------------
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += (time.perf_counter() - start) * 1000
+
+
+def _time_queries(stack, timer):
+    """Time every query on this thread's connections until `stack` closes"""
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(timer))
+
+
+# -------------------- Route histograms --------------------
+class RouteStats:
+    """In-process latency histograms per route, safe to update from worker threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, total_ms, db_ms=None, queries=None):
+        index = bisect.bisect_left(BUCKETS_MS, total_ms)
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {
+                    "count": 0, "total_ms": 0.0, "buckets": [0] * (len(BUCKETS_MS) + 1),
+                    "sampled": 0, "db_ms": 0.0, "queries": 0,
+                }
+            stats["count"] += 1
+            stats["total_ms"] += total_ms
+            stats["buckets"][index] += 1
+            if db_ms is not None:
+                stats["sampled"] += 1
+                stats["db_ms"] += db_ms
+                stats["queries"] += queries
+
+    def snapshot(self):
+        with self._lock:
+            routes = {route: dict(stats, buckets=list(stats["buckets"])) for route, stats in self._routes.items()}
+
+        result = {}
+        for route, stats in routes.items():
+            sampled = stats["sampled"] or 1
+            result[route] = {
+                "count": stats["count"],
+                "avgMs": round(stats["total_ms"] / stats["count"], 2),
+                "p50Ms": _percentile(stats["buckets"], stats["count"], 0.50),
+                "p95Ms": _percentile(stats["buckets"], stats["count"], 0.95),
+                "p99Ms": _percentile(stats["buckets"], stats["count"], 0.99),
+                "sampled": stats["sampled"],
+                "avgDbMs": round(stats["db_ms"] / sampled, 2),
+                "avgQueries": round(stats["queries"] / sampled, 2),
+                "buckets": dict(zip([str(b) for b in BUCKETS_MS] + ["+Inf"], stats["buckets"])),
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+
+def _percentile(buckets, count, q):
+    """Upper bound of the bucket holding the q-th request (None past the last bound)"""
+    target = q * count
+    seen = 0
+    for bound, n in zip(BUCKETS_MS + [None], buckets):
+        seen += n
+        if seen >= target:
+            return bound
+    return None
+
+
+route_stats = RouteStats()
+
+
+# -------------------- Middleware --------------------
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PERF_SAMPLE_RATE", 0.1)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        if random.random() >= self.sample_rate:
+            return self._finish_unsampled(request, self.get_response(request), start)
+
+        timings = {}
+        token = _current.set(timings)
+        timer = _QueryTimer()
+        try:
+            with contextlib.ExitStack() as stack:
+                # Wrappers only; no database connection is opened here
+                _time_queries(stack, timer)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, start, timings, timer)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        if random.random() >= self.sample_rate:
+            return self._finish_unsampled(request, await self.get_response(request), start)
+
+        timings = {}
+        token = _current.set(timings)
+        timer = _QueryTimer()
+        stack = contextlib.ExitStack()
+        try:
+            # Under ASGI the ORM runs on the request's sync thread, whose connections are its own
+            await sync_to_async(_time_queries)(stack, timer)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, start, timings, timer)
+
+    def _finish_unsampled(self, request, response, start):
+        total = (time.perf_counter() - start) * 1000
+        self._observe(request, response, total)
+        route_stats.record(self._route(request), total)
+        response["Server-Timing"] = f"total;dur={total:.1f}"
+        return response
+
+    def _finish(self, request, response, start, timings, timer):
+        end = time.perf_counter()
+        total = (end - start) * 1000
+        view_start = getattr(request, "_perf_view_start", None)
+        view_end = getattr(request, "_perf_view_end", end)
+        if view_start is not None:
+            timings["view"] = (view_end - view_start) * 1000
+            if view_end != end:
+                timings["render"] = (end - view_end) * 1000
+
+        route = self._route(request)
+        self._observe(request, response, total)
+        route_stats.record(route, total, timer.duration, timer.count)
+
+        entries = [f'db;dur={timer.duration:.1f};desc="{timer.count} queries"']
+        entries += [f"{name};dur={ms:.1f}" for name, ms in timings.items()]
+        entries.append(f"total;dur={total:.1f}")
+        response["Server-Timing"] = ", ".join(entries)
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "event": "request",
+                "method": request.method,
+                "route": route,
+                "status": response.status_code,
+                "total_ms": round(total, 2),
+                "db_ms": round(timer.duration, 2),
+                "queries": timer.count,
+                **{f"{name}_ms": round(ms, 2) for name, ms in timings.items()},
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if _current.get() is not None:
+            request._perf_view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses come through here after the view, right before rendering
+        if _current.get() is not None:
+            request._perf_view_end = time.perf_counter()
+        return response
+
+    def _observe(self, request, response, total_ms):
+        metrics.observe_request(self._route(request), request.method, response.status_code, total_ms / 1000)
+        metrics.update_connection_gauge()
+
+    @staticmethod
+    def _route(request):
+        match = getattr(request, "resolver_match", None)
+        return match.route if match and match.route else "unmatched"
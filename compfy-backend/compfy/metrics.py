@@ -0,0 +1,113 @@
+"""
+Prometheus metrics, served at /api/metrics/.
+
+Under gunicorn with several workers, set ``PROMETHEUS_MULTIPROC_DIR`` to an
+empty, writable directory before the workers start (gunicorn.conf.py clears
+dead workers' files). Each process then writes its samples to its own
+mmap-backed files and the endpoint merges them, so no lock is shared
+between workers. Without it the default in-process registry is used.
+
+Request latency is recorded by PerformanceMiddleware, so that has to be in
+MIDDLEWARE for the per-route histograms to fill.
+"""
+
+import os
+
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+# -------------------- Metrics --------------------
+REQUEST_LATENCY = Histogram(
+    "compfy_http_request_duration_seconds", "Request latency by route",
+    ["route", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+SYNC_DURATION = Histogram(
+    "compfy_sync_duration_seconds", "sync_vendor_builds duration by scope", ["scope"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+SYNC_ROWS = Counter(
+    "compfy_sync_rows_total", "Rows handled by sync_vendor_builds (synced, changed, deleted)", ["result"],
+)
+
+UPLOAD_DURATION = Histogram(
+    "compfy_upload_duration_seconds", "Time spent ingesting an inventory upload",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+UPLOAD_ROWS = Counter(
+    "compfy_upload_rows_total", "Inventory upload rows by outcome (created, updated, unchanged, invalid)", ["outcome"],
+)
+
+CACHE_REQUESTS = Counter(
+    "compfy_cache_requests_total", "Cache lookups by cache and result (hit, miss)", ["cache", "result"],
+)
+
+DB_CONNECTIONS = Gauge(
+    "compfy_db_connections_open", "Open database connections per alias", ["alias"],
+    multiprocess_mode="livesum",
+)
+
+REPLICA_LAG = Gauge(
+    "compfy_db_replica_lag_seconds", "Catalog replica lag as last measured by compfy/db.py; -1 while unreachable",
+    ["alias"], multiprocess_mode="livemax",
+)
+
+LIVE_STREAMS = Gauge(
+    "compfy_live_streams_open", "Open live update streams (builds/live.py)",
+    multiprocess_mode="livesum",
+)
+
+
+# -------------------- Recording helpers --------------------
+def observe_request(route, method, status, seconds):
+    REQUEST_LATENCY.labels(route, method, str(status)).observe(seconds)
+
+
+def observe_sync(scope, seconds, counts):
+    """`counts` is the dict returned by sync_vendor_builds"""
+    SYNC_DURATION.labels(scope).observe(seconds)
+    for result, value in counts.items():
+        if value:
+            SYNC_ROWS.labels(result).inc(value)
+
+
+def observe_upload(seconds, result):
+    """`result` is the report built by ingest_upload"""
+    UPLOAD_DURATION.observe(seconds)
+    for outcome in ("created", "updated", "unchanged", "invalid"):
+        value = result.get(f"rows{outcome.capitalize()}", 0)
+        if value:
+            UPLOAD_ROWS.labels(outcome).inc(value)
+
+
+def observe_cache(name, hit):
+    CACHE_REQUESTS.labels(name, "hit" if hit else "miss").inc()
+
+
+def set_live_streams(count):
+    LIVE_STREAMS.set(count)
+
+
+def set_replica_lag(alias, seconds):
+    REPLICA_LAG.labels(alias).set(-1 if seconds is None else seconds)
+
+
+def update_connection_gauge():
+    """Count this process's open connections; only touches aliases already set up"""
+    for connection in connections.all(initialized_only=True):
+        DB_CONNECTIONS.labels(connection.alias).set(1 if connection.connection is not None else 0)
+
+
+# -------------------- Endpoint --------------------
+def metrics_view(request):
+    update_connection_gauge()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
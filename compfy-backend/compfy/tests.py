@@ -0,0 +1,170 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connections
+from django.test import TestCase, modify_settings, override_settings
+from django.utils import timezone
+from prometheus_client import CONTENT_TYPE_LATEST
+from prometheus_client.parser import text_string_to_metric_families
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from builds.models import PendingSync, SyncLock
+from compfy.health import readiness
+from compfy.instrumentation import route_stats
+from vendors.models import Vendor, VendorBuildChange
+
+
+# -------------------- Request instrumentation --------------------
+@modify_settings(MIDDLEWARE={"append": "compfy.instrumentation.PerformanceMiddleware"})
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        route_stats.reset()
+
+    def timings(self, response):
+        return dict(entry.split(";", 1) for entry in response["Server-Timing"].split(", "))
+
+    @override_settings(PERF_SAMPLE_RATE=1.0)
+    def test_sampled_requests_get_the_full_breakdown(self):
+        response = self.client.get("/api/builds/")
+        self.assertEqual(response.status_code, 200)
+        timings = self.timings(response)
+        self.assertEqual(list(timings)[0], "db")
+        self.assertRegex(timings["db"], r'^dur=\d+\.\d;desc="[1-9]\d* queries"$')
+        self.assertIn("view", timings)
+        self.assertIn("serializer", timings)
+        self.assertEqual(list(timings)[-1], "total")
+
+        stats = route_stats.snapshot()["api/builds/"]
+        self.assertEqual((stats["count"], stats["sampled"]), (1, 1))
+        self.assertGreater(stats["avgQueries"], 0)
+
+    @override_settings(PERF_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_only_get_the_total(self):
+        response = self.client.get("/api/health/")
+        self.assertRegex(response["Server-Timing"], r"^total;dur=\d+\.\d$")
+        self.assertEqual(route_stats.snapshot()["api/health/"]["sampled"], 0)
+
+    def test_perf_endpoint_is_for_admins_only(self):
+        self.assertEqual(self.client.get("/api/health/perf/").status_code, 401)
+
+        user = User.objects.create_user("shopper", password="x")
+        response = self.client.get("/api/health/perf/", HTTP_AUTHORIZATION=self.bearer(user))
+        self.assertEqual(response.status_code, 403)
+
+        admin = User.objects.create_user("admin", password="x", is_staff=True)
+        response = self.client.get("/api/health/perf/", HTTP_AUTHORIZATION=self.bearer(admin))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("api/health/perf/", response.json()["routes"])
+
+        response = self.client.delete("/api/health/perf/", HTTP_AUTHORIZATION=self.bearer(admin))
+        self.assertEqual(response.json()["routes"], {})
+
+    @staticmethod
+    def bearer(user):
+        return f"Bearer {RefreshToken.for_user(user).access_token}"
+
+
+# -------------------- Prometheus metrics --------------------
+@modify_settings(MIDDLEWARE={"append": "compfy.instrumentation.PerformanceMiddleware"})
+class MetricsEndpointTests(TestCase):
+    def scrape(self):
+        response = self.client.get("/api/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], CONTENT_TYPE_LATEST)
+        return {family.name: family for family in text_string_to_metric_families(response.content.decode())}
+
+    def test_exposition_parses_and_carries_request_latency(self):
+        self.client.get("/api/health/")
+        families = self.scrape()
+        for name in ("compfy_sync_rows", "compfy_cache_requests", "compfy_db_connections_open",
+                     "compfy_upload_duration_seconds"):
+            self.assertIn(name, families)
+
+        latency = families["compfy_http_request_duration_seconds"]
+        self.assertEqual(latency.type, "histogram")
+        counts = [
+            sample for sample in latency.samples
+            if sample.name.endswith("_count") and sample.labels == {"route": "api/health/", "method": "GET", "status": "200"}
+        ]
+        self.assertEqual(len(counts), 1)
+        self.assertGreaterEqual(counts[0].value, 1)
+
+        buckets = [sample for sample in latency.samples
+                   if sample.name.endswith("_bucket") and sample.labels.get("route") == "api/health/"]
+        self.assertEqual(buckets[-1].labels["le"], "+Inf")
+        self.assertEqual(buckets[-1].value, counts[0].value)
+
+
+# -------------------- Health probes --------------------
+class ReadinessTests(TestCase):
+    def setUp(self):
+        readiness.clear()
+        self.addCleanup(readiness.clear)
+
+    def ready(self, status):
+        response = self.client.get("/api/health/ready/")
+        self.assertEqual(response.status_code, status)
+        return response.json()
+
+    def test_healthy_instance_is_ready(self):
+        result = self.ready(200)
+        self.assertEqual(result["status"], "ok")
+        self.assertTrue(all(check["ok"] for check in result["checks"].values()))
+        self.assertEqual(self.client.get("/api/health/live/").json(), {"status": "ok"})
+
+    def test_unreachable_database_is_not_ready(self):
+        down = OperationalError("server closed the connection")
+        with mock.patch.object(connections["default"], "cursor", side_effect=down):
+            result = self.ready(503)
+        self.assertEqual(result["status"], "unavailable")
+        self.assertFalse(result["checks"]["database"]["ok"])
+        self.assertEqual(result["checks"]["database"]["error"], "server closed the connection")
+        self.assertTrue(result["checks"]["cache"]["ok"])
+
+    def vendor(self):
+        user = User.objects.create_user("vendor", password="x")
+        return Vendor.objects.create(user=user, shop_name="Vendor", city="Lahore", contact="0300")
+
+    def sync_error(self, status):
+        readiness.clear()
+        check = self.ready(status)["checks"]["sync"]
+        return check.get("error")
+
+    @override_settings(SYNC_STALL_SECONDS=60, SYNC_MAX_DELAY_SECONDS=10)
+    def test_stuck_outbox_is_not_ready(self):
+        change = VendorBuildChange.objects.create(vendor_id=1, vendor_build_id=1, op="upsert")
+        self.assertIsNone(self.sync_error(200))
+
+        VendorBuildChange.objects.filter(id=change.id).update(created_at=timezone.now() - timedelta(seconds=120))
+        self.assertIn("outbox change waiting for 120s", self.sync_error(503))
+
+    @override_settings(SYNC_STALL_SECONDS=60)
+    def test_stuck_pending_sync_is_not_ready(self):
+        vendor = self.vendor()
+        pending = PendingSync.objects.create(vendor=vendor)
+        self.assertIsNone(self.sync_error(200))
+
+        PendingSync.objects.filter(id=pending.id).update(queued_at=timezone.now() - timedelta(seconds=120))
+        self.assertIn("pending sync waiting for 120s", self.sync_error(503))
+
+    @override_settings(SYNC_STALL_SECONDS=60)
+    def test_wedged_sync_lock_is_not_ready(self):
+        vendor = self.vendor()
+        lock = SyncLock.objects.create(vendor=vendor, owner="worker-1", heartbeat=timezone.now() - timedelta(seconds=30))
+        self.assertIsNone(self.sync_error(200))
+
+        lock.heartbeat = timezone.now() - timedelta(seconds=120)
+        lock.save()
+        self.assertIn("1 sync lock(s) with a stale heartbeat", self.sync_error(503))
+
+        # A released lock keeps its last heartbeat but is not a stall
+        lock.owner = ""
+        lock.save()
+        self.assertIsNone(self.sync_error(200))
+
+    @override_settings(HEALTH_CHECK_TTL=60)
+    def test_result_is_reused_within_the_ttl(self):
+        self.ready(200)
+        with mock.patch.object(connections["default"], "cursor", side_effect=OperationalError("down")):
+            self.ready(200)
@@ -5,10 +5,20 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,)
 from users.views import RegisterView
-from django.http import JsonResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from compfy.health import liveness, readiness_view
+from compfy.instrumentation import route_stats
+from compfy.metrics import metrics_view
 
-def health(request):
-    return JsonResponse({"status": "ok"})
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAdminUser])
+def performance_stats(request):
+    """Per-route latency histograms from PerformanceMiddleware (this worker only); DELETE resets them"""
+    if request.method == "DELETE":
+        route_stats.reset()
+    return Response({"routes": route_stats.snapshot()})
 
 
 urlpatterns = [
@@ -28,5 +38,9 @@ urlpatterns = [
     path('api/inventory/', include('inventory.urls')),
 
 #Test Frontend
-    path("api/health/", health),
+    path("api/health/", liveness),
+    path("api/health/live/", liveness),
+    path("api/health/ready/", readiness_view),
+    path("api/health/perf/", performance_stats),
+    path("api/metrics/", metrics_view),
 ]
@@ -0,0 +1,18 @@
+# gunicorn.conf.py
+# Picked up automatically by `gunicorn compfy.wsgi` (see Procfile).
+import os
+
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Drop a dead worker's live gauges from the multiprocess metrics directory
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # Load the similar builds index in the background so no request waits for it
+    from builds.similarity import similarity_index
+
+    similarity_index.ensure_loading()
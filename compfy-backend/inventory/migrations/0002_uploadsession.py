@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:25
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+        ('vendors', '0002_vendorbuild_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField(blank=True, help_text='Declared total size in bytes, if known', null=True)),
+                ('received', models.BigIntegerField(default=0)),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('completed', 'Completed'), ('skipped', 'Skipped (identical to previous upload)')], default='open', max_length=20)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='vendors.vendor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vendor', 'status', '-updated_at'], name='upload_vendor_status_idx')],
+            },
+        ),
+    ]
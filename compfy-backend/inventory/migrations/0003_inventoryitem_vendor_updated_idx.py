@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_uploadsession'),
+        ('vendors', '0003_vendorbuild_vendor_title_uniq'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['vendor', 'updated_at'], name='inventory_vendor_updated_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 # inventory/models.py
+import uuid
 from django.db import models
 from vendors.models import Vendor, VendorBuild
 
@@ -10,6 +11,36 @@ class InventoryItem(models.Model):
 
     class Meta:
         unique_together = ('vendor', 'build')  #No duplicates per vendor
+        indexes = [
+            # Inventory listing filtered by updated_after / updated_before
+            models.Index(fields=["vendor", "updated_at"], name="inventory_vendor_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.build.title} ({self.vendor.shop_name})"
+
+
+class UploadSession(models.Model):
+    """A resumable inventory upload; chunks are spooled to disk until finalize"""
+    STATUS_CHOICES = (
+        ("open", "Open"),
+        ("completed", "Completed"),
+        ("skipped", "Skipped (identical to previous upload)"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(null=True, blank=True, help_text="Declared total size in bytes, if known")
+    received = models.BigIntegerField(default=0)
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="open")
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["vendor", "status", "-updated_at"], name="upload_vendor_status_idx")]
+
+    def __str__(self):
+        return f"{self.filename} ({self.vendor.shop_name}, {self.status})"
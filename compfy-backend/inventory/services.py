@@ -0,0 +1,465 @@
+# inventory/services.py
+import csv
+import hashlib
+import os
+import tempfile
+import time
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from vendors.models import VendorBuild, content_hash
+from builds import outbox
+from compfy import metrics
+from .models import InventoryItem, UploadSession
+
+BATCH_SIZE = 500
+
+# Parsed dry-run uploads wait this long for a commit
+UPLOAD_PLAN_TTL = 30 * 60
+PREVIEW_LIST_LIMIT = 500
+
+# Fields a vendor can edit on a build, and the ones that must never be empty
+EDITABLE_FIELDS = ["title", "cpu", "gpu", "ram", "storage", "psu", "case", "price"]
+REQUIRED_FIELDS = ["title", "cpu", "ram", "storage", "price"]
+
+
+def chunked(iterable, size=BATCH_SIZE):
+    """Yield lists of up to `size` items without materializing the iterable"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def clean_build_fields(data, fields=EDITABLE_FIELDS):
+    """
+    Pick and normalize editable fields from a dict.
+    Returns (values, error); only keys present in `data` are kept.
+    """
+    values = {}
+    for field in fields:
+        if field not in data:
+            continue
+        value = data[field]
+        if field in REQUIRED_FIELDS and value in (None, ""):
+            return None, f"{field} is required"
+        if field == "price":
+            # The model field's own checks, so the value also fits max_digits/decimal_places
+            try:
+                value = VendorBuild._meta.get_field("price").clean(str(value).strip(), None)
+            except ValidationError:
+                return None, "invalid price"
+        elif field in ("psu", "case") and value is None:
+            value = ""
+        values[field] = value
+    return values, None
+
+
+def filter_inventory(items, params):
+    """Filter InventoryItems by build price, any component name and updated_at"""
+    if params.get("min_price"):
+        items = items.filter(build__price__gte=params["min_price"])
+    if params.get("max_price"):
+        items = items.filter(build__price__lte=params["max_price"])
+    if params.get("updated_after"):
+        items = items.filter(updated_at__gte=params["updated_after"])
+    if params.get("updated_before"):
+        items = items.filter(updated_at__lt=params["updated_before"])
+    if params.get("component"):
+        term = params["component"]
+        match = Q()
+        for field in ("cpu", "gpu", "ram", "storage", "psu", "case"):
+            match |= Q(**{f"build__{field}__icontains": term})
+        items = items.filter(match)
+    return items
+
+
+# -------------------- CSV parsing --------------------
+def parse_upload_rows(lines):
+    """
+    Parse an inventory CSV from any iterable of text lines, one row at a time.
+    Yields (values, error) per row; exactly one of the two is set.
+    """
+    reader = csv.DictReader(lines)
+    for number, row in enumerate(reader, start=1):
+        data = {
+            "title": row.get("build_name"),
+            "cpu": row.get("cpu_model"),
+            "gpu": row.get("gpu_model", ""),
+            "ram": row.get("ram"),
+            "storage": row.get("storage"),
+            "psu": row.get("psu"),
+            "case": row.get("case"),
+            "price": row.get("price"),
+        }
+        if not all(data[field] for field in REQUIRED_FIELDS):
+            yield None, f"Row {number} missing required fields"
+            continue
+
+        values, error = clean_build_fields(data)
+        if error:
+            yield None, f"Row {number} has {error}"
+            continue
+        yield values, None
+
+
+# -------------------- Batched writes --------------------
+def _save_batch(vendor, to_create, to_update):
+    """Write one batch in a transaction and return the ids of the created rows"""
+    created_ids = []
+    with transaction.atomic():
+        if to_create:
+            VendorBuild.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+            created_ids = [vb.pk for vb in to_create]
+            if None in created_ids:
+                # Backends without RETURNING (MySQL) leave pk unset
+                created_ids = list(
+                    VendorBuild.objects.filter(vendor=vendor, title__in=[vb.title for vb in to_create])
+                    .values_list("id", flat=True)
+                )
+        if to_update:
+            VendorBuild.objects.bulk_update(to_update, EDITABLE_FIELDS + ["content_hash"], batch_size=BATCH_SIZE)
+
+        # Keep every written build visible in the vendor's inventory
+        changed_ids = created_ids + [vb.id for vb in to_update]
+        InventoryItem.objects.bulk_create(
+            [InventoryItem(vendor=vendor, build_id=build_id) for build_id in changed_ids],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+    return created_ids
+
+
+def write_builds_by_title(vendor, rows):
+    """
+    Create or update one batch of a vendor's builds keyed by title.
+    Stored rows are loaded in one query and only rows whose content hash
+    changed are written. Returns (created_ids, updated_ids, unchanged_count).
+    """
+    by_title = {}
+    for values in rows:
+        by_title[values["title"]] = values  # a later duplicate wins
+
+    existing = {}
+    for vb in VendorBuild.objects.filter(vendor=vendor, title__in=list(by_title)).order_by("id"):
+        existing.setdefault(vb.title, vb)
+
+    to_create, to_update, unchanged = [], [], 0
+    for title, values in by_title.items():
+        vb = existing.get(title)
+        if vb is None:
+            vb = VendorBuild(vendor=vendor, **values)
+            vb.content_hash = vb.compute_content_hash()
+            to_create.append(vb)
+            continue
+
+        for field, value in values.items():
+            setattr(vb, field, value)
+        new_hash = vb.compute_content_hash()
+        if new_hash == vb.content_hash:
+            unchanged += 1
+            continue
+        vb.content_hash = new_hash
+        to_update.append(vb)
+
+    created_ids = _save_batch(vendor, to_create, to_update)
+    return created_ids, [vb.id for vb in to_update], unchanged
+
+
+def write_builds_by_id(vendor, rows):
+    """
+    Apply partial updates to existing builds of this vendor, keyed by id.
+    A rename onto a title another of the vendor's builds holds (or another
+    row in the batch claims) is skipped, since titles are unique per vendor.
+    Returns (updated_ids, unchanged_count, missing_ids, conflicts) where
+    conflicts is a list of (id, title).
+    """
+    by_id = {row["id"]: row["values"] for row in rows}
+    builds = VendorBuild.objects.filter(vendor=vendor, id__in=list(by_id)).in_bulk()
+
+    claimed = {}
+    for build_id, values in by_id.items():
+        if "title" in values and build_id in builds and values["title"] != builds[build_id].title:
+            claimed.setdefault(values["title"], []).append(build_id)
+    taken = dict(
+        VendorBuild.objects.filter(vendor=vendor, title__in=list(claimed)).values_list("title", "id")
+    ) if claimed else {}
+
+    to_update, unchanged, conflicts = [], 0, []
+    for build_id, values in by_id.items():
+        vb = builds.get(build_id)
+        if vb is None:
+            continue
+        title = values.get("title", vb.title)
+        if title != vb.title and (title in taken or len(claimed[title]) > 1):
+            conflicts.append((build_id, title))
+            continue
+        for field, value in values.items():
+            setattr(vb, field, value)
+        new_hash = vb.compute_content_hash()
+        if new_hash == vb.content_hash:
+            unchanged += 1
+            continue
+        vb.content_hash = new_hash
+        to_update.append(vb)
+
+    _save_batch(vendor, [], to_update)
+    missing = [build_id for build_id in by_id if build_id not in builds]
+    return [vb.id for vb in to_update], unchanged, missing, conflicts
+
+
+# -------------------- Upload ingestion --------------------
+def _split_parsed(batch, result):
+    """Count a batch of parsed rows into `result` and return the valid ones"""
+    valid = []
+    for values, error in batch:
+        result["rowsProcessed"] += 1
+        if error:
+            result["rowsInvalid"] += 1
+            result["errors"].append(error)
+        else:
+            valid.append(values)
+    return valid
+
+
+def ingest_upload(vendor, parsed):
+    """
+    Write parsed upload rows, (values, error) pairs, batch by batch.
+    Returns the upload report and the ids of created/updated builds.
+    """
+    result = {"rowsProcessed": 0, "rowsCreated": 0, "rowsUpdated": 0,
+              "rowsUnchanged": 0, "rowsInvalid": 0, "errors": []}
+    changed_ids = []
+    started = time.perf_counter()
+    for batch in chunked(parsed):
+        valid = _split_parsed(batch, result)
+        created_ids, updated_ids, unchanged = write_builds_by_title(vendor, valid)
+        result["rowsCreated"] += len(created_ids)
+        result["rowsUpdated"] += len(updated_ids)
+        result["rowsUnchanged"] += unchanged
+        changed_ids += created_ids + updated_ids
+    metrics.observe_upload(time.perf_counter() - started, result)
+    return result, changed_ids
+
+
+def preview_upload(vendor, parsed):
+    """
+    Classify parsed upload rows as create/update/unchanged/invalid without
+    writing, using one hash lookup per batch. Returns the preview report
+    and the valid rows to cache for a later commit.
+    """
+    result = {"rowsProcessed": 0, "rowsCreate": 0, "rowsUpdate": 0,
+              "rowsUnchanged": 0, "rowsInvalid": 0, "errors": [],
+              "toCreate": [], "toUpdate": []}
+    rows = {}
+    for batch in chunked(parsed):
+        valid = {values["title"]: values for values in _split_parsed(batch, result)}
+        new = {title: values for title, values in valid.items() if title not in rows}
+        rows.update(valid)  # a later duplicate wins, as it would on commit
+
+        stored = {}
+        for title, stored_hash in (
+            VendorBuild.objects.filter(vendor=vendor, title__in=list(new)).order_by("-id").values_list("title", "content_hash")
+        ):
+            stored[title] = stored_hash  # ordered so the oldest row wins, like write_builds_by_title
+
+        for title, values in new.items():
+            if title not in stored:
+                key, listing = "rowsCreate", "toCreate"
+            elif stored[title] != content_hash(values):
+                key, listing = "rowsUpdate", "toUpdate"
+            else:
+                result["rowsUnchanged"] += 1
+                continue
+            result[key] += 1
+            if len(result[listing]) < PREVIEW_LIST_LIMIT:
+                result[listing].append(title)
+    return result, list(rows.values())
+
+
+def upload_plan_key(token):
+    return f"inventory:upload-plan:{token}"
+
+
+# -------------------- Resumable uploads --------------------
+SPOOL_CHUNK = 64 * 1024
+
+
+def upload_spool_path(session):
+    """Where a resumable upload's bytes are spooled (settings.INVENTORY_UPLOAD_DIR or the temp dir)"""
+    directory = getattr(settings, "INVENTORY_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "compfy-uploads"))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{session.id}.part")
+
+
+def spooled_size(session):
+    """
+    Bytes actually on disk for a session. If the spool lost data (temp dir
+    wiped, request landed on another host) `received` is wound back so the
+    client resumes from what is really there.
+    """
+    path = upload_spool_path(session)
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    if size < session.received:
+        session.received = size
+        session.save(update_fields=["received", "updated_at"])
+    return session.received
+
+
+def append_upload_chunk(session, stream, max_bytes):
+    """Append a request body to the spool file without loading it into memory; returns bytes written"""
+    written = 0
+    with open(upload_spool_path(session), "ab") as spool:
+        # The file may hold bytes from an attempt that died before updating `received`
+        spool.truncate(session.received)
+        spool.seek(session.received)
+        while True:
+            data = stream.read(SPOOL_CHUNK)
+            if not data:
+                break
+            written += len(data)
+            if written > max_bytes:
+                spool.truncate(session.received)
+                raise ValueError(f"Chunk larger than {max_bytes} bytes")
+            spool.write(data)
+    return written
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(SPOOL_CHUNK), b""):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def finalize_upload(session):
+    """
+    Hash the spooled file and ingest it through the streaming CSV path.
+    An upload identical to the vendor's last completed one is skipped.
+    Returns (result, changed_ids). Raises ValueError for a file that isn't
+    UTF-8 CSV. Call it inside transaction.atomic(): the spool file is only
+    removed once the ingest commits, so a failed finalize can be retried.
+    """
+    path = upload_spool_path(session)
+    session.content_hash = hash_file(path)
+    changed_ids = []
+    previous = (
+        UploadSession.objects.filter(vendor=session.vendor, status="completed")
+        .exclude(id=session.id).order_by("-updated_at").first()
+    )
+    if previous and previous.content_hash == session.content_hash:
+        session.status = "skipped"
+        session.result = {"skipped": True, "duplicateOf": str(previous.id)}
+    else:
+        try:
+            with open(path, encoding="utf-8", newline="") as lines:
+                session.result, changed_ids = ingest_upload(session.vendor, parse_upload_rows(lines))
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ValueError(f"Upload is not a valid UTF-8 CSV file: {e}") from e
+        session.status = "completed"
+    session.save()
+    transaction.on_commit(lambda: _remove_spool(path))
+    return session.result, changed_ids
+
+
+def _remove_spool(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+# -------------------- Snapshot reconciliation --------------------
+def diff_snapshot(vendor, rows):
+    """
+    Diff a vendor's complete inventory snapshot against stored builds.
+    Rows are keyed by title and compared by content hash, so only stored
+    ids, titles and hashes are read. Returns a dict of insert/update lists,
+    delete ids and an unchanged count.
+    """
+    stored = {}
+    deletes = []
+    for build_id, title, stored_hash in (
+        VendorBuild.objects.filter(vendor=vendor).order_by("id").values_list("id", "title", "content_hash")
+    ):
+        if title in stored:
+            deletes.append(build_id)  # duplicate title left over from before keyed uploads
+        else:
+            stored[title] = (build_id, stored_hash)
+
+    inserts, updates, unchanged = [], [], 0
+    for values in rows:
+        vb = VendorBuild(vendor=vendor, **values)
+        vb.content_hash = vb.compute_content_hash()
+        match = stored.pop(values["title"], None)
+        if match is None:
+            inserts.append(vb)
+        elif match[1] != vb.content_hash:
+            vb.id = match[0]
+            updates.append(vb)
+        else:
+            unchanged += 1
+
+    # Whatever the snapshot no longer mentions is gone from the shop
+    deletes += [build_id for build_id, _ in stored.values()]
+    return {"inserts": inserts, "updates": updates, "deletes": deletes, "unchanged": unchanged}
+
+
+def apply_snapshot(vendor, diff):
+    """Apply a snapshot diff in one transaction and return the affected VendorBuild ids"""
+    with transaction.atomic():
+        created_ids = _save_batch(vendor, diff["inserts"], diff["updates"])
+        for batch in chunked(diff["deletes"]):
+            InventoryItem.objects.filter(vendor=vendor, build_id__in=batch).delete()
+            VendorBuild.objects.filter(vendor=vendor, id__in=batch).delete()
+    return created_ids + [vb.id for vb in diff["updates"]] + diff["deletes"]
+
+
+# -------------------- Bulk delete --------------------
+DELETE_FILTERS = {
+    "title_contains": "title__icontains",
+    "min_price": "price__gte",
+    "max_price": "price__lte",
+    "created_before": "created_at__lt",
+    "created_after": "created_at__gte",
+    "is_active": "is_active",
+}
+
+
+def filter_vendor_builds(vendor, criteria):
+    """
+    Vendor builds matching a delete filter such as {"max_price": 20000}.
+    Returns (queryset, error); {"all": true} matches the whole inventory.
+    """
+    unknown = set(criteria) - set(DELETE_FILTERS) - {"all"}
+    if unknown:
+        return None, f"Unknown filter(s): {', '.join(sorted(unknown))}"
+    lookups = {DELETE_FILTERS[key]: value for key, value in criteria.items() if key in DELETE_FILTERS}
+    if not lookups and criteria.get("all") is not True:
+        return None, 'Empty filter; pass {"all": true} to delete everything'
+    try:
+        return VendorBuild.objects.filter(vendor=vendor, **lookups), None
+    except (ValueError, ValidationError) as e:
+        return None, f"Invalid filter value: {e}"
+
+
+def delete_vendor_builds(vendor, build_ids, chunk_size=BATCH_SIZE, debounce=False):
+    """
+    Delete a vendor's builds in chunks inside one transaction: inventory items
+    first, then the builds. Flushing the vendor's outbox then removes the
+    catalog builds and their component links; with `debounce` that is left
+    to the debounced trigger instead.
+    """
+    build_ids = list(build_ids)
+    with transaction.atomic():
+        for batch in chunked(build_ids, chunk_size):
+            InventoryItem.objects.filter(vendor=vendor, build_id__in=batch).delete()
+            VendorBuild.objects.filter(vendor=vendor, id__in=batch).delete()
+    # After the commit, so a sync already running for this vendor sees the deletes
+    if build_ids and not debounce:
+        outbox.flush(vendor.id)
+    return len(build_ids)
@@ -1,3 +1,566 @@
-from django.test import TestCase
+import csv
+import functools
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.http import StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from builds import trigger
+from builds.models import Build
+from inventory.models import InventoryItem, UploadSession
+from inventory.services import upload_plan_key, upload_spool_path
+from inventory.views import VendorInventoryExportView
+from utils.explain import assert_uses_index
+from utils.querybudget import QueryBudget
+from utils.services.export import EXPORT_FORMATS, iterate_in_chunks
+from utils.testing import generate_catalog
+from vendors.models import Vendor, VendorBuild, VendorBuildChange
+
+
+class InventoryQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=2, builds_per_vendor=40, no_catalog=True)
+        cls.vendor = Vendor.objects.first()
+
+    def test_inventory_list_queries_do_not_grow_with_the_inventory(self):
+        with QueryBudget(2, label="inventory list") as budget:
+            response = self.client.get(f"/api/inventory/{self.vendor.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 40)
+        self.assertEqual(budget.repeated, [])
+
+    def test_paginated_inventory_within_budget(self):
+        with QueryBudget(3, label="inventory page"):
+            response = self.client.get(f"/api/inventory/{self.vendor.id}/", {"page_size": 10})
+        self.assertEqual(response.status_code, 200)
+
+    def test_inventory_list_uses_vendor_index(self):
+        assert_uses_index(InventoryItem.objects.filter(vendor=self.vendor).order_by("id"), "vendor_id")
+
+    def test_upload_hash_lookup_uses_vendor_index(self):
+        assert_uses_index(VendorBuild.objects.filter(vendor=self.vendor, title__in=["a", "b"]), "vendor")
+
+    def test_last_upload_lookup_uses_status_index(self):
+        sessions = UploadSession.objects.filter(vendor=self.vendor, status="completed").order_by("-updated_at")
+        assert_uses_index(sessions, "upload_vendor_status_idx")
+
+    def test_inventory_by_recent_update_uses_vendor_updated_index(self):
+        recent = InventoryItem.objects.filter(vendor=self.vendor).order_by("-updated_at")
+        assert_uses_index(recent, "inventory_vendor_updated_idx")
+
+
+class InventoryFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=2, builds_per_vendor=10, no_catalog=True)
+        cls.vendor = Vendor.objects.order_by("id").first()
+        items = list(InventoryItem.objects.filter(vendor=cls.vendor).order_by("id"))
+        cls.cheap, cls.mid, cls.dear = items[:3]
+        for item, price in ((cls.cheap, "1000"), (cls.mid, "2000"), (cls.dear, "3000")):
+            VendorBuild.objects.filter(id=item.build_id).update(price=Decimal(price))
+        VendorBuild.objects.exclude(id__in=[cls.cheap.build_id, cls.mid.build_id, cls.dear.build_id]).update(
+            price=Decimal("500000"),
+        )
+        VendorBuild.objects.filter(id=cls.mid.build_id).update(gpu="Filtertest Radeon 9999")
+        # The other vendor's build with the same part must not show up
+        other = VendorBuild.objects.exclude(vendor=cls.vendor).first()
+        VendorBuild.objects.filter(id=other.id).update(gpu="Filtertest Radeon 9999")
+
+        cls.since = timezone.now() - timedelta(days=1)
+        InventoryItem.objects.filter(vendor=cls.vendor).update(updated_at=cls.since - timedelta(days=30))
+        InventoryItem.objects.filter(id=cls.dear.id).update(updated_at=timezone.now())
+
+    def ids(self, **params):
+        response = self.client.get(f"/api/inventory/{self.vendor.id}/", params)
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.json()]
+
+    def test_price_range(self):
+        self.assertEqual(self.ids(min_price=1500, max_price=3000), [self.mid.build_id, self.dear.build_id])
+        self.assertEqual(self.ids(max_price=1000), [self.cheap.build_id])
+
+    def test_component_matches_any_part_case_insensitively(self):
+        self.assertEqual(self.ids(component="filtertest radeon"), [self.mid.build_id])
+
+    def test_updated_after(self):
+        self.assertEqual(self.ids(updated_after=self.since.isoformat()), [self.dear.build_id])
+        self.assertNotIn(self.dear.build_id, self.ids(updated_before=self.since.isoformat()))
+
+    def test_filters_combine_and_paginate(self):
+        response = self.client.get(
+            f"/api/inventory/{self.vendor.id}/", {"max_price": 3000, "updated_after": self.since.isoformat(), "page_size": 1},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 1)
+        self.assertEqual([item["id"] for item in response.json()["results"]], [self.dear.build_id])
+
+    def test_invalid_values_are_400(self):
+        for params in ({"min_price": "cheap"}, {"max_price": "1,000"}, {"updated_after": "yesterday"},
+                       {"updated_before": "2024-13-40"}):
+            with self.subTest(**params):
+                response = self.client.get(f"/api/inventory/{self.vendor.id}/", params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": "Invalid filter value"})
+
+
+class BulkUpdateTitleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=1, builds_per_vendor=3, no_catalog=True)
+        cls.vendor = Vendor.objects.get()
+        cls.first, cls.second, cls.third = VendorBuild.objects.filter(vendor=cls.vendor).order_by("id")
+
+    def bulk_update(self, payload):
+        response = self.client.put(
+            f"/api/inventory/{self.vendor.id}/bulk-update/", payload, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_rename_onto_a_taken_title_is_reported_not_saved(self):
+        result = self.bulk_update([{"id": self.second.id, "title": self.first.title}])
+        self.assertEqual(result["updated"], 0)
+        self.assertEqual(len(result["errors"]), 1)
+        self.assertIn("already used", result["errors"][0])
+        self.second.refresh_from_db()
+        self.assertNotEqual(self.second.title, self.first.title)
+
+    def test_two_rows_claiming_one_new_title_are_both_rejected(self):
+        result = self.bulk_update([
+            {"id": self.first.id, "title": "Shared name"},
+            {"id": self.second.id, "title": "Shared name"},
+            {"id": self.third.id, "title": "Unique name"},
+        ])
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(len(result["errors"]), 2)
+        self.assertFalse(VendorBuild.objects.filter(title="Shared name").exists())
+
+
+@override_settings(SYNC_QUIET_SECONDS=2, SYNC_MAX_DELAY_SECONDS=10)
+class DebouncedSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=1, builds_per_vendor=5)
+        cls.vendor = Vendor.objects.get()
+        cls.builds = list(VendorBuild.objects.filter(vendor=cls.vendor).order_by("id"))
+
+    def reprice(self, vb, price):
+        response = self.client.put(
+            f"/api/inventory/{self.vendor.id}/bulk-update/", [{"id": vb.id, "price": str(price)}],
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def catalog_price(self, vb):
+        return Build.objects.get(source="vendor", vendor_build_id=vb.id).price
+
+    def test_burst_of_edits_syncs_once_after_the_quiet_window(self):
+        before = self.catalog_price(self.builds[0])
+        self.reprice(self.builds[0], 123400)
+        result = self.reprice(self.builds[1], 99900)
+        self.assertEqual(result["syncStatus"]["status"], "pending")
+        self.assertEqual(result["syncStatus"]["pendingBuilds"], 2)
+        self.assertEqual(self.catalog_price(self.builds[0]), before)
+
+        self.assertEqual(trigger.run_due(timezone.now() + timedelta(seconds=1)), {})
+        synced = trigger.run_due(timezone.now() + timedelta(seconds=3))
+        self.assertEqual(synced[self.vendor.id]["synced"], 2)
+        self.assertEqual(self.catalog_price(self.builds[0]), 123400)
+        self.assertEqual(self.catalog_price(self.builds[1]), 99900)
+
+        status = self.client.get(f"/api/inventory/{self.vendor.id}/sync-status/").json()
+        self.assertEqual(status["status"], "up_to_date")
+        self.assertIsNotNone(status["lastSyncedAt"])
+
+    def test_constant_edits_still_sync_at_the_max_delay(self):
+        self.reprice(self.builds[0], 123400)
+        VendorBuildChange.objects.update(created_at=timezone.now() - timedelta(seconds=11))
+        # A fresh edit keeps the vendor from ever going quiet
+        self.reprice(self.builds[1], 99900)
+        self.assertEqual(trigger.due_vendors(), [self.vendor.id])
+
+    def test_deleted_build_leaves_the_catalog_on_the_next_sync(self):
+        vb = self.builds[2]
+        response = self.client.delete(f"/api/inventory/vendor/{self.vendor.id}/build/{vb.id}/delete/")
+        self.assertEqual(response.status_code, 204)
+        self.assertTrue(Build.objects.filter(vendor_build_id=vb.id).exists())
+        trigger.run_due(timezone.now() + timedelta(seconds=3))
+        self.assertFalse(Build.objects.filter(vendor_build_id=vb.id).exists())
+
+    @override_settings(SYNC_QUIET_SECONDS=0)
+    def test_zero_quiet_window_syncs_inline(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reprice(self.builds[0], 123400)
+        self.assertEqual(trigger.sync_status(self.vendor.id)["status"], "up_to_date")
+        self.assertEqual(self.catalog_price(self.builds[0]), 123400)
+
+
+class ResumableUploadTests(TestCase):
+    CSV = (
+        "build_name,cpu_model,gpu_model,ram,storage,psu,case,price\n"
+        "Chunked One,Ryzen 5 5600,RTX 3060,16GB,1TB,650W,Mid tower,95000\n"
+        "Chunked Two,Core i5 12400,,8GB,512GB,500W,Mini,55000\n"
+    ).encode()
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=1, builds_per_vendor=2, no_catalog=True)
+        cls.vendor = Vendor.objects.get()
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        upload_dir = self.settings(INVENTORY_UPLOAD_DIR=directory)
+        upload_dir.enable()
+        self.addCleanup(upload_dir.disable)
+
+    def start(self, data):
+        response = self.client.post(
+            f"/api/inventory/{self.vendor.id}/uploads/", {"filename": "stock.csv", "size": len(data)},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()["uploadId"]
+
+    def put(self, upload_id, offset, data):
+        return self.client.put(
+            f"/api/inventory/{self.vendor.id}/uploads/{upload_id}/?offset={offset}", data,
+            content_type="application/octet-stream",
+        )
+
+    def upload(self, data):
+        upload_id = self.start(data)
+        self.assertEqual(self.put(upload_id, 0, data).status_code, 200)
+        return upload_id
+
+    def finalize(self, upload_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f"/api/inventory/{self.vendor.id}/uploads/{upload_id}/finalize/")
+
+    def test_session_needs_a_csv_filename_and_integer_size(self):
+        for body in ({"filename": 5}, {"filename": ["stock.csv"]}, {"filename": "stock.xlsx"},
+                     {"filename": "stock.csv", "size": "big"}):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    f"/api/inventory/{self.vendor.id}/uploads/", body, content_type="application/json",
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_chunks_append_at_the_current_offset(self):
+        upload_id = self.start(self.CSV)
+        half = len(self.CSV) // 2
+        self.assertEqual(self.put(upload_id, 0, self.CSV[:half]).json()["offset"], half)
+        self.assertEqual(self.client.get(f"/api/inventory/{self.vendor.id}/uploads/{upload_id}/").json()["offset"], half)
+
+        # A retried or skipped chunk is refused with the offset to resume from
+        for offset in (0, half + 10):
+            response = self.put(upload_id, offset, self.CSV[half:])
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()["offset"], half)
+
+        incomplete = self.client.post(f"/api/inventory/{self.vendor.id}/uploads/{upload_id}/finalize/")
+        self.assertEqual(incomplete.status_code, 409)
+
+        self.assertEqual(self.put(upload_id, half, self.CSV[half:]).json()["offset"], len(self.CSV))
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "completed")
+        self.assertEqual(response.json()["result"]["rowsCreated"], 2)
+        self.assertTrue(VendorBuild.objects.filter(vendor=self.vendor, title="Chunked Two").exists())
+        self.assertFalse(os.path.exists(upload_spool_path(UploadSession.objects.get(id=upload_id))))
+
+    def test_identical_upload_is_skipped(self):
+        self.finalize(self.upload(self.CSV))
+        response = self.finalize(self.upload(self.CSV))
+        self.assertEqual(response.json()["status"], "skipped")
+
+    def test_undecodable_upload_is_rejected_and_kept(self):
+        data = self.CSV.replace(b"Chunked Two", b"Chunked \xff\xfe")
+        upload_id = self.upload(data)
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("UTF-8", response.json()["error"])
+
+        session = UploadSession.objects.get(id=upload_id)
+        self.assertEqual((session.status, session.received), ("open", len(data)))
+        self.assertFalse(VendorBuild.objects.filter(title="Chunked One").exists())
+        self.assertTrue(os.path.exists(upload_spool_path(session)))
+
+    def test_failed_finalize_keeps_the_spool_for_a_retry(self):
+        upload_id = self.upload(self.CSV)
+        with mock.patch("inventory.services.ingest_upload", side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                self.finalize(upload_id)
+        self.assertEqual(UploadSession.objects.get(id=upload_id).status, "open")
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.json()["status"], "completed")
+        self.assertEqual(response.json()["result"]["rowsCreated"], 2)
+
+
+class UploadHashTests(TestCase):
+    HEADER = "build_name,cpu_model,gpu_model,ram,storage,psu,case,price\n"
+    ROWS = [
+        "Hash One,Ryzen 5 5600,RTX 3060,16GB,1TB,650W,Mid tower,95000\n",
+        "Hash Two,Core i5 12400,,8GB,512GB,500W,Mini,55000\n",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=1, builds_per_vendor=2, no_catalog=True)
+        cls.vendor = Vendor.objects.get()
+
+    def upload(self, rows):
+        upload = SimpleUploadedFile("stock.csv", (self.HEADER + "".join(rows)).encode(), content_type="text/csv")
+        response = self.client.post(f"/api/inventory/{self.vendor.id}/upload/", {"file": upload})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_reupload_only_writes_changed_rows(self):
+        self.assertEqual(self.upload(self.ROWS)["rowsCreated"], 2)
+        again = self.upload(self.ROWS)
+        self.assertEqual((again["rowsCreated"], again["rowsUpdated"], again["rowsUnchanged"]), (0, 0, 2))
+
+        edited = self.upload([self.ROWS[0].replace("95000", "94000.00"), self.ROWS[1].replace("55000", "55000.00")])
+        self.assertEqual((edited["rowsUpdated"], edited["rowsUnchanged"]), (1, 1))
+        self.assertEqual(VendorBuild.objects.get(vendor=self.vendor, title="Hash One").price, 94000)
+
+    def test_price_must_fit_the_price_column(self):
+        for price in ("1e20", "12.345", "NaN"):
+            with self.subTest(price=price):
+                result = self.upload([self.ROWS[0].replace("95000", price)])
+                self.assertEqual((result["rowsInvalid"], result["rowsCreated"]), (1, 0))
+
+        builds = list(VendorBuild.objects.filter(vendor=self.vendor).values("title", "cpu", "ram", "storage", "price"))
+        builds[0]["price"] = "1e20"
+        response = self.client.post(f"/api/inventory/{self.vendor.id}/reconcile/", builds, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(VendorBuild.objects.filter(price__gt=10 ** 8).exists())
+
+
+class UploadPlanTests(TestCase):
+    HEADER, ROWS = UploadHashTests.HEADER, UploadHashTests.ROWS
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=2, builds_per_vendor=2, no_catalog=True)
+        cls.vendor, cls.other = Vendor.objects.order_by("id")
+        VendorBuild.objects.create(vendor=cls.vendor, title="Hash Two", cpu="Core i5 12400", ram="8GB",
+                                   storage="512GB", psu="500W", case="Mini", price=50000)
+
+    def preview(self, rows):
+        upload = SimpleUploadedFile("stock.csv", (self.HEADER + "".join(rows)).encode(), content_type="text/csv")
+        response = self.client.post(f"/api/inventory/{self.vendor.id}/upload/?dry_run=1", {"file": upload})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def commit(self, token, vendor=None, status=200):
+        vendor = vendor or self.vendor
+        response = self.client.post(f"/api/inventory/{vendor.id}/upload/commit/", {"token": token}, content_type="application/json")
+        self.assertEqual(response.status_code, status)
+        return response.json()
+
+    def test_dry_run_reports_the_diff_without_writing(self):
+        count = VendorBuild.objects.count()
+        plan = self.preview(self.ROWS + ["Broken,,,,,,,abc\n"])
+        self.assertTrue(plan["dryRun"])
+        self.assertEqual((plan["rowsCreate"], plan["rowsUpdate"], plan["rowsUnchanged"], plan["rowsInvalid"]), (1, 1, 0, 1))
+        self.assertEqual((plan["toCreate"], plan["toUpdate"]), (["Hash One"], ["Hash Two"]))
+        self.assertEqual(VendorBuild.objects.count(), count)
+
+    def test_commit_applies_the_plan_once(self):
+        token = self.preview(self.ROWS)["token"]
+        self.commit(token, vendor=self.other, status=404)
+
+        result = self.commit(token)
+        self.assertEqual((result["rowsCreated"], result["rowsUpdated"]), (1, 1))
+        self.assertEqual(VendorBuild.objects.get(vendor=self.vendor, title="Hash Two").price, 55000)
+        self.assertEqual(self.commit(token, status=404)["error"], "Upload plan not found or expired")
+
+    def test_expired_plan_is_not_found(self):
+        token = self.preview(self.ROWS)["token"]
+        cache.delete(upload_plan_key(token))
+        self.commit(token, status=404)
+        self.assertFalse(VendorBuild.objects.filter(title="Hash One").exists())
+
+    def test_commit_compares_against_the_current_inventory(self):
+        token = self.preview(self.ROWS)["token"]
+        build = VendorBuild.objects.get(vendor=self.vendor, title="Hash Two")
+        build.price = 55000
+        build.save()  # the edit the plan was going to make
+
+        result = self.commit(token)
+        self.assertEqual((result["rowsCreated"], result["rowsUpdated"], result["rowsUnchanged"]), (1, 0, 1))
+
+
+class ReconcileSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=1, builds_per_vendor=4, no_catalog=True)
+        cls.vendor = Vendor.objects.get()
+
+    def reconcile(self, payload, status=200):
+        response = self.client.post(f"/api/inventory/{self.vendor.id}/reconcile/", payload, content_type="application/json")
+        self.assertEqual(response.status_code, status, response.content[:300])
+        return response.json()
+
+    def snapshot(self):
+        fields = ("title", "cpu", "gpu", "ram", "storage", "psu", "case", "price")
+        return [
+            {**row, "price": str(row["price"])}
+            for row in VendorBuild.objects.filter(vendor=self.vendor).order_by("id").values(*fields)
+        ]
+
+    def test_only_the_diff_is_written(self):
+        rows = self.snapshot()
+        rows[0]["price"] = "12345.00"
+        dropped = rows.pop(1)["title"]
+        rows.append({**rows[-1], "title": "Brand new build"})
+
+        result = self.reconcile(rows)
+        self.assertEqual(result, {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 2})
+        self.assertFalse(VendorBuild.objects.filter(vendor=self.vendor, title=dropped).exists())
+        self.assertEqual(self.reconcile(self.snapshot())["unchanged"], 4)
+
+    def test_empty_snapshot_needs_confirmation(self):
+        self.assertIn("all", self.reconcile([], status=400)["error"])
+        self.reconcile({"builds": []}, status=400)
+        self.assertEqual(VendorBuild.objects.filter(vendor=self.vendor).count(), 4)
+
+        self.assertEqual(self.reconcile({"builds": [], "all": True})["deleted"], 4)
+        self.assertFalse(VendorBuild.objects.filter(vendor=self.vendor).exists())
+
+
+class BulkDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=1, builds_per_vendor=6)
+        cls.vendor = Vendor.objects.get()
+        VendorBuild.objects.filter(vendor=cls.vendor).update(price=50000, created_at=timezone.now())
+        cls.builds = list(VendorBuild.objects.filter(vendor=cls.vendor).order_by("id"))
+        first, second, third, fourth = (build.id for build in cls.builds[:4])
+        VendorBuild.objects.filter(id=first).update(title="Office i3 special")
+        VendorBuild.objects.filter(id=second).update(price=15000)
+        VendorBuild.objects.filter(id=third).update(price=250000)
+        VendorBuild.objects.filter(id=fourth).update(created_at=timezone.now() - timedelta(days=30), is_active=False)
+
+    def bulk_delete(self, payload, status=200):
+        response = self.client.post(f"/api/inventory/{self.vendor.id}/bulk-delete/", payload, content_type="application/json")
+        self.assertEqual(response.status_code, status, response.content[:300])
+        return response.json()
+
+    def remaining(self):
+        return set(VendorBuild.objects.filter(vendor=self.vendor).values_list("id", flat=True))
+
+    def test_each_filter_deletes_only_its_matches(self):
+        week_ago = (timezone.now() - timedelta(days=7)).isoformat()
+        cases = [
+            ({"title_contains": "I3"}, self.builds[0]),
+            ({"max_price": 20000}, self.builds[1]),
+            ({"min_price": "200000"}, self.builds[2]),
+            ({"created_before": week_ago, "is_active": True}, None),
+            ({"created_before": week_ago}, self.builds[3]),
+        ]
+        for criteria, build in cases:
+            with self.subTest(criteria=criteria):
+                before = self.remaining()
+                expected = {build.id} if build else set()
+                self.assertEqual(self.bulk_delete({"filter": criteria})["deleted"], len(expected))
+                self.assertEqual(before - self.remaining(), expected)
+
+        self.assertEqual(self.bulk_delete({"filter": {"created_after": week_ago, "is_active": True}})["deleted"], 2)
+        self.assertEqual(self.remaining(), set())
+
+    def test_bad_filters_delete_nothing(self):
+        for criteria in ({"max_price": "cheap"}, {"created_before": "last week"}, {"is_active": "maybe"},
+                         {"colour": "red"}, {}, {"all": "yes"}):
+            with self.subTest(criteria=criteria):
+                self.assertIn("error", self.bulk_delete({"filter": criteria}, status=400))
+        self.bulk_delete({"ids": ["one"]}, status=400)
+        self.bulk_delete({}, status=400)
+        self.assertEqual(len(self.remaining()), 6)
+
+    def test_catalog_builds_leave_with_the_flush(self):
+        ids = [build.id for build in self.builds[:2]]
+        self.assertEqual(Build.objects.filter(vendor_build_id__in=ids).count(), 2)
+
+        self.assertEqual(self.bulk_delete({"ids": ids + [10 ** 9]})["deleted"], 2)
+        self.assertFalse(Build.objects.filter(vendor_build_id__in=ids).exists())
+        self.assertFalse(InventoryItem.objects.filter(build_id__in=ids).exists())
+        self.assertEqual(Build.objects.filter(source="vendor", vendor_build_id__in=self.remaining()).count(), 4)
+        self.assertEqual(trigger.sync_status(self.vendor.id)["status"], "up_to_date")
+
+    def test_all_deletes_the_whole_inventory(self):
+        self.assertEqual(self.bulk_delete({"filter": {"all": True}})["deleted"], 6)
+        self.assertFalse(Build.objects.filter(vendor_build_id__in=[build.id for build in self.builds]).exists())
+
+
+class InventoryExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=2, builds_per_vendor=5, no_catalog=True)
+        cls.vendor = Vendor.objects.order_by("id").first()
+        cls.cheap = VendorBuild.objects.filter(vendor=cls.vendor).order_by("id").first()
+        VendorBuild.objects.filter(vendor=cls.vendor).update(price=80000)
+        VendorBuild.objects.filter(id=cls.cheap.id).update(price=12000, title='Starter, "home" build')
+
+    def export(self, file_format, status=200, **params):
+        response = self.client.get(f"/api/inventory/{self.vendor.id}/export/{file_format}/", params)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def test_csv_matches_the_upload_template(self):
+        response = self.export("csv")
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(response["Content-Disposition"], f'attachment; filename="inventory-{self.vendor.id}.csv"')
+
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], VendorInventoryExportView.HEADER)
+        self.assertEqual(len(rows), 6)
+        cheap = next(row for row in rows if row[0] == str(self.cheap.id))
+        self.assertEqual(cheap[1], 'Starter, "home" build')
+        self.assertEqual(Decimal(cheap[8]), 12000)
+
+    def test_xlsx_is_a_workbook_with_every_row(self):
+        response = self.export("xlsx")
+        self.assertEqual(response["Content-Type"], EXPORT_FORMATS["xlsx"])
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as workbook:
+            sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+        self.assertEqual(sheet.count("<row>"), 6)
+        self.assertIn('<t xml:space="preserve">Starter, "home" build</t>', sheet)
+
+    def test_filters_pass_through(self):
+        response = self.export("csv", max_price="20000")
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.cheap.id)])
+        self.export("csv", status=400, min_price="lots")
+        self.export("pdf", status=400)
+
+    def test_rows_are_read_in_chunks_as_the_response_is_consumed(self):
+        with mock.patch("inventory.views.iterate_in_chunks", functools.partial(iterate_in_chunks, chunk_size=2)):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.export("csv")
+                content = iter(response.streaming_content)
+                self.assertEqual(next(content).decode().strip(), ",".join(VendorInventoryExportView.HEADER))
+                before = len(queries)
+                next(content)
+                self.assertEqual(len(queries), before + 1)
+                rest = list(content)
+        self.assertEqual(len(rest), 4)
+        self.assertEqual(len(queries), before + 4)  # 2 + 2 + 1 rows, then the empty chunk that ends it
@@ -1,20 +1,45 @@
 from django.urls import path
 from . import views
-from .views import VendorInventoryView, InventoryItemUpdateView, InventoryUploadView, BulkUpdateInventoryView
+from .views import UploadSessionCreateView, UploadSessionView, UploadSessionFinalizeView
+from .views import VendorInventoryView, InventoryItemUpdateView, InventoryUploadView, InventoryUploadCommitView, BulkUpdateInventoryView, ReconcileInventoryView, BulkDeleteInventoryView, VendorInventoryExportView
+from .views import CatalogSyncStatusView, vendor_build_events
 
 urlpatterns = [
     # Fetch inventory for a vendor
     path('<int:vendor_id>/', VendorInventoryView.as_view(), name='vendor-inventory'),
 
+    # Stream the inventory as CSV/XLSX
+    path('<int:vendor_id>/export/<str:file_format>/', VendorInventoryExportView.as_view(), name='export-inventory'),
+
     # Update a single inventory item
     path('update/<int:item_id>/', InventoryItemUpdateView.as_view(), name='update-inventory-item'),
 
     # Upload inventory via CSV/Excel
     path('<int:vendor_id>/upload/', InventoryUploadView.as_view(), name='upload-inventory'),
 
+    # Apply an upload previewed with ?dry_run=1
+    path('<int:vendor_id>/upload/commit/', InventoryUploadCommitView.as_view(), name='upload-inventory-commit'),
+
+    # Resumable chunked uploads: init / append chunk at offset / finalize
+    path('<int:vendor_id>/uploads/', UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('<int:vendor_id>/uploads/<uuid:upload_id>/', UploadSessionView.as_view(), name='upload-session'),
+    path('<int:vendor_id>/uploads/<uuid:upload_id>/finalize/', UploadSessionFinalizeView.as_view(), name='upload-session-finalize'),
+
     # Bulk update inventory
     path('<int:vendor_id>/bulk-update/', BulkUpdateInventoryView.as_view(), name='bulk-update-inventory'),
 
+    # Reconcile against the vendor's complete inventory snapshot
+    path('<int:vendor_id>/reconcile/', ReconcileInventoryView.as_view(), name='reconcile-inventory'),
+
+    # Delete many vendor builds by id or filter
+    path('<int:vendor_id>/bulk-delete/', BulkDeleteInventoryView.as_view(), name='bulk-delete-inventory'),
+
+    # Whether the vendor's edits have reached the public catalog
+    path('<int:vendor_id>/sync-status/', CatalogSyncStatusView.as_view(), name='catalog-sync-status'),
+
+    # Live price and availability changes (server-sent events, ASGI only)
+    path('<int:vendor_id>/live/', vendor_build_events, name='vendor-build-events'),
+
     # Delete a vendor build
     path('vendor/<int:vendor_id>/build/<int:build_id>/delete/', views.delete_vendor_build, name='delete_vendor_build'),
 ]
\ No newline at end of file
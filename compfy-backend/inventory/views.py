@@ -4,40 +4,101 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser
-from django.shortcuts import get_object_or_404
-import csv, io
+from rest_framework.pagination import PageNumberPagination
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+import io
+import uuid
 from vendors.models import VendorBuild, Vendor
-from .models import InventoryItem
+from .models import InventoryItem, UploadSession
 from .serializers import InventoryItemSerializer, InventoryItemUpdateSerializer
-from builds.utils import sync_vendor_builds
+from builds import live, outbox, trigger
+from compfy import metrics
+from compfy.instrumentation import span
+from utils.querybudget import query_budget
+from utils.services.export import EXPORT_FORMATS, iterate_in_chunks, streaming_export
+from .services import (
+    EDITABLE_FIELDS, UPLOAD_PLAN_TTL, append_upload_chunk, apply_snapshot, chunked, clean_build_fields,
+    delete_vendor_builds, diff_snapshot, filter_inventory, filter_vendor_builds, finalize_upload, ingest_upload, parse_upload_rows,
+    preview_upload, spooled_size, upload_plan_key, write_builds_by_id, write_builds_by_title,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
 # -------------------- Fetch inventory for a vendor --------------------
+class InventoryPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+@query_budget(5)
 class VendorInventoryView(APIView):
+    """
+    A vendor's inventory. Filters: min_price, max_price, component (matches
+    any part), updated_after, updated_before. Paginated when `page` or
+    `page_size` is given; otherwise the whole list is returned as before.
+    """
+    pagination_class = InventoryPagination
+
     def get(self, request, vendor_id):
         vendor = get_object_or_404(Vendor, id=vendor_id)
-        inventory = InventoryItem.objects.filter(vendor=vendor)
-        
-        # Debug logging
-        logger.debug(f"Found {inventory.count()} items for vendor {vendor_id}")
-        for item in inventory:
-            logger.debug(f"""
-                Build ID: {item.build.id}
-                Title: {item.build.title}
-                CPU: {item.build.cpu}
-                GPU: {item.build.gpu}
-                RAM: {item.build.ram}
-                Storage: {item.build.storage}
-                Price: {item.build.price}
-                PSU: {item.build.psu}
-            """)
-        
-        serializer = InventoryItemSerializer(inventory, many=True)
-        logger.debug(f"Serialized data: {serializer.data}")
-        
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        params = request.query_params
+
+        # One query for items and their builds, however many there are
+        inventory = InventoryItem.objects.filter(vendor=vendor).select_related('build').order_by('id')
+        try:
+            inventory = filter_inventory(inventory, params)
+        except (ValueError, DjangoValidationError):
+            return Response({"error": "Invalid filter value"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if 'page' in params or 'page_size' in params:
+            paginator = self.pagination_class()
+            page = paginator.paginate_queryset(inventory, request, view=self)
+            serializer = InventoryItemSerializer(page, many=True)
+            with span("serializer"):
+                response = paginator.get_paginated_response(serializer.data)
+        else:
+            serializer = InventoryItemSerializer(inventory, many=True)
+            with span("serializer"):
+                response = Response(serializer.data, status=status.HTTP_200_OK)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Returning %d inventory items for vendor %s", len(serializer.data), vendor_id)
+        return response
+
+# -------------------- Export a vendor's inventory --------------------
+class VendorInventoryExportView(APIView):
+    """
+    Stream a vendor's inventory as CSV or XLSX.
+    Columns match the upload template, so an export can be edited and re-uploaded.
+    Takes the same filters as the inventory list.
+    """
+    HEADER = ["id", "build_name", "cpu_model", "gpu_model", "ram", "storage", "psu", "case", "price", "updated_at"]
+
+    def get(self, request, vendor_id, file_format):
+        vendor = get_object_or_404(Vendor, id=vendor_id)
+        if file_format not in EXPORT_FORMATS:
+            return Response({"error": "Format must be csv or xlsx"}, status=status.HTTP_400_BAD_REQUEST)
+
+        items = InventoryItem.objects.filter(vendor=vendor).select_related("build")
+        try:
+            items = filter_inventory(items, request.query_params)
+        except (ValueError, DjangoValidationError):
+            return Response({"error": "Invalid filter value"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def rows():
+            for item in iterate_in_chunks(items):
+                build = item.build
+                yield [
+                    build.id, build.title, build.cpu, build.gpu, build.ram, build.storage,
+                    build.psu, build.case, build.price, item.updated_at.isoformat(),
+                ]
+
+        return streaming_export(f"inventory-{vendor.id}", file_format, self.HEADER, rows(), sheet_name="Inventory")
 
 # -------------------- Update a single inventory item --------------------
 class InventoryItemUpdateView(APIView):
@@ -46,7 +107,8 @@ class InventoryItemUpdateView(APIView):
         serializer = InventoryItemUpdateSerializer(item, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            # The outbox is applied on commit, or after a quiet window if SYNC_QUIET_SECONDS is set
+            return Response({**serializer.data, "syncStatus": trigger.sync_status(item.vendor_id)}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # -------------------- Upload inventory via Excel/CSV --------------------
@@ -64,78 +126,147 @@ class InventoryUploadView(APIView):
             return Response({'error': 'Invalid file format. Only XLSX or CSV allowed.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        dry_run = str(request.query_params.get('dry_run') or request.data.get('dry_run') or '').lower() in ('1', 'true', 'yes')
+
         # For now, handle CSV only (XLSX can be added later)
         if file_obj.name.endswith('.csv'):
-            decoded_file = file_obj.read().decode('utf-8')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-
-            rows_processed = 0
-            rows_created = 0
-            rows_updated = 0
-            rows_invalid = 0
-            errors = []
-
-            for row in reader:
-                rows_processed += 1
-                title = row.get('build_name')
-                cpu = row.get('cpu_model')
-                gpu = row.get('gpu_model', '')
-                ram = row.get('ram')
-                psu = row.get('psu')  # ✅ new
-                case = row.get('case')  # ✅ new
-                storage = row.get('storage')
-                price = row.get('price')
-
-                if not (title and cpu and ram and storage and price):
-                    rows_invalid += 1
-                    errors.append(f"Row {rows_processed} missing required fields")
-                    continue
-
-                try:
-                    price_val = float(price)
-                except ValueError:
-                    rows_invalid += 1
-                    errors.append(f"Row {rows_processed} has invalid price")
-                    continue
-
-                # Check if build already exists for this vendor
-                build_qs = VendorBuild.objects.filter(vendor=vendor, title=title)
-                if build_qs.exists():
-                    build = build_qs.first()
-                    build.cpu = cpu
-                    build.gpu = gpu
-                    build.ram = ram
-                    build.storage = storage
-                    build.psu = psu  # ✅ added
-                    build.case = case  # ✅ added
-                    build.price = price_val
-                    build.save()
-                    rows_updated += 1
-                else:
-                    build = VendorBuild.objects.create(
-                        vendor=vendor,
-                        title=title,
-                        cpu=cpu,
-                        gpu=gpu,
-                        ram=ram,
-                        storage=storage,
-                        psu=psu,  # ✅ added
-                        case=case,  # ✅ added
-                        price=price_val
-                    )
-                    rows_created += 1
-
-                # Add to InventoryItem table so it's visible to all users
-                InventoryItem.objects.get_or_create(vendor=vendor, build=build)
-            sync_vendor_builds()
-            return Response({
-                "rowsProcessed": rows_processed,
-                "rowsCreated": rows_created,
-                "rowsUpdated": rows_updated,
-                "rowsInvalid": rows_invalid,
-                "errors": errors
-            }, status=status.HTTP_200_OK)
+            # Read the file line by line and write it in batches; rows whose
+            # content hash matches the stored build are skipped entirely
+            lines = io.TextIOWrapper(file_obj.file, encoding='utf-8')
+
+            if dry_run:
+                # Nothing is written: report the diff and keep the parsed rows for /upload/commit/
+                preview, rows = preview_upload(vendor, parse_upload_rows(lines))
+                token = uuid.uuid4().hex
+                cache.set(upload_plan_key(token), {"vendor_id": vendor.id, "rows": rows}, UPLOAD_PLAN_TTL)
+                return Response({"dryRun": True, "token": token, "expiresIn": UPLOAD_PLAN_TTL, **preview},
+                                status=status.HTTP_200_OK)
+
+            result, changed_ids = ingest_upload(vendor, parse_upload_rows(lines))
+
+            # Only re-sync the builds that actually changed
+            if changed_ids:
+                outbox.flush(vendor.id)
+            return Response(result, status=status.HTTP_200_OK)
+
+
+# -------------------- Apply a previewed upload --------------------
+class InventoryUploadCommitView(APIView):
+    """Apply the plan cached by a dry-run upload, without re-parsing the file"""
+    def post(self, request, vendor_id):
+        vendor = get_object_or_404(Vendor, id=vendor_id)
+        token = request.data.get('token')
+        plan = cache.get(upload_plan_key(token)) if token else None
+        if token:
+            metrics.observe_cache("upload_plan", plan is not None)
+
+        if not plan or plan["vendor_id"] != vendor.id:
+            return Response({'error': 'Upload plan not found or expired'}, status=status.HTTP_404_NOT_FOUND)
+        cache.delete(upload_plan_key(token))
+
+        # Hashes are compared again, so anything changed since the preview is still handled correctly
+        result, changed_ids = ingest_upload(vendor, ((values, None) for values in plan["rows"]))
+        if changed_ids:
+            outbox.flush(vendor.id)
+        return Response(result, status=status.HTTP_200_OK)
+
+# -------------------- Resumable chunked uploads --------------------
+# 1. POST   /<vendor_id>/uploads/                    {"filename": "...", "size": 123}  -> uploadId
+# 2. PUT    /<vendor_id>/uploads/<upload_id>/?offset=N  raw bytes (or Upload-Offset header)
+#    GET    /<vendor_id>/uploads/<upload_id>/          -> current offset, to resume
+# 3. POST   /<vendor_id>/uploads/<upload_id>/finalize/
+MAX_UPLOAD_CHUNK = 8 * 1024 * 1024
+
+
+def upload_session_data(session):
+    return {
+        "uploadId": str(session.id),
+        "filename": session.filename,
+        "offset": session.received,
+        "size": session.size,
+        "status": session.status,
+        "result": session.result,
+    }
+
+
+class UploadSessionCreateView(APIView):
+    def post(self, request, vendor_id):
+        vendor = get_object_or_404(Vendor, id=vendor_id)
+        filename = request.data.get('filename') or ''
+        size = request.data.get('size')
+
+        if not isinstance(filename, str) or not filename.endswith('.csv'):
+            return Response({'error': 'Invalid file format. Only CSV allowed for chunked uploads.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            size = int(size) if size is not None else None
+        except (TypeError, ValueError):
+            return Response({'error': 'size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        session = UploadSession.objects.create(vendor=vendor, filename=filename, size=size)
+        return Response(upload_session_data(session), status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    def get(self, request, vendor_id, upload_id):
+        session = get_object_or_404(UploadSession, id=upload_id, vendor__id=vendor_id)
+        spooled_size(session)
+        return Response(upload_session_data(session), status=status.HTTP_200_OK)
+
+    def put(self, request, vendor_id, upload_id):
+        with transaction.atomic():
+            # Row lock so two retries of the same chunk can't interleave
+            session = get_object_or_404(
+                UploadSession.objects.select_for_update(), id=upload_id, vendor__id=vendor_id
+            )
+            if session.status != "open":
+                return Response({'error': 'Upload already finalized'}, status=status.HTTP_409_CONFLICT)
+
+            offset = request.query_params.get('offset', request.headers.get('Upload-Offset'))
+            try:
+                offset = int(offset)
+            except (TypeError, ValueError):
+                return Response({'error': 'offset is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+            current = spooled_size(session)
+            if offset != current:
+                return Response({'error': 'Offset mismatch', 'offset': current}, status=status.HTTP_409_CONFLICT)
+
+            try:
+                written = append_upload_chunk(session, request.stream or io.BytesIO(), MAX_UPLOAD_CHUNK)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+            session.received += written
+            session.save(update_fields=["received", "updated_at"])
+        return Response(upload_session_data(session), status=status.HTTP_200_OK)
+
+
+class UploadSessionFinalizeView(APIView):
+    def post(self, request, vendor_id, upload_id):
+        try:
+            with transaction.atomic():
+                session = get_object_or_404(
+                    UploadSession.objects.select_for_update().select_related("vendor"), id=upload_id, vendor__id=vendor_id
+                )
+                if session.status != "open":
+                    return Response(upload_session_data(session), status=status.HTTP_200_OK)
+
+                received = spooled_size(session)
+                if session.size is not None and received != session.size:
+                    return Response({'error': 'Upload incomplete', 'offset': received, 'size': session.size},
+                                    status=status.HTTP_409_CONFLICT)
+
+                result, changed_ids = finalize_upload(session)
+        except ValueError as e:
+            # Rolled back; the session stays open with its spooled bytes
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if changed_ids:
+            outbox.flush(session.vendor_id)
+        return Response(upload_session_data(session), status=status.HTTP_200_OK)
+
+
 # -------------------- Bulk update or create vendor builds --------------------
 class BulkUpdateInventoryView(APIView):
     def put(self, request, vendor_id):
@@ -147,96 +278,184 @@ class BulkUpdateInventoryView(APIView):
 
         # ✅ Handle empty inventory (after deleting all)
         if len(builds) == 0:
-            sync_vendor_builds()
-            return Response({"message": "No builds to update", "created": 0, "updated": 0}, status=status.HTTP_200_OK)
+            return Response({"message": "No builds to update", "created": 0, "updated": 0, "unchanged": 0,
+                             "syncStatus": trigger.sync_status(vendor.id)}, status=status.HTTP_200_OK)
 
-        created = 0
-        updated = 0
         errors = []
+        new_rows = []
+        existing_rows = []
 
         for build_data in builds:
             build_id = build_data.get('id')
             title = build_data.get('title')
-            price = build_data.get('price', 0)
-            cpu = build_data.get('cpu')
-            gpu = build_data.get('gpu')
-            ram = build_data.get('ram')
-            storage = build_data.get('storage')
-            psu = build_data.get('psu')
+
+            # ✅ CASE 1: New build (temp-ID), matched to an existing build by title
+            if isinstance(build_id, str) and build_id.startswith("temp-"):
+                values, error = clean_build_fields({
+                    "title": title,
+                    "price": build_data.get('price', 0),
+                    "cpu": build_data.get('cpu'),
+                    "gpu": build_data.get('gpu'),
+                    "ram": build_data.get('ram'),
+                    "storage": build_data.get('storage'),
+                    "psu": build_data.get('psu'),
+                })
+                if error:
+                    errors.append(f"Error processing build {build_id or title}: {error}")
+                else:
+                    new_rows.append(values)
+                continue
+
+            # ✅ CASE 2: Existing build update
+            values, error = clean_build_fields(build_data, ['title', 'price', 'cpu', 'gpu', 'ram', 'storage', 'psu'])
             try:
-                # ✅ CASE 1: New build (temp-ID)
-                if isinstance(build_id, str) and build_id.startswith("temp-"):
-                    # Try to find an existing build with the same title for this vendor
-                    existing = VendorBuild.objects.filter(vendor=vendor, title=title).first()
-                    if existing:
-                        # Update existing instead of creating duplicate
-                        existing.cpu = cpu
-                        existing.gpu = gpu
-                        existing.ram = ram
-                        existing.storage = storage
-                        existing.psu = psu
-                        existing.price = price
-                        existing.save()
-                        InventoryItem.objects.get_or_create(vendor=vendor, build=existing)
-                        updated += 1
-                    else:
-                        build = VendorBuild.objects.create(
-                            vendor=vendor,
-                            title=title,
-                            price=price,
-                            cpu=cpu,
-                            gpu=gpu,
-                            ram=ram,
-                            storage=storage,
-                            psu=psu,
-                        )
-                        InventoryItem.objects.get_or_create(vendor=vendor, build=build)
-                        created += 1
-                    continue
-
-                # ✅ CASE 2: Existing build update
-                build = VendorBuild.objects.get(id=build_id, vendor=vendor)
-                for field in ['title', 'price', 'cpu', 'gpu', 'ram', 'storage','psu']:
-                    if field in build_data:
-                        setattr(build, field, build_data[field])
-                build.save()
-
-                InventoryItem.objects.get_or_create(vendor=vendor, build=build)
-                updated += 1
-
-            except VendorBuild.DoesNotExist:
-                errors.append(f"Build with id {build_id} not found")
-            except Exception as e:
-                errors.append(f"Error processing build {build_id or title}: {str(e)}")
-
-        # ✅ Sync after all operations
+                build_id = int(build_id)
+            except (TypeError, ValueError):
+                error = error or "invalid id"
+            if error:
+                errors.append(f"Error processing build {build_id or title}: {error}")
+            else:
+                existing_rows.append({"id": build_id, "values": values})
+
+        # Hashes are compared per batch in one query; only changed rows are written
+        created_ids, updated_ids, unchanged = [], [], 0
         try:
-            sync_vendor_builds()
+            for batch in chunked(new_rows):
+                batch_created, batch_updated, batch_unchanged = write_builds_by_title(vendor, batch)
+                created_ids += batch_created
+                updated_ids += batch_updated
+                unchanged += batch_unchanged
+
+            for batch in chunked(existing_rows):
+                batch_updated, batch_unchanged, missing, conflicts = write_builds_by_id(vendor, batch)
+                updated_ids += batch_updated
+                unchanged += batch_unchanged
+                errors += [f"Build with id {build_id} not found" for build_id in missing]
+                errors += [
+                    f"Build with id {build_id}: title '{title}' is already used by another build"
+                    for build_id, title in conflicts
+                ]
         except Exception as e:
-            errors.append(f"Sync error: {str(e)}")
+            errors.append(f"Error saving builds: {str(e)}")
 
+        # ✅ Changed rows are in the outbox; with a quiet window one sync covers a burst of edits
         return Response({
-            "created": created,
-            "updated": updated,
-            "errors": errors
+            "created": len(created_ids),
+            "updated": len(updated_ids),
+            "unchanged": unchanged,
+            "errors": errors,
+            "syncStatus": trigger.sync_status(vendor.id),
         }, status=status.HTTP_200_OK)
 
+# -------------------- Reconcile a full inventory snapshot --------------------
+class ReconcileInventoryView(APIView):
+    """
+    Replace a vendor's inventory with the complete snapshot from their POS.
+    Builds are matched by title; only the minimal insert/update/delete diff
+    is written, in one transaction, followed by one sync of the affected builds.
+    An empty snapshot deletes everything, so like bulk delete it needs
+    {"builds": [], "all": true}.
+    """
+    def post(self, request, vendor_id):
+        vendor = get_object_or_404(Vendor, id=vendor_id)
+        snapshot = request.data.get("builds") if isinstance(request.data, dict) else request.data
+
+        if not isinstance(snapshot, list):
+            return Response({"error": "Expected a list of builds"}, status=status.HTTP_400_BAD_REQUEST)
+        if not snapshot and not (isinstance(request.data, dict) and request.data.get("all") is True):
+            return Response({"error": 'Empty snapshot; pass {"builds": [], "all": true} to delete everything'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        rows = []
+        errors = []
+        seen_titles = set()
+        for number, build_data in enumerate(snapshot, start=1):
+            if not isinstance(build_data, dict):
+                errors.append(f"Row {number} is not an object")
+                continue
+            data = {"gpu": "", "psu": "", "case": ""}
+            data.update({k: v for k, v in build_data.items() if k in EDITABLE_FIELDS})
+            values, error = clean_build_fields({field: data.get(field) for field in EDITABLE_FIELDS})
+            if error:
+                errors.append(f"Row {number}: {error}")
+            elif values["title"] in seen_titles:
+                errors.append(f"Row {number}: duplicate title {values['title']}")
+            else:
+                seen_titles.add(values["title"])
+                rows.append(values)
+
+        # The snapshot is authoritative, so a bad row must not turn into a delete
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        diff = diff_snapshot(vendor, rows)
+        affected_ids = apply_snapshot(vendor, diff)
+        if affected_ids:
+            outbox.flush(vendor.id)
+
+        return Response({
+            "inserted": len(diff["inserts"]),
+            "updated": len(diff["updates"]),
+            "deleted": len(diff["deletes"]),
+            "unchanged": diff["unchanged"],
+        }, status=status.HTTP_200_OK)
+
+
+# -------------------- Bulk delete vendor builds --------------------
+class BulkDeleteInventoryView(APIView):
+    """
+    Delete many of a vendor's builds at once.
+    Body: {"ids": [1, 2, 3]} or {"filter": {"max_price": 20000, "title_contains": "i3"}}
+    """
+    def post(self, request, vendor_id):
+        vendor = get_object_or_404(Vendor, id=vendor_id)
+        ids = request.data.get("ids")
+        criteria = request.data.get("filter")
+
+        if ids is not None:
+            if not isinstance(ids, list):
+                return Response({"error": "ids must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                ids = [int(build_id) for build_id in ids]
+            except (TypeError, ValueError):
+                return Response({"error": "ids must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+            builds = VendorBuild.objects.filter(vendor=vendor, id__in=ids)
+        elif isinstance(criteria, dict):
+            builds, error = filter_vendor_builds(vendor, criteria)
+            if error:
+                return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            return Response({"error": "Provide ids or filter"}, status=status.HTTP_400_BAD_REQUEST)
+
+        build_ids = list(builds.values_list("id", flat=True))
+        deleted = delete_vendor_builds(vendor, build_ids)
+        return Response({"deleted": deleted}, status=status.HTTP_200_OK)
+
+
 @api_view(['DELETE'])
 def delete_vendor_build(request, vendor_id, build_id):
     try:
         # Fetch the vendor build
         build = get_object_or_404(VendorBuild, vendor__id=vendor_id, id=build_id)
 
-        # Delete related inventory items first
-        InventoryItem.objects.filter(vendor__id=vendor_id, build=build).delete()
-
-        # Delete the VendorBuild itself
-        build.delete()
-
-        # Sync builds after deletion
-        sync_vendor_builds()
+        # Delete inventory items and the build; its catalog entry goes with the outbox
+        delete_vendor_builds(build.vendor, [build.id], debounce=True)
 
         return Response({"message": "Build deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
     except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# -------------------- Catalog sync status --------------------
+class CatalogSyncStatusView(APIView):
+    """Whether the vendor's edits have reached the public catalog yet (see builds/trigger.py)"""
+    def get(self, request, vendor_id):
+        vendor = get_object_or_404(Vendor, id=vendor_id)
+        return Response(trigger.sync_status(vendor.id), status=status.HTTP_200_OK)
+
+
+async def vendor_build_events(request, vendor_id):
+    """Server-sent events as the vendor's builds change price or leave the public catalog"""
+    vendor = await aget_object_or_404(Vendor, id=vendor_id)
+    return live.event_stream_response(request, [f"vendor:{vendor.id}"])
@@ -0,0 +1,409 @@
+# utils/benchmarks.py
+"""
+Benchmarks run by `manage.py run_benchmarks`.
+
+Each benchmark builds its own data with generate_load_data (untimed), then
+returns {result name: metrics}. Metrics ending in "seconds" or "_ms" and
+"queries" are lower-is-better; those ending in "_per_sec" are higher-is-better.
+"""
+
+import contextlib
+import csv
+import io
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client
+
+BENCHMARKS = {}
+
+
+def benchmark(name, size_option):
+    """Register func(size); run_benchmarks calls it once per value of the `size_option` option"""
+    def decorator(func):
+        BENCHMARKS[name] = (func, size_option)
+        return func
+    return decorator
+
+
+# -------------------- Measuring --------------------
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Measure:
+    """Wall time and query count of a block; app output (sync's prints) is discarded"""
+
+    def __enter__(self):
+        self.counter = _QueryCounter()
+        self._stack = contextlib.ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self.counter))
+        self._stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        self.queries = self.counter.count
+        return self._stack.__exit__(*exc)
+
+    def metrics(self, **extra):
+        return {"seconds": round(self.seconds, 4), "queries": self.queries, **extra}
+
+
+def latency(func, runs, setup=None):
+    """p50/p99 in ms and average queries over `runs` calls of func(i), each after an untimed setup()"""
+    durations, queries = [], 0
+    for i in range(runs):
+        if setup is not None:
+            setup()
+        with Measure() as m:
+            func(i)
+        durations.append(m.seconds * 1000)
+        queries += m.queries
+    durations.sort()
+    return {
+        "p50_ms": round(statistics.median(durations), 2),
+        "p99_ms": round(durations[min(len(durations) - 1, int(len(durations) * 0.99))], 2),
+        "queries": round(queries / runs, 1),
+    }
+
+
+def generate(vendors, builds_per_vendor, catalog=True):
+    with contextlib.redirect_stdout(io.StringIO()):
+        call_command(
+            "generate_load_data", vendors=vendors, builds_per_vendor=builds_per_vendor, users=0,
+            no_catalog=not catalog, clear=True, stdout=io.StringIO(),
+        )
+
+
+def _vendor_layout(size):
+    """(vendors, builds per vendor) for about `size` vendor builds, at most 1000 per vendor"""
+    per_vendor = min(size, 1000)
+    return max(1, size // per_vendor), per_vendor
+
+
+# -------------------- Benchmarks --------------------
+@benchmark("sync", "sizes")
+def bench_sync(size):
+    """Full sync into an empty catalog, then again with nothing to change"""
+    from builds.utils import sync_vendor_builds
+
+    generate(*_vendor_layout(size), catalog=False)
+    with Measure() as cold:
+        sync_vendor_builds()
+    with Measure() as noop:
+        sync_vendor_builds()
+    return {f"sync_cold_{size}": cold.metrics(), f"sync_noop_{size}": noop.metrics()}
+
+
+@benchmark("upload", "rows")
+def bench_upload(size):
+    """CSV upload of `size` rows: half price changes to existing builds, half new"""
+    from vendors.models import Vendor, VendorBuild
+
+    generate(1, size // 2)
+    vendor = Vendor.objects.first()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["build_name", "cpu_model", "gpu_model", "ram", "storage", "psu", "case", "price"])
+    fields = ("title", "cpu", "gpu", "ram", "storage", "psu", "case")
+    for row in VendorBuild.objects.filter(vendor=vendor).values(*fields, "price"):
+        writer.writerow([row[f] for f in fields] + [row["price"] + 100])
+        writer.writerow([f"{row['title']} (new)"] + [row[f] for f in fields[1:]] + [row["price"]])
+
+    upload = io.BytesIO(buffer.getvalue().encode())
+    upload.name = "inventory.csv"
+    with Measure() as m:
+        response = Client().post(f"/api/inventory/{vendor.id}/upload/", {"file": upload})
+    assert response.status_code == 200 and not response.json()["rowsInvalid"], response.content[:500]
+    rows = response.json()["rowsProcessed"]
+    return {f"upload_csv_{size}": m.metrics(rows_per_sec=round(rows / m.seconds, 1))}
+
+
+@benchmark("bulk_update", "rows")
+def bench_bulk_update(size):
+    """BulkUpdateInventoryView with `size` rows: half price changes by id, half new titles"""
+    from vendors.models import Vendor, VendorBuild
+
+    generate(1, size // 2)
+    vendor = Vendor.objects.first()
+    payload = []
+    for n, row in enumerate(VendorBuild.objects.filter(vendor=vendor).values("id", "title", "price", "cpu", "gpu", "ram", "storage", "psu")):
+        payload.append({**row, "price": str(row["price"] + 100)})
+        payload.append({**row, "id": f"temp-{n}", "title": f"{row['title']} (new)", "price": str(row["price"])})
+
+    with Measure() as m:
+        response = Client().put(
+            f"/api/inventory/{vendor.id}/bulk-update/", payload, content_type="application/json",
+        )
+    assert response.status_code == 200, response.content[:500]
+    return {f"bulk_update_{size}": m.metrics(rows_per_sec=round(len(payload) / m.seconds, 1))}
+
+
+@benchmark("catalog", "catalog_size")
+def bench_catalog(size):
+    """
+    BuildListView and BuildDetailView latency over a catalog of `size` builds.
+    Cold runs bump the catalog cache version first, as a write would, so they
+    measure the queries and serialization; the `_cached` runs repeat one
+    request and measure the response cache.
+    """
+    from builds import catalog_cache
+    from builds.models import Build
+
+    generate(*_vendor_layout(size))
+    client = Client()
+    ids = list(Build.objects.values_list("id", flat=True))
+    rng = random.Random(0)
+
+    def list_builds(i):
+        assert client.get("/api/builds/").status_code == 200
+
+    def filtered_list(i):
+        assert client.get("/api/builds/", {"category": "gaming", "max_price": 150000}).status_code == 200
+
+    def detail(i):
+        assert client.get(f"/api/builds/{rng.choice(ids)}/").status_code == 200
+
+    def cached_detail(i):
+        assert client.get(f"/api/builds/{ids[0]}/").status_code == 200
+
+    cold = catalog_cache.bump_version
+    return {
+        f"build_list_{size}": latency(list_builds, 20, setup=cold),
+        f"build_list_filtered_{size}": latency(filtered_list, 20, setup=cold),
+        f"build_detail_{size}": latency(detail, 200, setup=cold),
+        f"build_list_cached_{size}": latency(list_builds, 20),
+        f"build_list_filtered_cached_{size}": latency(filtered_list, 20),
+        f"build_detail_cached_{size}": latency(cached_detail, 200),
+    }
+
+
+@benchmark("categorization", "catalog_size")
+def bench_categorization(size):
+    """The two categorization passes: sync's categorize_build and update_builds_categorization"""
+    from builds.models import Build
+    from builds.services import update_builds_categorization
+    from builds.utils import categorize_build
+
+    generate(*_vendor_layout(size))
+    with Measure() as per_build:
+        for build in Build.objects.all():
+            categorize_build(build)
+    with Measure() as bulk:
+        update_builds_categorization()
+    return {
+        f"categorize_build_{size}": per_build.metrics(),
+        f"update_builds_categorization_{size}": bulk.metrics(),
+    }
+
+
+CATALOG_READS = ("?category=gaming&max_price=60000", "{id}/", "search/?q={word}", "facets/?category=gaming")
+
+# How long each simulated client takes to read its response
+SLOW_CLIENT_SECONDS = 0.05
+
+
+def _peak_threads(func):
+    """func()'s result and the most threads alive while it ran"""
+    peak, done = [threading.active_count()], threading.Event()
+
+    def watch():
+        while not done.wait(0.005):
+            peak[0] = max(peak[0], threading.active_count())
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        return func(), peak[0] - 1  # not counting the watcher
+    finally:
+        done.set()
+        watcher.join()
+
+
+def _heap_per_connection(func, connections_open):
+    """Peak Python heap growth while func() runs, in KiB per concurrent connection"""
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        func()
+        return round((tracemalloc.get_traced_memory()[1] - base) / connections_open / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def _wsgi_get(app, url):
+    """Status of a GET through a WSGI app, written out to a slow client as a sync worker would"""
+    from wsgiref.util import setup_testing_defaults
+
+    path, _, query = url.partition("?")
+    environ = {"PATH_INFO": path, "QUERY_STRING": query, "REQUEST_METHOD": "GET"}
+    setup_testing_defaults(environ)
+    status = []
+    body = app(environ, lambda line, headers, exc_info=None: status.append(int(line.split()[0])))
+    try:
+        for _ in body:
+            time.sleep(SLOW_CLIENT_SECONDS)  # the worker is stuck until the client has read it
+    finally:
+        body.close()
+    return status[0]
+
+
+async def _asgi_get(app, url):
+    """Status of a GET through an ASGI app, written out to a slow client as uvicorn would"""
+    import asyncio
+
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+    }
+    request = [{"type": "http.request", "body": b"", "more_body": False}]
+    status = []
+
+    async def receive():
+        if request:
+            return request.pop()
+        await asyncio.Event().wait()  # the client stays connected
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif message.get("body"):
+            await asyncio.sleep(SLOW_CLIENT_SECONDS)
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+@benchmark("asgi", "connections")
+def bench_asgi(size):
+    """
+    `size` clients reading the catalog at once (list, detail, search, facets),
+    each taking SLOW_CLIENT_SECONDS to receive its response. The sync views
+    run on the WSGI app with one connection per worker, as the Procfile's
+    gunicorn sync workers serve them (WEB_CONCURRENCY workers, default 1);
+    the async views run on the ASGI app in one event loop, as under uvicorn.
+    The response cache is cleared before each pass.
+    """
+    import asyncio
+    import os
+    import resource
+    from concurrent.futures import ThreadPoolExecutor
+
+    from django.core.asgi import get_asgi_application
+    from django.core.cache import cache
+    from django.core.wsgi import get_wsgi_application
+
+    from builds.models import Build
+
+    generate(*_vendor_layout(1000))
+    rng = random.Random(0)
+    word = Build.objects.filter(source="vendor").first().components.first().name.split()[0]
+    ids = list(Build.objects.values_list("id", flat=True))
+    paths = [rng.choice(CATALOG_READS).format(id=rng.choice(ids), word=word) for _ in range(size)]
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    wsgi_app, asgi_app = get_wsgi_application(), get_asgi_application()
+
+    def wsgi():
+        def get(path):
+            try:
+                return _wsgi_get(wsgi_app, f"/api/builds/{path}")
+            finally:
+                connections.close_all()  # this thread's connections
+
+        with ThreadPoolExecutor(workers) as pool:
+            assert set(pool.map(get, paths)) == {200}
+
+    def asgi():
+        async def run():
+            return await asyncio.gather(*(_asgi_get(asgi_app, f"/api/builds/async/{path}") for path in paths))
+        assert set(asyncio.run(run())) == {200}
+
+    results = {}
+    for name, func in (("wsgi", wsgi), ("asgi", asgi)):
+        cache.clear()
+        started = time.perf_counter()
+        _, threads = _peak_threads(func)
+        seconds = time.perf_counter() - started
+        results[f"catalog_reads_{name}_{size}"] = {
+            "seconds": round(seconds, 4),
+            "requests_per_sec": round(size / seconds, 1),
+            "concurrent_connections": min(workers, size) if name == "wsgi" else size,
+            "peak_threads": threads,
+        }
+
+    # A sync worker holds one connection, so each concurrent connection costs a whole worker process
+    results[f"catalog_reads_wsgi_{size}"]["worker_rss_mib"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    cache.clear()
+    results[f"catalog_reads_asgi_{size}"]["heap_kib_per_connection"] = _heap_per_connection(asgi, size)
+    return results
+
+
+def lookup_queries():
+    """{name: queryset} for the hot lookups the indexes serve, against whatever data is loaded"""
+    from builds.models import Build
+    from inventory.models import InventoryItem
+    from vendors.models import VendorBuild
+
+    vb = VendorBuild.objects.order_by("-id").first()
+    build = Build.objects.filter(source="vendor").order_by("-id").first()
+    return {
+        "sync_by_vendor_build_id": Build.objects.filter(source="vendor", vendor_build_id=build.vendor_build_id),
+        "upload_by_title": VendorBuild.objects.filter(vendor=vb.vendor_id, title__in=[vb.title]),
+        "browse_category_price": Build.objects.filter(
+            category="gaming", intensity="heavy", price__gte=50000, price__lte=150000,
+        ).order_by("price")[:50],
+        "inventory_recent": InventoryItem.objects.filter(vendor=vb.vendor_id).order_by("-updated_at")[:50],
+    }
+
+
+@benchmark("lookups", "catalog_size")
+def bench_lookups(size):
+    """Latency of the single-query lookups behind sync, uploads, browsing and inventory"""
+    generate(*_vendor_layout(size))
+    return {
+        f"lookup_{name}_{size}": latency(lambda i, qs=queryset: list(qs.all()), 200)
+        for name, queryset in lookup_queries().items()
+    }
+
+
+# -------------------- Baselines --------------------
+def compare(results, baseline, threshold, noise_seconds=0.005):
+    """
+    Regressions of `results` against `baseline`, as readable strings.
+    Timings may grow by `threshold` (a fraction) and ignore differences
+    under `noise_seconds`; query counts may not grow at all.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key, value in metrics.items():
+            old = base.get(key)
+            if old is None:
+                continue
+            if key == "queries":
+                failed = value > old
+            elif key.endswith("_per_sec"):
+                failed = value < old / (1 + threshold)
+            else:
+                noise = noise_seconds * (1000 if key.endswith("_ms") else 1)
+                failed = value > old * (1 + threshold) and value - old > noise
+            if failed:
+                regressions.append(f"{name}.{key}: {old} -> {value}")
+    return regressions
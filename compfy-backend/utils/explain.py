@@ -0,0 +1,77 @@
+# utils/explain.py
+"""
+EXPLAIN helpers for plan regression tests on SQLite and MySQL/MariaDB.
+
+    assert_uses_index(Build.objects.filter(config_fingerprint=fp), "build_config_price_idx")
+
+Index names are matched by substring, so a fragment such as "vendor_id"
+also matches Django's generated names like inventory_inventoryitem_vendor_id_1e6a4fb9.
+"""
+
+import json
+import re
+
+from django.db import connections
+
+_SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\S+)")
+_SQLITE_SCAN = re.compile(r"\bSCAN (\S+)(.*)")
+
+
+def explain(queryset):
+    """The query's plan as text, in the backend's own format"""
+    return queryset.explain()
+
+
+def used_indexes(queryset):
+    """Names of the indexes the plan reads (primary keys included as "PRIMARY" on MySQL)"""
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        return set(_SQLITE_INDEX.findall(queryset.explain()))
+    if vendor == "mysql":
+        return {table.get("key") for table in _mysql_tables(queryset) if table.get("key")}
+    raise NotImplementedError(f"EXPLAIN parsing not supported for {vendor}")
+
+
+def full_scans(queryset):
+    """Tables the plan reads row by row without an index"""
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        return {
+            table for table, rest in _SQLITE_SCAN.findall(queryset.explain())
+            if "INDEX" not in rest and "CONSTANT ROW" not in rest
+        }
+    if vendor == "mysql":
+        return {table["table_name"] for table in _mysql_tables(queryset) if table.get("access_type") == "ALL"}
+    raise NotImplementedError(f"EXPLAIN parsing not supported for {vendor}")
+
+
+def _mysql_tables(queryset):
+    def walk(node):
+        if isinstance(node, dict):
+            if "table_name" in node:
+                yield node
+            for value in node.values():
+                yield from walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                yield from walk(value)
+
+    return list(walk(json.loads(queryset.explain(format="json"))))
+
+
+def assert_uses_index(queryset, *fragments):
+    """Fail unless the plan reads an index whose name contains every fragment"""
+    indexes = used_indexes(queryset)
+    if not any(all(fragment in name for fragment in fragments) for name in indexes):
+        raise AssertionError(
+            f"Expected an index matching {fragments}, plan uses {sorted(indexes) or 'none'}:\n{explain(queryset)}"
+        )
+
+
+def assert_no_full_scan(queryset, *tables):
+    """Fail if the plan scans any of `tables` (every table when none are given) without an index"""
+    scanned = full_scans(queryset)
+    if tables:
+        scanned &= set(tables)
+    if scanned:
+        raise AssertionError(f"Full table scan of {sorted(scanned)}:\n{explain(queryset)}")
@@ -0,0 +1,284 @@
+# utils/loadtest.py
+"""
+HTTP load-test harness run by `manage.py loadtest`.
+
+Worker threads pick a scenario from a weighted mix and drive the API either
+in-process through the Django test client or against a running server over
+plain urllib (--url). Either way no external service is needed. Build,
+vendor and user ids are read from the configured database, so generate data
+first (generate_load_data) and point the command at the server's database.
+"""
+
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from django.db import connections
+
+SCENARIOS = {}
+
+# Password generate_load_data gives every account
+LOADGEN_PASSWORD = "loadgen"
+
+
+def scenario(name):
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+# -------------------- Transports --------------------
+class ClientTransport:
+    """In-process requests through django.test.Client (one per worker thread)"""
+
+    def __init__(self):
+        from django.test import Client
+        self.client = Client()
+
+    def request(self, method, path, data=None, token=None, files=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        if files:
+            from django.core.files.uploadedfile import SimpleUploadedFile
+            uploads = {field: SimpleUploadedFile(name, content) for field, (name, content) in files.items()}
+            response = self.client.post(path, uploads, **headers)
+        elif data is not None:
+            response = self.client.generic(method, path, json.dumps(data), content_type="application/json", **headers)
+        else:
+            response = self.client.generic(method, path, **headers)
+        return response.status_code, response.content
+
+
+class HTTPTransport:
+    """Requests to a running server, e.g. gunicorn on localhost"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method, path, data=None, token=None, files=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        body = None
+        if files:
+            body, content_type = _multipart(files)
+            headers["Content-Type"] = content_type
+        elif data is not None:
+            body = json.dumps(data).encode()
+            headers["Content-Type"] = "application/json"
+
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+
+def _multipart(files):
+    """Encode {field: (filename, bytes)} as multipart/form-data"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for field, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n".encode() + content + b"\r\n"
+        )
+    return b"".join(parts) + f"--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+# -------------------- Stats --------------------
+class LoadStats:
+    """Latencies and error counts per endpoint, shared by the worker threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {"latencies": [], "errors": 0})
+            stats["latencies"].append(seconds * 1000)
+            if not ok:
+                stats["errors"] += 1
+
+    def report(self, elapsed):
+        with self._lock:
+            endpoints = {name: (sorted(s["latencies"]), s["errors"]) for name, s in self._endpoints.items()}
+
+        rows = {name: _summary(latencies, errors, elapsed) for name, (latencies, errors) in sorted(endpoints.items())}
+        everything = sorted(ms for latencies, _ in endpoints.values() for ms in latencies)
+        total = _summary(everything, sum(errors for _, errors in endpoints.values()), elapsed)
+        return {"elapsedSeconds": round(elapsed, 2), "total": total, "endpoints": rows}
+
+
+def _summary(latencies, errors, elapsed):
+    def pct(q):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * q))], 2) if latencies else None
+
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "errorRate": round(errors / len(latencies), 4) if latencies else 0,
+        "p50Ms": pct(0.50),
+        "p95Ms": pct(0.95),
+        "p99Ms": pct(0.99),
+    }
+
+
+# -------------------- Worker --------------------
+class Worker:
+    """One simulated client: a transport, a seeded RNG and lazily obtained JWTs"""
+
+    def __init__(self, transport, stats, fixtures, seed):
+        self.transport = transport
+        self.stats = stats
+        self.fixtures = fixtures
+        self.rng = random.Random(seed)
+        self.tokens = {}
+
+    def call(self, endpoint, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            status, body = self.transport.request(method, path, **kwargs)
+        except Exception:
+            status, body = None, b""
+        self.stats.record(endpoint, time.perf_counter() - start, status is not None and status < 400)
+        return status, body
+
+    def token(self, username):
+        if username not in self.tokens:
+            status, body = self.call(
+                "POST auth/login", "POST", "/api/auth/login/",
+                data={"username": username, "password": LOADGEN_PASSWORD},
+            )
+            self.tokens[username] = json.loads(body)["access"] if status == 200 else None
+        return self.tokens[username]
+
+
+# -------------------- Scenarios --------------------
+@scenario("browse")
+def browse(worker):
+    """Anonymous catalog browsing: a filtered list, a detail page and its similar builds"""
+    rng, fixtures = worker.rng, worker.fixtures
+    category = rng.choice(["office", "gaming", "editing"])
+    low = rng.choice([20000, 50000, 100000, 200000])
+    worker.call("GET builds/", "GET", f"/api/builds/?category={category}&min_price={low}&max_price={low + 5000}")
+    if fixtures["build_ids"]:
+        build_id = rng.choice(fixtures["build_ids"])
+        worker.call("GET builds/<pk>/", "GET", f"/api/builds/{build_id}/")
+        worker.call("GET builds/<pk>/similar/", "GET", f"/api/builds/{build_id}/similar/")
+    if rng.random() < 0.2:
+        worker.call("GET builds/configurations/", "GET", "/api/builds/configurations/?limit=20")
+
+
+@scenario("saved")
+def saved(worker):
+    """A signed-in customer saves a build, lists saved builds and removes it again"""
+    fixtures = worker.fixtures
+    if not fixtures["usernames"] or not fixtures["build_ids"]:
+        return
+    token = worker.token(worker.rng.choice(fixtures["usernames"]))
+    if not token:
+        return
+    status, body = worker.call(
+        "POST builds/saved-builds/", "POST", "/api/builds/saved-builds/",
+        data={"build": worker.rng.choice(fixtures["build_ids"])}, token=token,
+    )
+    worker.call("GET builds/saved/", "GET", "/api/builds/saved/", token=token)
+    if status == 201:
+        saved_id = json.loads(body)["id"]
+        worker.call("DELETE builds/saved-builds/<pk>/", "DELETE", f"/api/builds/saved-builds/{saved_id}/", token=token)
+
+
+@scenario("bulk_update")
+def bulk_update(worker):
+    """A vendor nudges the price of a few of its builds"""
+    rng, fixtures = worker.rng, worker.fixtures
+    if not fixtures["vendor_builds"]:
+        return
+    vendor_id = rng.choice(list(fixtures["vendor_builds"]))
+    rows = rng.sample(fixtures["vendor_builds"][vendor_id], min(5, len(fixtures["vendor_builds"][vendor_id])))
+    payload = [{**row, "price": str(round(float(row["price"]) * rng.uniform(0.97, 1.03), -2))} for row in rows]
+    worker.call("PUT inventory/<vendor>/bulk-update/", "PUT", f"/api/inventory/{vendor_id}/bulk-update/", data=payload)
+
+
+@scenario("upload")
+def upload(worker):
+    """A vendor uploads a small CSV re-pricing some of its builds"""
+    rng, fixtures = worker.rng, worker.fixtures
+    if not fixtures["vendor_builds"]:
+        return
+    vendor_id = rng.choice(list(fixtures["vendor_builds"]))
+    lines = ["build_name,cpu_model,gpu_model,ram,storage,psu,case,price"]
+    for row in rng.sample(fixtures["vendor_builds"][vendor_id], min(20, len(fixtures["vendor_builds"][vendor_id]))):
+        price = round(float(row["price"]) * rng.uniform(0.97, 1.03), -2)
+        fields = [row["title"], row["cpu"], row["gpu"] or "", row["ram"], row["storage"], row["psu"], row["case"], str(price)]
+        lines.append(",".join('"' + value.replace('"', '""') + '"' for value in fields))
+    worker.call(
+        "POST inventory/<vendor>/upload/", "POST", f"/api/inventory/{vendor_id}/upload/",
+        files={"file": ("inventory.csv", "\n".join(lines).encode())},
+    )
+
+
+# -------------------- Running --------------------
+def load_fixtures(max_builds=5000, max_vendors=20, max_users=200):
+    """Ids the scenarios pick from, sampled from the database"""
+    from builds.models import Build
+    from django.contrib.auth.models import User
+    from vendors.models import VendorBuild
+
+    vendor_builds = {}
+    fields = ("id", "title", "price", "cpu", "gpu", "ram", "storage", "psu", "case", "vendor_id")
+    vendor_ids = list(VendorBuild.objects.values_list("vendor_id", flat=True).distinct()[:max_vendors])
+    for row in VendorBuild.objects.filter(vendor_id__in=vendor_ids).values(*fields)[:max_builds]:
+        vendor_builds.setdefault(row.pop("vendor_id"), []).append({**row, "price": str(row["price"])})
+
+    return {
+        "build_ids": list(Build.objects.values_list("id", flat=True)[:max_builds]),
+        "vendor_builds": vendor_builds,
+        "usernames": list(
+            User.objects.filter(username__startswith="loadgen-user-").values_list("username", flat=True)[:max_users]
+        ),
+    }
+
+
+def run(make_transport, mix, concurrency, duration=None, iterations=None, seed=0):
+    """
+    Run `concurrency` workers until `duration` seconds pass or `iterations`
+    scenarios have run; `mix` maps scenario name -> weight.
+    Returns the report from LoadStats.
+    """
+    fixtures = load_fixtures()
+    stats = LoadStats()
+    names, weights = zip(*mix.items())
+    deadline = time.perf_counter() + duration if duration else None
+    issued = [0]
+    issued_lock = threading.Lock()
+
+    def work(index):
+        worker = Worker(make_transport(), stats, fixtures, seed + index)
+        try:
+            while True:
+                if deadline and time.perf_counter() >= deadline:
+                    break
+                if iterations:
+                    with issued_lock:
+                        if issued[0] >= iterations:
+                            break
+                        issued[0] += 1
+                SCENARIOS[worker.rng.choices(names, weights)[0]](worker)
+        finally:
+            # In-process requests open a connection per thread
+            connections.close_all()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=work, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats.report(time.perf_counter() - start)
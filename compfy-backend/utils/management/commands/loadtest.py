@@ -0,0 +1,77 @@
+#utils/management/commands/loadtest.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from utils.loadtest import SCENARIOS, ClientTransport, HTTPTransport, run
+
+DEFAULT_MIX = "browse=70,saved=15,bulk_update=10,upload=5"
+
+
+def _mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(name)
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the API with a weighted traffic mix and report throughput, latency percentiles and error "
+        "rates per endpoint. Runs in-process by default, or against a running server with --url. "
+        "Writes to the configured database; generate data with generate_load_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--mix", type=_mix, default=_mix(DEFAULT_MIX), help=f"Scenario weights (default {DEFAULT_MIX})")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--duration", type=float, default=30, help="Seconds to run (ignored with --iterations)")
+        parser.add_argument("--iterations", type=int, help="Stop after this many scenario runs instead")
+        parser.add_argument("--server-workers", type=int, default=1, help="Gunicorn workers behind --url, to report requests/sec per worker")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        if options["url"]:
+            url = options["url"]
+            make_transport = lambda: HTTPTransport(url)
+        else:
+            # Lets the test client through ALLOWED_HOSTS
+            setup_test_environment()
+            make_transport = ClientTransport
+
+        try:
+            report = run(
+                make_transport, options["mix"], options["concurrency"],
+                duration=None if options["iterations"] else options["duration"],
+                iterations=options["iterations"], seed=options["seed"],
+            )
+        finally:
+            if not options["url"]:
+                teardown_test_environment()
+
+        if not report["total"]["requests"]:
+            raise CommandError("No requests were made; is there data (generate_load_data) to drive?")
+        report["total"]["rpsPerWorker"] = round(report["total"]["rps"] / max(options["server_workers"], 1), 1)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        header = f"{'endpoint':<40} {'requests':>9} {'rps':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, row in [*report["endpoints"].items(), ("TOTAL", report["total"])]:
+            self.stdout.write(
+                f"{name:<40} {row['requests']:>9} {row['rps']:>8} {row['errorRate']:>7.2%} "
+                f"{row['p50Ms']:>8} {row['p95Ms']:>8} {row['p99Ms']:>8}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {report['total']['rps']} req/s over {report['elapsedSeconds']}s "
+            f"({report['total']['rpsPerWorker']} per server worker)"
+        ))
@@ -0,0 +1,88 @@
+#utils/management/commands/run_benchmarks.py
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from utils.benchmarks import BENCHMARKS, compare, lookup_queries
+from utils.explain import explain
+
+
+def _sizes(value):
+    return [int(size) for size in value.split(",") if size]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark sync, uploads, bulk updates, catalog endpoints (sync and async) and categorization in a throwaway "
+        "test database. Fails when a result regresses past --threshold against the stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", default="", help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+        parser.add_argument("--sizes", type=_sizes, default=[1000, 10000], help="Vendor build counts for the sync benchmark, e.g. 1000,10000,100000")
+        parser.add_argument("--rows", type=int, default=1000, help="Rows per upload / bulk update")
+        parser.add_argument("--connections", type=int, default=200, help="Concurrent connections for the WSGI/ASGI catalog read benchmark")
+        parser.add_argument("--catalog-size", type=int, default=1000, help="Catalog builds for the endpoint and categorization benchmarks")
+        parser.add_argument("--threshold", type=float, default=0.25, help="Allowed timing regression as a fraction (0.25 = 25%%)")
+        parser.add_argument("--baseline", help="Baseline JSON file (default benchmarks/baseline-<db vendor>.json)")
+        parser.add_argument("--explain", action="store_true", help="Print the query plan of each hot lookup after the lookups benchmark")
+        parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline instead of comparing")
+
+    def handle(self, *args, **options):
+        names = [n for n in options["only"].split(",") if n] or list(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+        baseline_path = options["baseline"] or os.path.join(
+            getattr(settings, "BASE_DIR", os.getcwd()), "benchmarks", f"baseline-{connection.vendor}.json"
+        )
+
+        results = {}
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            for name in names:
+                func, size_option = BENCHMARKS[name]
+                sizes = options[size_option]
+                for size in sizes if isinstance(sizes, list) else [sizes]:
+                    self.stdout.write(f"⏱️ {name} ({size})")
+                    for result, metrics in func(size).items():
+                        results[result] = metrics
+                        self.stdout.write(f"   {result}: " + ", ".join(f"{k}={v}" for k, v in metrics.items()))
+                    if name == "lookups" and options["explain"]:
+                        for lookup, queryset in lookup_queries().items():
+                            self.stdout.write(f"   📋 {lookup}:\n      " + explain(queryset).replace("\n", "\n      "))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options["save_baseline"]:
+            baseline = self._load(baseline_path)
+            baseline.update(results)
+            os.makedirs(os.path.dirname(baseline_path) or ".", exist_ok=True)
+            with open(baseline_path, "w") as f:
+                json.dump(baseline, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"✅ Baseline saved to {baseline_path}"))
+            return
+
+        baseline = self._load(baseline_path)
+        if not baseline:
+            self.stdout.write(self.style.WARNING(f"No baseline at {baseline_path}; run with --save-baseline to create one"))
+            return
+
+        regressions = compare(results, baseline, options["threshold"])
+        if regressions:
+            raise CommandError("Benchmarks regressed:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("✅ No regressions against the baseline"))
+
+    @staticmethod
+    def _load(path):
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
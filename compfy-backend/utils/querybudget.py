@@ -0,0 +1,153 @@
+# utils/querybudget.py
+"""
+Query budgets for views.
+
+Declare a budget with ``@query_budget(n)`` on a view function or class and
+add ``"utils.querybudget.QueryBudgetMiddleware"`` to MIDDLEWARE. Every
+request then records its queries; going over the view's budget logs a
+warning to ``compfy.querybudget``, or raises QueryBudgetExceeded when
+``settings.QUERY_BUDGET_MODE`` is "raise" (use that in tests). The same
+SQL run more than once with the same parameters is logged as a duplicate.
+
+In tests, ``with QueryBudget(3):`` checks a block directly.
+"""
+
+import contextlib
+import logging
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("compfy.querybudget")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """Declare how many queries a view may run per request"""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+class QueryBudget:
+    """Records the SQL run inside the block on every connection and checks it against `max_queries`"""
+
+    def __init__(self, max_queries=None, label="block", mode="raise"):
+        self.max_queries = max_queries
+        self.label = label
+        self.mode = mode
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, _freeze(params)))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = contextlib.ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stack.close()
+        if exc_type is None:
+            self.check()
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duplicates(self):
+        """[(sql, times)] for statements run more than once with the same parameters"""
+        return [(sql, n) for (sql, _), n in Counter(self.queries).items() if n > 1]
+
+    @property
+    def repeated(self):
+        """[(sql, times)] for statements run more than once with any parameters, the usual N+1 shape"""
+        return [(sql, n) for sql, n in Counter(sql for sql, _ in self.queries).items() if n > 1]
+
+    def report(self):
+        lines = [f"{self.label}: {self.count} queries (budget {self.max_queries})"]
+        for sql, n in sorted(self.repeated, key=lambda item: -item[1])[:5]:
+            lines.append(f"  {n}x {sql[:200]}")
+        return "\n".join(lines)
+
+    def check(self):
+        if self.duplicates:
+            logger.warning("%s ran duplicate queries:\n%s", self.label, "\n".join(
+                f"  {n}x {sql[:200]}" for sql, n in self.duplicates
+            ))
+        if self.max_queries is None or self.count <= self.max_queries:
+            return
+        if self.mode == "raise":
+            raise QueryBudgetExceeded(self.report())
+        logger.warning(self.report())
+
+
+def _freeze(params):
+    if isinstance(params, (list, tuple)):
+        return tuple(_freeze(p) for p in params)
+    if isinstance(params, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in params.items()))
+    return params
+
+
+def view_budget(view_func):
+    """Budget declared on a view function, or on the class behind an as_view() function"""
+    budget = getattr(view_func, "query_budget", None)
+    if budget is None:
+        budget = getattr(getattr(view_func, "view_class", None), "query_budget", None)
+    return budget
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.mode = getattr(settings, "QUERY_BUDGET_MODE", "warn")
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.mode == "off":
+            return self.get_response(request)
+
+        recorder = QueryBudget(mode=self.mode)
+        with recorder:
+            response = self.get_response(request)
+            _describe(recorder, request)
+        return response
+
+    async def __acall__(self, request):
+        if self.mode == "off":
+            return await self.get_response(request)
+
+        # Under ASGI the ORM runs on the request's sync thread, so record that thread's connections
+        recorder = QueryBudget(mode=self.mode)
+        await sync_to_async(recorder.__enter__)()
+        try:
+            response = await self.get_response(request)
+            _describe(recorder, request)
+        except BaseException as error:
+            await sync_to_async(recorder.__exit__)(type(error), error, error.__traceback__)
+            raise
+        await sync_to_async(recorder.__exit__)(None, None, None)
+        return response
+
+
+def _describe(recorder, request):
+    match = getattr(request, "resolver_match", None)
+    if match is not None:
+        recorder.max_queries = view_budget(match.func)
+        recorder.label = f"{request.method} {match.route or request.path}"
@@ -0,0 +1,18 @@
+# utils/testing.py
+"""Fixtures shared by the apps' test suites."""
+
+import io
+
+from django.core.management import call_command
+
+
+def generate_catalog(vendors=2, builds_per_vendor=30, users=0, **options):
+    """
+    Vendors with `builds_per_vendor` builds each and `users` customers
+    (none by default), from generate_load_data with its output silenced.
+    Pass no_catalog=True to leave the public catalog for the test to sync.
+    """
+    call_command(
+        "generate_load_data", vendors=vendors, builds_per_vendor=builds_per_vendor, users=users, stdout=io.StringIO(),
+        **options,
+    )
@@ -1,3 +1,199 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import JsonResponse
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from builds.similarity import similarity_index
+from utils.benchmarks import compare
+from utils.loadtest import SCENARIOS, ClientTransport, LoadStats, Worker, load_fixtures, run
+from utils.querybudget import QueryBudget, QueryBudgetExceeded, query_budget
+from utils.testing import generate_catalog
+
+
+@query_budget(1)
+def over_budget_view(request):
+    list(User.objects.all())
+    list(User.objects.all())
+    return JsonResponse({})
+
+
+urlpatterns = [path("over-budget/", over_budget_view)]
+
+
+class QueryBudgetTests(TestCase):
+    def test_within_budget(self):
+        with QueryBudget(1) as budget:
+            list(User.objects.all())
+        self.assertEqual(budget.count, 1)
+
+    def test_over_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with QueryBudget(1):
+                list(User.objects.all())
+                list(User.objects.filter(id=1))
+
+    def test_warn_mode_only_logs(self):
+        with self.assertLogs("compfy.querybudget", "WARNING"):
+            with QueryBudget(0, mode="warn"):
+                list(User.objects.all())
+
+    def test_duplicates_and_repeats(self):
+        with QueryBudget() as budget:
+            list(User.objects.filter(id=1))
+            list(User.objects.filter(id=1))
+            list(User.objects.filter(id=2))
+        self.assertEqual([n for _, n in budget.duplicates], [2])
+        self.assertEqual([n for _, n in budget.repeated], [3])
+
+    @override_settings(
+        ROOT_URLCONF="utils.tests", QUERY_BUDGET_MODE="raise",
+        MIDDLEWARE=["utils.querybudget.QueryBudgetMiddleware"],
+    )
+    def test_middleware_enforces_declared_budget(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get("/over-budget/")
+
+
+class BenchmarkCompareTests(TestCase):
+    BASELINE = {"sync_cold_1000": {"seconds": 1.0, "queries": 100, "rows_per_sec": 500.0}}
+
+    def regressions(self, **metrics):
+        return compare({"sync_cold_1000": {**self.BASELINE["sync_cold_1000"], **metrics}}, self.BASELINE, 0.25)
+
+    def test_timings_may_grow_within_the_threshold(self):
+        self.assertEqual(self.regressions(seconds=1.2), [])
+        self.assertEqual(self.regressions(seconds=1.3), ["sync_cold_1000.seconds: 1.0 -> 1.3"])
+
+    def test_differences_below_the_noise_floor_are_ignored(self):
+        baseline = {"lookup_1000": {"p50_ms": 0.1}}
+        self.assertEqual(compare({"lookup_1000": {"p50_ms": 0.5}}, baseline, 0.25), [])
+        self.assertEqual(len(compare({"lookup_1000": {"p50_ms": 10.0}}, baseline, 0.25)), 1)
+
+    def test_any_extra_query_is_a_regression(self):
+        self.assertEqual(self.regressions(queries=101), ["sync_cold_1000.queries: 100 -> 101"])
+
+    def test_throughput_must_not_drop(self):
+        self.assertEqual(self.regressions(rows_per_sec=450.0), [])
+        self.assertEqual(len(self.regressions(rows_per_sec=300.0)), 1)
+
+    def test_results_missing_from_the_baseline_are_skipped(self):
+        self.assertEqual(compare({"new_benchmark": {"seconds": 99}}, self.BASELINE, 0.25), [])
+
+
+class RunBenchmarksTests(TestCase):
+    """The command against the test database the runner already created"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.baseline = os.path.join(directory, "baseline.json")
+        command = "utils.management.commands.run_benchmarks"
+        for patcher in (
+            mock.patch(f"{command}.setup_test_environment"),
+            mock.patch(f"{command}.teardown_test_environment"),
+            mock.patch.object(connection.creation, "create_test_db", return_value=connection.settings_dict["NAME"]),
+            mock.patch.object(connection.creation, "destroy_test_db"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_sync(self, *args):
+        out = io.StringIO()
+        call_command("run_benchmarks", "--only", "sync", "--sizes", "20", "--baseline", self.baseline, *args, stdout=out)
+        return out.getvalue()
+
+    def test_saves_a_baseline_then_compares_against_it(self):
+        self.run_sync("--save-baseline")
+        with open(self.baseline) as f:
+            saved = json.load(f)
+        self.assertEqual(set(saved), {"sync_cold_20", "sync_noop_20"})
+        self.assertLess(saved["sync_noop_20"]["queries"], saved["sync_cold_20"]["queries"])
+
+        # Timings are allowed to vary with the machine; query counts are deterministic
+        for metrics in saved.values():
+            metrics["seconds"] = 60
+        with open(self.baseline, "w") as f:
+            json.dump(saved, f)
+        self.assertIn("No regressions", self.run_sync())
+
+    def test_fails_on_a_regressed_query_count(self):
+        with open(self.baseline, "w") as f:
+            json.dump({"sync_noop_20": {"queries": 0}}, f)
+        with self.assertRaisesMessage(CommandError, "sync_noop_20.queries: 0 ->"):
+            self.run_sync()
+
+    def test_unknown_benchmark_is_an_error(self):
+        with self.assertRaisesMessage(CommandError, "Unknown benchmarks: nope"):
+            call_command("run_benchmarks", "--only", "nope", stdout=io.StringIO())
+
+
+class RecordingTransport:
+    """Answers every request with 200, or raises for paths in `failing`"""
+
+    def __init__(self, requests, failing=()):
+        self.requests = requests
+        self.failing = failing
+
+    def request(self, method, path, data=None, token=None, files=None):
+        self.requests.append((method, path))
+        if any(path.startswith(prefix) for prefix in self.failing):
+            raise ConnectionError(path)
+        if path == "/api/auth/login/":
+            return 200, b'{"access": "token"}'
+        return 200, b'{"id": 1}'
+
+
+class LoadTestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=2, builds_per_vendor=6, users=2)
+
+    def test_stats_report_percentiles_and_error_rate(self):
+        stats = LoadStats()
+        for ms in range(1, 101):
+            stats.record("GET builds/", ms / 1000, ok=ms % 10 != 0)
+        stats.record("GET builds/<pk>/", 0.5, ok=True)
+
+        report = stats.report(elapsed=2)
+        builds = report["endpoints"]["GET builds/"]
+        self.assertEqual((builds["requests"], builds["rps"], builds["errorRate"]), (100, 50, 0.1))
+        self.assertEqual((builds["p50Ms"], builds["p95Ms"], builds["p99Ms"]), (51, 96, 100))
+        self.assertEqual((report["total"]["requests"], report["total"]["errorRate"]), (101, round(10 / 101, 4)))
+
+    def test_run_follows_the_mix_and_counts_transport_failures(self):
+        requests = []
+        report = run(
+            lambda: RecordingTransport(requests, failing=["/api/inventory/"]),
+            {"browse": 1, "bulk_update": 1}, concurrency=3, iterations=30,
+        )
+        self.assertEqual(report["total"]["requests"], len(requests))
+        paths = {path.split("?")[0] for _, path in requests}
+        self.assertIn("/api/builds/", paths)
+        self.assertTrue(any(path.endswith("/bulk-update/") for path in paths))
+        self.assertFalse(any("/upload/" in path or "saved" in path for path in paths))
+        self.assertEqual(report["endpoints"]["PUT inventory/<vendor>/bulk-update/"]["errorRate"], 1)
+        self.assertEqual(report["endpoints"]["GET builds/"]["errorRate"], 0)
+
+    def test_scenarios_succeed_against_the_app(self):
+        similarity_index.rebuild()
+        stats = LoadStats()
+        worker = Worker(ClientTransport(), stats, load_fixtures(), seed=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ("browse", "saved", "bulk_update", "upload"):
+                SCENARIOS[name](worker)
+
+        report = stats.report(elapsed=1)
+        failing = {name: row for name, row in report["endpoints"].items() if row["errorRate"]}
+        self.assertEqual(failing, {})
+        for endpoint in ("GET builds/<pk>/similar/", "POST builds/saved-builds/", "PUT inventory/<vendor>/bulk-update/",
+                         "POST inventory/<vendor>/upload/"):
+            self.assertIn(endpoint, report["endpoints"])
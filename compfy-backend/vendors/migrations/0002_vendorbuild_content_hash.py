@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:19
+
+import hashlib
+from decimal import Decimal
+
+from django.db import migrations, models
+
+HASHED_FIELDS = ("title", "cpu", "gpu", "ram", "storage", "psu", "case", "price")
+
+
+def content_hash(vb):
+    # Same hashing as vendors.models.content_hash, as of this migration
+    parts = []
+    for field in HASHED_FIELDS:
+        value = getattr(vb, field)
+        if value is None:
+            value = ""
+        elif field == "price" and value != "":
+            value = Decimal(str(value)).quantize(Decimal("0.01"))
+        parts.append(str(value).strip())
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def backfill_content_hashes(apps, schema_editor):
+    VendorBuild = apps.get_model("vendors", "VendorBuild")
+    batch = []
+    for vb in VendorBuild.objects.only("id", *HASHED_FIELDS).iterator(chunk_size=1000):
+        vb.content_hash = content_hash(vb)
+        batch.append(vb)
+        if len(batch) >= 1000:
+            VendorBuild.objects.bulk_update(batch, ["content_hash"])
+            batch = []
+    if batch:
+        VendorBuild.objects.bulk_update(batch, ["content_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorbuild',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hashes, migrations.RunPython.noop),
+    ]
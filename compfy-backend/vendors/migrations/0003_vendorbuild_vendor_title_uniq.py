@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:40
+
+import hashlib
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count
+
+HASHED_FIELDS = ("title", "cpu", "gpu", "ram", "storage", "psu", "case", "price")
+
+
+def content_hash(vb):
+    # Same hashing as vendors.models.content_hash, as of this migration
+    parts = []
+    for field in HASHED_FIELDS:
+        value = getattr(vb, field)
+        if value is None:
+            value = ""
+        elif field == "price" and value != "":
+            value = Decimal(str(value)).quantize(Decimal("0.01"))
+        parts.append(str(value).strip())
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def rename_duplicate_titles(apps, schema_editor):
+    """
+    Uploads already treat the oldest build with a title as the vendor's
+    build; later duplicates get their id appended so nothing is lost.
+    """
+    VendorBuild = apps.get_model("vendors", "VendorBuild")
+    Build = apps.get_model("builds", "Build")
+    duplicates = (
+        VendorBuild.objects.values("vendor_id", "title").annotate(n=Count("id")).filter(n__gt=1)
+    )
+    for group in duplicates.iterator():
+        rows = VendorBuild.objects.filter(vendor_id=group["vendor_id"], title=group["title"]).order_by("id")
+        for vb in list(rows)[1:]:
+            suffix = f" ({vb.id})"
+            vb.title = vb.title[:200 - len(suffix)] + suffix
+            vb.content_hash = content_hash(vb)
+            vb.save(update_fields=["title", "content_hash"])
+            Build.objects.filter(source="vendor", vendor_build_id=vb.id).update(title=vb.title)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0002_vendorbuild_content_hash'),
+        ('builds', '0002_build_config_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_titles, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='vendorbuild',
+            constraint=models.UniqueConstraint(fields=('vendor', 'title'), name='vendorbuild_vendor_title_uniq'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0003_vendorbuild_vendor_title_uniq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorBuildChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('vendor_id', models.IntegerField()),
+                ('vendor_build_id', models.IntegerField()),
+                ('op', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vendor_id', 'id'], name='vbchange_vendor_idx')],
+            },
+        ),
+    ]
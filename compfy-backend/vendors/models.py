@@ -1,7 +1,29 @@
 #vendors/models.py
-from django.db import models
+import contextlib
+import contextvars
+import hashlib
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import Signal, receiver
 from django.contrib.auth.models import User
 
+# Fields a vendor upload can change; together they make up VendorBuild.content_hash
+HASHED_FIELDS = ("title", "cpu", "gpu", "ram", "storage", "psu", "case", "price")
+
+
+def content_hash(values):
+    """Hash of a vendor build's uploadable fields, from a dict keyed by HASHED_FIELDS"""
+    parts = []
+    for field in HASHED_FIELDS:
+        value = values.get(field)
+        if value is None:
+            value = ""
+        elif field == "price" and value != "":
+            value = Decimal(str(value)).quantize(Decimal("0.01"))
+        parts.append(str(value).strip())
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
 class Vendor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="vendor")
     shop_name = models.CharField(max_length=150)
@@ -13,6 +35,81 @@ class Vendor(models.Model):
         return f"{self.shop_name} ({self.city})"
 
 
+# -------------------- Change outbox --------------------
+# Sent inside the writing transaction with vendor_ids=[...] after outbox rows are written
+vendor_builds_changed = Signal()
+
+# Changes collected while a queryset delete cascades, written in one insert at the end
+_pending_changes = contextvars.ContextVar("vendorbuild_pending_changes", default=None)
+
+
+def record_changes(pairs, op):
+    """Write outbox rows for (vendor_id, vendor_build_id) pairs; call inside the write's transaction"""
+    rows = [VendorBuildChange(vendor_id=vendor_id, vendor_build_id=build_id, op=op) for vendor_id, build_id in pairs]
+    if not rows:
+        return
+    pending = _pending_changes.get()
+    if pending is not None:
+        pending.extend(rows)
+        return
+    VendorBuildChange.objects.bulk_create(rows, batch_size=500)
+    vendor_builds_changed.send(sender=VendorBuildChange, vendor_ids=sorted({row.vendor_id for row in rows}))
+
+
+@contextlib.contextmanager
+def _collect_changes():
+    if _pending_changes.get() is not None:
+        yield
+        return
+    rows = []
+    token = _pending_changes.set(rows)
+    try:
+        yield
+    finally:
+        _pending_changes.reset(token)
+    record_changes([(row.vendor_id, row.vendor_build_id) for row in rows if row.op == "upsert"], "upsert")
+    record_changes([(row.vendor_id, row.vendor_build_id) for row in rows if row.op == "delete"], "delete")
+
+
+class VendorBuildQuerySet(models.QuerySet):
+    """
+    Bulk writes that bypass save() still record every touched build in the
+    outbox, in the same transaction as the write.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            pairs = [(obj.vendor_id, obj.pk) for obj in objs if obj.pk is not None]
+            missing = [obj for obj in objs if obj.pk is None]
+            if missing:
+                # Backends without RETURNING (MySQL) leave pk unset; titles are unique per vendor
+                titles = {}
+                for obj in missing:
+                    titles.setdefault(obj.vendor_id, []).append(obj.title)
+                for vendor_id, vendor_titles in titles.items():
+                    for start in range(0, len(vendor_titles), 500):
+                        pairs += self.model._base_manager.using(self.db).filter(
+                            vendor_id=vendor_id, title__in=vendor_titles[start:start + 500],
+                        ).values_list("vendor_id", "id")
+            record_changes(pairs, "upsert")
+        return objs
+
+    def update(self, **kwargs):
+        # bulk_update() goes through here too
+        with transaction.atomic(using=self.db):
+            pairs = list(self.values_list("vendor_id", "id"))
+            rows = super().update(**kwargs)
+            record_changes(pairs, "upsert")
+        return rows
+
+    def delete(self):
+        # The post_delete receiver records each row; collect them into one insert
+        with transaction.atomic(using=self.db), _collect_changes():
+            return super().delete()
+
+
 class VendorBuild(models.Model):
     CATEGORY_CHOICES = [
         ('gaming', 'Gaming'),
@@ -40,6 +137,58 @@ class VendorBuild(models.Model):
     intensity = models.CharField(max_length=20, choices=INTENSITY_CHOICES, default='casual')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    content_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
+
+    objects = VendorBuildQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Uploads, bulk updates and snapshots all match a vendor's builds by title
+            models.UniqueConstraint(fields=["vendor", "title"], name="vendorbuild_vendor_title_uniq"),
+        ]
+
+    def compute_content_hash(self):
+        return content_hash({field: getattr(self, field) for field in HASHED_FIELDS})
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.compute_content_hash()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "content_hash" not in update_fields:
+            kwargs["update_fields"] = list(update_fields) + ["content_hash"]
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            record_changes([(self.vendor_id, self.pk)], "upsert")
 
     def __str__(self):
         return f"{self.title} - {self.vendor.shop_name}"
+
+
+class VendorBuildChange(models.Model):
+    """
+    Outbox row for one VendorBuild insert, update or delete, written in the
+    same transaction as the change. builds/outbox.py applies them to the
+    catalog in id order and deletes them. Plain ids rather than foreign keys,
+    so the row outlives the build and vendor it describes.
+    """
+    OP_CHOICES = (
+        ("upsert", "Created or updated"),
+        ("delete", "Deleted"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    vendor_id = models.IntegerField()
+    vendor_build_id = models.IntegerField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["vendor_id", "id"], name="vbchange_vendor_idx")]
+
+    def __str__(self):
+        return f"{self.op} vendor build {self.vendor_build_id} (vendor {self.vendor_id})"
+
+
+@receiver(post_delete, sender=VendorBuild)
+def record_vendor_build_delete(sender, instance, **kwargs):
+    # Runs inside the deleting transaction, for instance, queryset and cascade deletes alike
+    record_changes([(instance.vendor_id, instance.pk)], "delete")
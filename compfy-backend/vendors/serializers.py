@@ -13,3 +13,13 @@ class VendorBuildSerializer(serializers.ModelSerializer):
     class Meta:
         model = VendorBuild
         fields = ["id", "title", "description", "cpu", "gpu", "ram", "storage","psu", "case", "price", "created_at"]
+
+    def validate_title(self, value):
+        # `vendor` is not a field here, so the (vendor, title) constraint has to be checked by hand
+        vendor = self.instance.vendor if self.instance else self.context["request"].user.vendor
+        taken = VendorBuild.objects.filter(vendor=vendor, title=value)
+        if self.instance is not None:
+            taken = taken.exclude(pk=self.instance.pk)
+        if taken.exists():
+            raise serializers.ValidationError("You already have a build with this title.")
+        return value
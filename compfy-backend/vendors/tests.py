@@ -1,3 +1,124 @@
+from django.db import transaction
+from django.db.models import F
 from django.test import TestCase
 
-# Create your tests here.
+from utils.testing import generate_catalog
+from vendors.models import Vendor, VendorBuild, VendorBuildChange, content_hash
+
+
+class ChangeOutboxTests(TestCase):
+    """Every way of writing a VendorBuild leaves an outbox row in the same transaction"""
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=1, builds_per_vendor=4, no_catalog=True)
+        cls.vendor = Vendor.objects.get()
+
+    def setUp(self):
+        VendorBuildChange.objects.all().delete()
+        self.builds = list(VendorBuild.objects.order_by("id"))
+
+    def changes(self):
+        return sorted(VendorBuildChange.objects.values_list("op", "vendor_build_id"))
+
+    def test_save_and_create_are_recorded(self):
+        self.builds[0].price += 100
+        self.builds[0].save()
+        created = VendorBuild.objects.create(
+            vendor=self.vendor, title="New build", cpu="Ryzen 5 5600", ram="16GB", storage="1TB", psu="650W",
+            case="Mid tower", price=90000,
+        )
+        self.assertEqual(self.changes(), sorted([("upsert", created.id), ("upsert", self.builds[0].id)]))
+
+    def test_bulk_writes_are_recorded(self):
+        VendorBuild.objects.filter(id=self.builds[0].id).update(price=F("price") + 100)
+        self.builds[1].price += 100
+        VendorBuild.objects.bulk_update([self.builds[1]], ["price"])
+        [created] = VendorBuild.objects.bulk_create([VendorBuild(
+            vendor=self.vendor, title="Bulk build", cpu="Core i5", ram="8GB", storage="512GB", psu="500W",
+            case="Mini", price=50000,
+        )])
+        self.assertEqual(
+            self.changes(), sorted([("upsert", self.builds[0].id), ("upsert", self.builds[1].id), ("upsert", created.id)]),
+        )
+
+    def test_deletes_are_recorded_including_cascades(self):
+        ids = [vb.id for vb in self.builds]
+        VendorBuild.objects.filter(id=ids[0]).delete()
+        self.builds[1].delete()
+        self.assertEqual(self.changes(), [("delete", ids[0]), ("delete", ids[1])])
+
+        self.vendor.delete()
+        self.assertEqual(VendorBuildChange.objects.filter(op="delete").count(), 4)
+
+    def test_rolled_back_write_leaves_no_outbox_row(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            VendorBuild.objects.filter(vendor=self.vendor).update(price=1)
+            raise RuntimeError
+        self.assertEqual(self.changes(), [])
+
+    def test_vendor_api_edits_are_recorded(self):
+        self.client.force_login(self.vendor.user)
+        response = self.client.patch(
+            f"/api/vendors/builds/{self.builds[0].id}/", {"price": "123400"}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.changes(), [("upsert", self.builds[0].id)])
+
+
+class ContentHashTests(TestCase):
+    VALUES = {"title": "Office Pro", "cpu": "Core i5", "gpu": None, "ram": "16GB", "storage": "512GB",
+              "psu": "500W", "case": "Mini", "price": "45000"}
+
+    def test_hash_ignores_formatting_but_not_content(self):
+        same = {**self.VALUES, "gpu": "", "price": "45000.00", "ram": " 16GB "}
+        self.assertEqual(content_hash(same), content_hash(self.VALUES))
+        for field, value in [("price", "45000.01"), ("gpu", "RTX 3060"), ("title", "Office Pro 2")]:
+            with self.subTest(field=field):
+                self.assertNotEqual(content_hash({**self.VALUES, field: value}), content_hash(self.VALUES))
+
+    def test_save_keeps_the_stored_hash_current(self):
+        generate_catalog(vendors=1, builds_per_vendor=1, no_catalog=True)
+        vb = VendorBuild.objects.get()
+        vb.price += 1
+        vb.save(update_fields=["price"])
+        vb.refresh_from_db()
+        self.assertEqual(vb.content_hash, vb.compute_content_hash())
+
+
+class VendorBuildTitleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(vendors=2, builds_per_vendor=2, no_catalog=True)
+        cls.vendor, cls.other = Vendor.objects.order_by("id")
+        cls.first, cls.second = VendorBuild.objects.filter(vendor=cls.vendor).order_by("id")
+        cls.elsewhere = VendorBuild.objects.filter(vendor=cls.other).first()
+
+    def setUp(self):
+        self.client.force_login(self.vendor.user)
+
+    def create(self, title):
+        return self.client.post("/api/vendors/builds/", {
+            "title": title, "cpu": "Ryzen 5 5600", "ram": "16GB", "storage": "1TB", "psu": "650W",
+            "case": "Mid tower", "price": "90000.00",
+        }, content_type="application/json")
+
+    def test_create_with_a_taken_title_is_rejected(self):
+        response = self.create(self.first.title)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("title", response.json())
+        self.assertEqual(VendorBuild.objects.filter(vendor=self.vendor).count(), 2)
+
+        # Titles only have to be unique per vendor
+        self.assertEqual(self.create(self.elsewhere.title).status_code, 201)
+
+    def test_rename_onto_a_taken_title_is_rejected(self):
+        url = f"/api/vendors/builds/{self.second.id}/"
+        response = self.client.patch(url, {"title": self.first.title}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("title", response.json())
+
+        # Saving a build under its own title is not a clash
+        response = self.client.patch(url, {"title": self.second.title, "price": "1000.00"}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.patch(url, {"title": "Renamed"}, content_type="application/json").status_code, 200)
@@ -4,9 +4,11 @@ from .models import Vendor, VendorBuild
 from rest_framework.exceptions import ValidationError  
 from .serializers import VendorSerializer, VendorBuildSerializer
 from rest_framework.response import Response
+from compfy.db import replica_reads
 
 # ---------------- Vendor Views ----------------
 
+@replica_reads
 class ShopListCreateView(generics.ListCreateAPIView):
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer